@@ -1,7 +1,8 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
-from routes import articles_bp, fetch_bp, ai_bp
+from routes import articles_bp, fetch_bp, ai_bp, sources_bp
 from routes.user_data import user_data_bp
+from pipelines.search import warm_search_index
 
 app = Flask(__name__)
 CORS(app)
@@ -9,6 +10,7 @@ CORS(app)
 app.register_blueprint(articles_bp, url_prefix='/api')
 app.register_blueprint(fetch_bp, url_prefix='/api')
 app.register_blueprint(ai_bp, url_prefix='/api')
+app.register_blueprint(sources_bp, url_prefix='/api')
 app.register_blueprint(user_data_bp, url_prefix='/api')
 
 
@@ -18,10 +20,15 @@ def index():
         "message": "Data Science News API",
         "version": "1.0",
         "endpoints": {
-            "GET /api/articles": "Get all fetched articles with optional filters",
-            "POST /api/fetch": "Trigger fetching news from all sources",
+            "GET /api/articles": "Get fetched articles, newest first, a page at a time (category, since/until also search the archive, q full-text search ranked by relevance, ai_category/source/tag/day facet filters with match=all|any, limit (default 50, at most 1000), cursor=next_cursor, fields=list|full|field,... defaults to the compact list shape)",
+            "GET /api/articles/{id}": "Get one article with every field (id percent-encoded; fields= to project)",
+            "GET /api/facets": "Get article counts per ai_category, source, tag and day for the same filters as /api/articles",
+            "POST /api/fetch": "Trigger fetching news from the sources that are due (force polls all of them)",
             "GET /api/fetch/status": "Check fetch status",
             "GET /api/stats": "Get statistics about fetched articles",
+            "POST /api/articles/archive": "Move articles older than the archive horizon into monthly archive segments (body: {horizon_days, dry_run})",
+            "POST /api/articles/cleanup": "Evict old articles per maxArticles / cleanupDays, keeping saved ones (body: {dry_run, max_articles, cleanup_days})",
+            "GET /api/sources/health": "Per-source fetch timings and failures over recent runs (sort=p95|p50|failures|bytes, limit)",
             "POST /api/categorize": "Categorize articles using AI",
             "POST /api/summarize": "Get AI summary for specific article (body: {article_id: string})",
             "GET /api/saved-articles": "Get saved articles",
@@ -40,6 +47,8 @@ def index():
 
 
 if __name__ == "__main__":
+    # Build the search index while the server starts, not in the first q= request
+    warm_search_index()
     app.run(
         host="127.0.0.1",
         port=5001,
@@ -0,0 +1,164 @@
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from .config import ARCHIVE_DIR, ARCHIVE_HORIZON_DAYS, ARCHIVE_CACHE_SEGMENTS
+from .parser import published_sort_key
+from .store import fsync_directory
+from .user_data import load_saved_articles
+from .writer import get_article_writer
+
+
+# Cold storage for old articles: gzipped NDJSON segments under ARCHIVE_DIR,
+# one or more per month of publication, each written once and never changed,
+# plus index.json listing every segment with its month, count and
+# published_ts range. Reads open only the segments overlapping the requested
+# range; decoded segments are cached, which is safe because they never change.
+
+INDEX_FILE = "index.json"
+
+_archive_lock = threading.Lock()
+_index_cache = {"mtime": None, "index": None}
+
+
+def _write_atomic(path, payload: bytes):
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+    fsync_directory(path.parent)
+
+
+def load_archive_index() -> Dict:
+    """{"segments": [{"file", "month", "count", "min_ts", "max_ts", "bytes"}, ...]}, re-read only when it changed."""
+    path = ARCHIVE_DIR / INDEX_FILE
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return {"segments": []}
+    if _index_cache["mtime"] != mtime:
+        with open(path, "r", encoding="utf-8") as f:
+            _index_cache["index"] = json.load(f)
+        _index_cache["mtime"] = mtime
+    return _index_cache["index"]
+
+
+def month_of(published_ts: float) -> str:
+    return datetime.fromtimestamp(published_ts, timezone.utc).strftime("%Y-%m")
+
+
+def archive_articles(articles: List[Dict]) -> int:
+    """Write dated articles to new segments, one per month; returns how many were archived.
+
+    The segments and the index are on disk before this returns, so the caller
+    can then remove the articles from the store. An id already archived is
+    skipped when reading, so archiving one again is harmless.
+    """
+    by_month = {}
+    for article in articles:
+        if article.get("published_ts") is not None:
+            by_month.setdefault(month_of(article["published_ts"]), []).append(article)
+    if not by_month:
+        return 0
+
+    with _archive_lock:
+        ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+        index = json.loads(json.dumps(load_archive_index()))
+        for month, month_articles in sorted(by_month.items()):
+            month_articles.sort(key=published_sort_key)
+            number = sum(1 for segment in index["segments"] if segment["month"] == month)
+            name = f"{month}-{number:03d}.ndjson.gz"
+            lines = "".join(json.dumps(a, ensure_ascii=False, separators=(",", ":")) + "\n" for a in month_articles)
+            payload = gzip.compress(lines.encode("utf-8"), 6)
+            _write_atomic(ARCHIVE_DIR / name, payload)
+            index["segments"].append({
+                "file": name,
+                "month": month,
+                "count": len(month_articles),
+                "min_ts": month_articles[-1]["published_ts"],
+                "max_ts": month_articles[0]["published_ts"],
+                "bytes": len(payload),
+            })
+        _write_atomic(ARCHIVE_DIR / INDEX_FILE, json.dumps(index, indent=2).encode("utf-8"))
+    return sum(len(month_articles) for month_articles in by_month.values())
+
+
+@lru_cache(maxsize=ARCHIVE_CACHE_SEGMENTS)
+def _read_segment(name: str) -> Tuple[Dict, ...]:
+    with gzip.open(ARCHIVE_DIR / name, "rt", encoding="utf-8") as f:
+        return tuple(json.loads(line) for line in f if line.strip())
+
+
+def segments_overlapping(since_ts: Optional[float] = None, until_ts: Optional[float] = None) -> List[Dict]:
+    """Index entries of the segments holding articles published within [since_ts, until_ts]."""
+    return [segment for segment in load_archive_index()["segments"]
+            if (since_ts is None or segment["max_ts"] >= since_ts) and (until_ts is None or segment["min_ts"] <= until_ts)]
+
+
+def query_archive(since_ts: Optional[float] = None, until_ts: Optional[float] = None) -> List[Dict]:
+    """Archived articles published within [since_ts, until_ts], newest first, each id once.
+
+    Only the segments whose range overlaps are opened.
+    """
+    articles = []
+    seen = set()
+    for segment in segments_overlapping(since_ts, until_ts):
+        for article in _read_segment(segment["file"]):
+            published_ts = article["published_ts"]
+            if (since_ts is None or published_ts >= since_ts) and (until_ts is None or published_ts <= until_ts) \
+                    and article.get("id") not in seen:
+                seen.add(article.get("id"))
+                articles.append(article)
+    articles.sort(key=published_sort_key)
+    return articles
+
+
+def articles_in_range(hot_articles, since_ts: Optional[float], until_ts: Optional[float]) -> List[Dict]:
+    """Stored and archived articles published within [since_ts, until_ts], newest first.
+
+    An article both stored and archived (a crash between the two steps of
+    tier_articles) is returned once, as stored.
+    """
+    articles = [a for a in hot_articles if a.get("published_ts") is not None
+                and (since_ts is None or a["published_ts"] >= since_ts)
+                and (until_ts is None or a["published_ts"] <= until_ts)]
+    hot_ids = {a.get("id") for a in articles}
+    archived = [a for a in query_archive(since_ts, until_ts) if a.get("id") not in hot_ids]
+    if archived:
+        articles.extend(archived)
+        articles.sort(key=published_sort_key)
+    return articles
+
+
+def tier_articles(articles: List[Dict], horizon_days: float = ARCHIVE_HORIZON_DAYS,
+                  dry_run: bool = False) -> Tuple[List[Dict], Dict]:
+    """Move articles published more than `horizon_days` ago from the store to the archive.
+
+    Saved articles stay in the store. Returns the articles that stay and a
+    report; the removal is committed through the article writer.
+    """
+    cutoff_ts = time.time() - horizon_days * 86400
+    protected_ids = {a.get("id") for a in load_saved_articles().get("articles", [])}
+    old = [a for a in articles if a.get("published_ts") is not None and a["published_ts"] < cutoff_ts
+           and a.get("id") not in protected_ids]
+    old_ids = {a.get("id") for a in old}
+
+    report = {
+        "ran_at": datetime.now().isoformat(),
+        "dry_run": dry_run,
+        "horizon_days": horizon_days,
+        "archived": len(old),
+        "months": sorted({month_of(a["published_ts"]) for a in old}),
+    }
+    if old and not dry_run:
+        archive_articles(old)
+        get_article_writer().remove_articles(sorted(old_ids)).result()
+    print(f"Archive{' (dry run)' if dry_run else ''}: moved {len(old)} articles older than "
+          f"{horizon_days:g} days ({', '.join(report['months']) or 'none'})")
+    return [a for a in articles if a.get("id") not in old_ids], report
@@ -1,9 +1,34 @@
+import os
 from pathlib import Path
 
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 SOURCES_FILE = BASE_DIR / "sources" / "sources.txt"
 FETCHED_DATA_DIR = BASE_DIR / "fetched_data"
+# Article storage: "sqlite" (one indexed row per article in ARTICLES_DB_FILE,
+# importing ARTICLES_JSON_FILE on first use), "json" (the whole corpus in
+# ARTICLES_JSON_FILE) or "journal" (ARTICLES_JSON_FILE plus the changes since,
+# appended to ARTICLES_JOURNAL_FILE and folded back into the JSON file in the
+# background once the journal passes ARTICLES_JOURNAL_COMPACT_BYTES)
+ARTICLE_STORE = "sqlite"
+ARTICLES_JSON_FILE = FETCHED_DATA_DIR / "articles.json"
+ARTICLES_DB_FILE = FETCHED_DATA_DIR / "articles.db"
+ARTICLES_JOURNAL_FILE = FETCHED_DATA_DIR / "articles.journal.ndjson"
+ARTICLES_JOURNAL_COMPACT_BYTES = 8 * 1024 * 1024
+# With ARCHIVE_ENABLED, articles published more than ARCHIVE_HORIZON_DAYS ago
+# move from the article store into gzipped monthly segments under ARCHIVE_DIR
+# after each fetch (see pipelines.archive), and so do articles evicted by
+# retention. /api/articles?since=&until= reads the segments overlapping the
+# range; the last ARCHIVE_CACHE_SEGMENTS decoded segments stay in memory
+ARCHIVE_ENABLED = True
+ARCHIVE_DIR = FETCHED_DATA_DIR / "archive"
+ARCHIVE_HORIZON_DAYS = 30
+ARCHIVE_CACHE_SEGMENTS = 4
+# Changes to the stored articles are queued to a single writer thread (see
+# pipelines.writer), which waits up to WRITER_BATCH_DELAY seconds for more
+# and commits up to WRITER_MAX_BATCH queued changes in one write
+WRITER_BATCH_DELAY = 0.05
+WRITER_MAX_BATCH = 500
 OLLAMA_URL = "http://localhost:11434/api/generate"
 
 
@@ -14,4 +39,105 @@ USER_DATA_DIR.mkdir(exist_ok=True)
 # File paths
 SAVED_ARTICLES_FILE = USER_DATA_DIR / "saved_articles.json"
 USER_SETTINGS_FILE = USER_DATA_DIR / "user_settings.json"
-NEWS_ALERTS_FILE = USER_DATA_DIR / "news_alerts.json"
\ No newline at end of file
+NEWS_ALERTS_FILE = USER_DATA_DIR / "news_alerts.json"
+
+# Fetch settings
+FETCH_MAX_WORKERS = 8
+# Most workers a POST /api/fetch may ask for
+FETCH_MAX_WORKERS_LIMIT = 32
+# "threads" downloads and parses on one thread pool; "processes" downloads on
+# threads and parses on a process pool fed through a bounded queue
+FETCH_PIPELINE = "threads"
+FETCH_PARSE_WORKERS = os.cpu_count() or 2
+FETCH_QUEUE_SIZE = 16
+# Read plain RSS 2.0 / Atom with pipelines.fastparser, falling back to
+# feedparser for anything it does not reproduce exactly
+FETCH_FAST_PARSER = True
+FETCH_USER_AGENT = "Mozilla/5.0"
+# Time budgets in seconds: connect / per-read socket timeouts, the whole
+# download of one feed, and a whole fetch run (None for no run limit)
+FETCH_CONNECT_TIMEOUT = 10
+FETCH_READ_TIMEOUT = 20
+FETCH_FEED_TIMEOUT = 50
+FETCH_RUN_DEADLINE = 600
+FETCH_CONNECTIONS_PER_HOST = 4
+# Politeness per host when fetching concurrently: at most FETCH_HOST_CONCURRENCY
+# requests in flight, started at FETCH_HOST_RATE per second with bursts of
+# FETCH_HOST_BURST. A 429/503 with Retry-After (FETCH_RETRY_AFTER_DEFAULT
+# seconds for a bare 429) pauses the host and retries the feed up to
+# FETCH_HOST_RETRIES times; a pause longer than FETCH_RETRY_AFTER_MAX seconds
+# skips the host's remaining feeds for the run
+FETCH_HOST_CONCURRENCY = 2
+FETCH_HOST_RATE = 2.0
+FETCH_HOST_BURST = 4
+FETCH_HOST_RETRIES = 1
+FETCH_RETRY_AFTER_DEFAULT = 30
+FETCH_RETRY_AFTER_MAX = 120
+FETCH_HOST_POOLS = 64
+# Feed downloads cache the addresses of up to DNS_CACHE_ENTRIES hosts for
+# DNS_CACHE_TTL seconds each
+DNS_CACHE_TTL = 300
+DNS_CACHE_ENTRIES = 512
+FEED_STATE_FILE = FETCHED_DATA_DIR / "feed_state.json"
+# Adaptive polling: a feed's next poll follows its observed publish rate (a
+# smoothed rate aiming at FETCH_POLL_TARGET new articles per poll), between
+# FETCH_POLL_MIN_INTERVAL and FETCH_POLL_MAX_INTERVAL seconds. After
+# FETCH_BREAKER_THRESHOLD failures in a row a feed's circuit opens for
+# FETCH_BREAKER_BASE_DELAY seconds, doubling per further failure up to
+# FETCH_BREAKER_MAX_DELAY; feeds that are not due are skipped by the run.
+# POST /api/fetch with force (sent by the dashboard's Fetch button) polls
+# every source instead
+FETCH_ADAPTIVE_SCHEDULE = True
+FETCH_POLL_TARGET = 1.0
+FETCH_POLL_MIN_INTERVAL = 15 * 60
+FETCH_POLL_MAX_INTERVAL = 12 * 3600
+FETCH_POLL_SMOOTHING = 0.3
+FETCH_BREAKER_THRESHOLD = 3
+FETCH_BREAKER_BASE_DELAY = 3600
+FETCH_BREAKER_MAX_DELAY = 7 * 24 * 3600
+# Commit each source's new articles to PENDING_ARTICLES_FILE as soon as the
+# source finishes, so a crash or cancel mid-run keeps the work done so far
+FETCH_STREAM_COMMIT = True
+PENDING_ARTICLES_FILE = FETCHED_DATA_DIR / "articles.pending.ndjson"
+# Per-source telemetry of the last SOURCE_HEALTH_RUNS polls of each feed
+SOURCE_HEALTH_FILE = FETCHED_DATA_DIR / "source_health.json"
+SOURCE_HEALTH_RUNS = 20
+# The read endpoints serve an in-memory snapshot of the corpus (see
+# pipelines.snapshot); writes made by this process replace it right away,
+# and the store files are stat()ed at most every SNAPSHOT_CHECK_INTERVAL
+# seconds to notice writes from other processes
+SNAPSHOT_CHECK_INTERVAL = 1.0
+# Page size of GET /api/articles when no limit is given, and the largest
+# page it returns; the largest matches the default maxArticles retention, so
+# one request can still cover the whole stored set. Later pages are reached
+# with next_cursor
+ARTICLES_DEFAULT_PAGE_SIZE = 50
+ARTICLES_MAX_PAGE_SIZE = 1000
+# Full-text search (GET /api/articles?q=, see pipelines.search): query words of
+# SEARCH_PREFIX_MIN or more characters also match longer words starting with
+# them, at most the SEARCH_PREFIX_EXPANSIONS most common of those
+SEARCH_PREFIX_MIN = 3
+SEARCH_PREFIX_EXPANSIONS = 32
+# Words in SEARCH_RANKED_MIN_DOCS or more articles also keep their postings
+# grouped by impact, so their best matches are found without scoring every
+# article they are in
+SEARCH_RANKED_MIN_DOCS = 1000
+# The search index syncs on a background thread, taking its lock to apply
+# SEARCH_SYNC_BATCH articles at a time
+SEARCH_SYNC_BATCH = 16
+# Seconds a query waits for the first build of the search index after
+# startup; past that it is answered by reading every article (slower, and
+# the response is not cached)
+SEARCH_READY_WAIT = 1.0
+# Values listed per facet by GET /api/facets (most common first) unless the
+# request gives a limit
+FACETS_MAX_VALUES = 50
+# HTTP caching of the article read endpoints (see routes.http_cache): ETags
+# name the snapshot and query, so a client revalidating with If-None-Match
+# gets a 304 until the store changes. Bodies of HTTP_COMPRESS_MIN_BYTES or
+# more are sent gzip- or brotli-encoded when the client accepts it (brotli
+# needs the optional brotli package). The encoded bodies of the last
+# HTTP_CACHE_ENTRIES responses for the current snapshot are kept
+HTTP_CACHE_CONTROL = "no-cache"
+HTTP_COMPRESS_MIN_BYTES = 1024
+HTTP_CACHE_ENTRIES = 32
@@ -0,0 +1,120 @@
+from bisect import bisect_left
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# Secondary indexes of an article snapshot (see pipelines.snapshot): for each
+# facet, value -> positions of the articles having it in snapshot.articles,
+# ascending, so any selection stays in newest-first order and a date range is
+# a slice of every position list. Filters and facet counts are answered from
+# these lists instead of a pass over the articles.
+#
+#   ai_category   set by /api/categorize
+#   source        feed name
+#   tag           feed tags and AI tags, lowercased
+#   day           UTC day of publication, YYYY-MM-DD
+
+FACETS = ("ai_category", "source", "tag", "day")
+
+
+@lru_cache(maxsize=4096)
+def _day(day_number: int) -> str:
+    return datetime.fromtimestamp(day_number * 86400, timezone.utc).strftime("%Y-%m-%d")
+
+
+def article_facet_values(article: Dict) -> Dict[str, Tuple[str, ...]]:
+    values = {}
+    if article.get("ai_category"):
+        values["ai_category"] = (article["ai_category"],)
+    if article.get("source"):
+        values["source"] = (article["source"],)
+    tags = {str(tag).strip().lower() for field in ("tags", "ai_tags")
+            for tag in (article.get(field) or []) if str(tag).strip()}
+    if tags:
+        values["tag"] = tuple(sorted(tags))
+    if article.get("published_ts") is not None:
+        # Unix time has no leap seconds: whole days since the epoch are UTC days
+        values["day"] = (_day(int(article["published_ts"] // 86400)),)
+    return values
+
+
+def matches_facets(article: Dict, filters: Dict[str, List[str]], match: str = "all") -> bool:
+    """Whether one article passes `filters` ({facet: [values]}), for articles outside an index."""
+    values = article_facet_values(article)
+    hits = (any(value in values.get(facet, ()) for value in wanted) for facet, wanted in filters.items())
+    return any(hits) if match == "any" else all(hits)
+
+
+class FacetIndex:
+    """Facet value -> article positions for one immutable list of articles."""
+
+    def __init__(self, articles: Sequence[Dict]):
+        self.size = len(articles)
+        lists = {facet: {} for facet in FACETS}
+        # Per article, the (facet, value) pairs it has: counts over a selection read these
+        self.doc_values: List[Tuple[Tuple[str, str], ...]] = []
+        for position, article in enumerate(articles):
+            pairs = []
+            for facet, values in article_facet_values(article).items():
+                for value in values:
+                    lists[facet].setdefault(value, []).append(position)
+                    pairs.append((facet, value))
+            self.doc_values.append(tuple(pairs))
+        self.values: Dict[str, Dict[str, Tuple[int, ...]]] = {
+            facet: {value: tuple(positions) for value, positions in by_value.items()}
+            for facet, by_value in lists.items()
+        }
+
+    def positions(self, facet: str, values: Iterable[str]) -> Tuple[int, ...]:
+        """Positions of the articles with any of `values` for `facet`."""
+        lists = [self.values[facet].get(value, ()) for value in values]
+        if len(lists) == 1:
+            return lists[0]
+        return tuple(sorted(set().union(*lists)))
+
+    def select(self, filters: Dict[str, List[str]], match: str = "all") -> Tuple[int, ...]:
+        """Positions passing `filters`: any of a facet's values, and every facet (or any, with match="any")."""
+        lists = [self.positions(facet, values) for facet, values in filters.items()]
+        if len(lists) == 1:
+            return lists[0]
+        if match == "any":
+            return tuple(sorted(set().union(*lists)))
+        lists.sort(key=len)
+        selected = set(lists[0])
+        for positions in lists[1:]:
+            selected.intersection_update(positions)
+        return tuple(sorted(selected))
+
+    def counts(self, selected: Optional[Sequence[int]] = None, start: int = 0, end: Optional[int] = None,
+               top: Optional[int] = None) -> Dict[str, List[Dict]]:
+        """Articles per facet value among `selected` (all articles if None) within positions [start, end).
+
+        Without a selection each count is a binary search in the value's
+        position list; with one, only the selected articles are read.
+        """
+        end = self.size if end is None else end
+        result = {}
+        if selected is None:
+            for facet, by_value in self.values.items():
+                counts = {}
+                for value, positions in by_value.items():
+                    count = bisect_left(positions, end) - bisect_left(positions, start)
+                    if count:
+                        counts[value] = count
+                result[facet] = counts
+        else:
+            result = {facet: {} for facet in FACETS}
+            for position in selected[bisect_left(selected, start):bisect_left(selected, end)]:
+                for facet, value in self.doc_values[position]:
+                    counts = result[facet]
+                    counts[value] = counts.get(value, 0) + 1
+
+        listed = {}
+        for facet, counts in result.items():
+            if facet == "day":
+                ordered = sorted(counts.items(), reverse=True)
+            else:
+                ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+            listed[facet] = [{"value": value, "count": count} for value, count in ordered[:top]]
+        return listed
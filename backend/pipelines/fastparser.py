@@ -0,0 +1,542 @@
+import re
+import xml.etree.ElementTree as ET
+from html.entities import html5, name2codepoint
+from typing import Dict, List, Optional, Tuple
+
+from feedparser import FeedParserDict
+
+# Fast path for parse_feed_body. feedparser runs every entry through a SAX
+# handler, an HTML sanitizer and a relative-URI resolver; for the handful of
+# fields build_article reads, most of that work is thrown away by clean_html.
+# parse_fast() reads well-formed RSS 2.0 and Atom 1.0 with an incremental
+# ElementTree parser and rebuilds the same entry dicts feedparser would, by
+# following its element handlers for the fields we use. Anything it does not
+# model exactly (other formats, other encodings, xml:base, xhtml content,
+# markup the sanitizer would rewrite, unknown extension elements that feed a
+# field we read, ...) makes it return None so the caller falls back to
+# feedparser.
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+XML_NS = "http://www.w3.org/XML/1998/namespace"
+
+try:
+    # feedparser internals, matching the feedparser version pinned in
+    # requirements.txt. Without them parse_fast declines every document and
+    # feedparser.parse reads them all
+    from feedparser.api import _FeedParserMixin
+    from feedparser.datetimes import _parse_date
+    from feedparser.mixin import _cp1252
+    from feedparser.urls import _urljoin, make_safe_absolute_uri
+
+    _NAMESPACES = {uri.lower(): prefix for uri, prefix in _FeedParserMixin.namespaces.items()}
+    _CAN_BE_RELATIVE_URI = _FeedParserMixin.can_be_relative_uri
+    _HTML_TYPES = _FeedParserMixin.html_types
+    # Element names feedparser has a handler for; others are stored under their own name
+    _HANDLED = {name.split("_", 2)[2].lower() for name in dir(_FeedParserMixin)
+                if name.startswith(("_start_", "_end_"))}
+    _AVAILABLE = True
+except (ImportError, AttributeError) as e:
+    print(f"Fast feed parser disabled, feedparser internals not found: {e}")
+    _AVAILABLE = False
+
+_XML_ENCODING_RE = re.compile(rb'^<\?.*encoding=[\'"](.*?)[\'"].*\?>')
+_EMAIL_RE = re.compile(r'''(([a-zA-Z0-9\_\-\.\+]+)@((\[[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.)|(([a-zA-Z0-9\-]+\.)+))([a-zA-Z]{2,4}|[0-9]{1,3})(\]?))(\?subject=\S+)?''')
+_LINK_REF_RE = re.compile("&([A-Za-z0-9_]+);")
+
+_TAG_RE = re.compile(r'<(?:!--[^<>]*?--|(/)?([A-Za-z][A-Za-z0-9]*)((?:\s[^<>]*)?)/?)>')
+_REF_RE = re.compile(r'&(?:#([0-9]+);|#[xX]([0-9A-Fa-f]+);|([A-Za-z][-.A-Za-z0-9]*)(;?))')
+_UNTERMINATED_CHARREF_RE = re.compile(r'&#[0-9]+(?![0-9;])|&#[xX][0-9A-Fa-f]+(?![0-9A-Fa-f;])')
+_LEGACY_ENTITIES = {name for name in html5 if not name.endswith(";")}
+_DROPPED_ELEMENTS = {"script", "style", "applet", "svg", "math"}
+
+# Content types parse_fast reads as-is: plain text, or HTML that passes _markup_is_plain
+_TEXT_TYPES = {"text/plain", "text/html"}
+
+_TITLE = {"title", "dc_title"}
+_DESCRIPTION = {"description", "dc_description", "media_description"}
+_CONTENT = {"content_encoded", "fullitem"}
+_PUBLISHED = {"published", "pubdate", "issued", "dcterms_issued"}
+_UPDATED = {"updated", "modified", "lastbuilddate", "dc_date", "dcterms_modified"}
+_AUTHOR = {"author", "managingeditor", "dc_author", "dc_creator"}
+_AUTHOR_FIELDS = {"name": "name", "email": "email", "uri": "href", "url": "href", "homepage": "href"}
+_CATEGORY = {"category", "keywords", "dc_subject", "media_category"}
+# Elements with a feedparser handler that only fills fields we never read
+_IGNORED = {"rights", "copyright", "dc_rights", "language", "dc_language", "created", "dcterms_created",
+            "expirationdate", "media_credit", "media_rating", "media_restriction", "media_license"}
+_IGNORED_TREES = {"contributor", "dc_contributor", "where", "georss_where", "georss_point", "georss_line",
+                  "georss_polygon", "georss_box", "georssgeom", "geom"}
+
+
+class Unsupported(Exception):
+    """The document needs something parse_fast does not model; use feedparser."""
+
+
+def _document_encoding(body: bytes, headers: Dict) -> str:
+    """Same choice of encoding as feedparser, limited to UTF-8 / ASCII XML media types."""
+    if body[:3] == b"\xef\xbb\xbf":
+        body = body[3:]
+    elif body[:2] in (b"\xfe\xff", b"\xff\xfe") or body[:4] in (b"\x00\x00\x00<", b"<\x00\x00\x00",
+                                                              b"\x00<\x00?", b"<\x00?\x00", b"Lo\xa7\x94"):
+        raise Unsupported("encoding")
+
+    match = _XML_ENCODING_RE.match(body)
+    xml_encoding = match.group(1).decode("utf-8", "replace").lower() if match else ""
+
+    # feedparser compares the media type case-sensitively; so do we
+    chunks = (headers.get("content-type") or "").split(";")
+    mime_type = chunks[0].strip()
+    charset = ""
+    for chunk in chunks[1:]:
+        key, _, value = chunk.partition("=")
+        if key.strip().lower() == "charset":
+            charset = value.strip().strip("\"'")
+
+    if mime_type in ("application/xml", "application/xml-dtd", "application/xml-external-parsed-entity") \
+            or (mime_type.startswith("application/") and mime_type.endswith("+xml")):
+        encoding = charset or xml_encoding or "utf-8"
+    elif mime_type in ("text/xml", "text/xml-external-parsed-entity") \
+            or (mime_type.startswith("text/") and mime_type.endswith("+xml")):
+        encoding = charset or "us-ascii"
+    else:
+        # feedparser flags anything else as bozo (not an XML media type)
+        raise Unsupported("content type")
+
+    if encoding.lower() not in ("utf-8", "utf8", "us-ascii", "ascii") \
+            or xml_encoding not in ("", "utf-8", "utf8", "us-ascii", "ascii"):
+        raise Unsupported("encoding")
+    try:
+        body.decode(encoding)
+    except (UnicodeDecodeError, LookupError):
+        raise Unsupported("encoding")
+    if b"<!DOCTYPE" in body[:4096] or b"<!ENTITY" in body[:4096]:
+        raise Unsupported("doctype")
+    return encoding
+
+
+def _fix_text(value: str) -> str:
+    # feedparser's last steps on every text value: undo UTF-8 read as Latin-1,
+    # then map stray windows-1252 characters
+    try:
+        value = value.encode("iso-8859-1").decode("utf-8")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        pass
+    return value.translate(_cp1252)
+
+
+def _markup_is_plain(value: str) -> bool:
+    """True if feedparser's HTML sanitizer would leave `value` reading the same after clean_html.
+
+    The sanitizer drops script/style bodies, comments and unknown entities,
+    and re-serializes tags; clean_html strips tags and unescapes entities. On
+    markup made only of simple tags and known entity references the two agree.
+    """
+    if "<" in value:
+        position = value.find("<")
+        while position != -1:
+            match = _TAG_RE.match(value, position)
+            if not match:
+                return False
+            if match.group(2):
+                if match.group(2).lower() in _DROPPED_ELEMENTS:
+                    return False
+                attributes = match.group(3)
+                if match.group(1) and attributes.strip():
+                    return False
+                if attributes.count('"') % 2 or attributes.count("'") % 2:
+                    return False
+            position = value.find("<", match.end())
+    if "&" in value:
+        for match in _REF_RE.finditer(value):
+            decimal, hexadecimal, name, semicolon = match.groups()
+            if name is None:
+                codepoint = int(decimal) if decimal is not None else int(hexadecimal, 16)
+                if codepoint < 32 and codepoint not in (9, 10, 13) or 0x7f <= codepoint < 0xa0 \
+                        or 0xd800 <= codepoint < 0xe000 or codepoint > 0x10ffff:
+                    return False
+            elif semicolon:
+                if name not in name2codepoint and name != "apos":
+                    return False
+            elif name in name2codepoint or name == "apos" \
+                    or any(name[:length] in _LEGACY_ENTITIES for length in range(2, len(name) + 1)):
+                return False
+        if _UNTERMINATED_CHARREF_RE.search(value):
+            return False
+    return True
+
+
+class _Feed:
+    """Document-level state: namespace prefixes and the base URI."""
+
+    def __init__(self, headers: Dict):
+        self.base = headers.get("content-location") or ""
+        if self.base:
+            self.base = make_safe_absolute_uri(self.base, self.base) or self.base
+        self.prefixes = {}  # unknown namespace URI -> declared prefix
+        self.unknown = {}  # prefix -> unknown namespace URI
+        self.known = set()  # prefixes declared for namespaces feedparser knows
+
+    def declare(self, prefix: str, uri: str):
+        # feedparser keeps one document-wide prefix table and names elements of
+        # namespaces it does not know by their prefix, so such prefixes must be
+        # unambiguous
+        lower = uri.lower()
+        if lower in _NAMESPACES or "backend.userland.com/rss" in lower:
+            self.known.add(prefix)
+        elif prefix:
+            if self.unknown.setdefault(prefix, uri) != uri or self.prefixes.setdefault(uri, prefix) != prefix:
+                raise Unsupported("ambiguous namespace prefix")
+        if self.known & set(self.unknown):
+            raise Unsupported("ambiguous namespace prefix")
+
+    def name(self, tag: str) -> str:
+        """feedparser's name for an element, e.g. "dc_creator" or "link"."""
+        if tag[0] != "{":
+            return tag.lower()
+        uri, local = tag[1:].split("}", 1)
+        lower = uri.lower()
+        if "backend.userland.com/rss" in lower:
+            lower = "http://backend.userland.com/rss"
+        prefix = _NAMESPACES.get(lower)
+        if prefix is None:
+            prefix = self.prefixes.get(uri, "").lower()
+        return f"{prefix}_{local.lower()}" if prefix else local.lower()
+
+    def attributes(self, element) -> Dict[str, str]:
+        attrs = {}
+        for key, value in element.attrib.items():
+            if key[0] == "{":
+                uri, local = key[1:].split("}", 1)
+                prefix = "xml" if uri == XML_NS else _NAMESPACES.get(uri.lower())
+                if not prefix:
+                    raise Unsupported("namespaced attribute")
+                key = f"{prefix}:{local}"
+            key = key.lower()
+            attrs[key] = value.lower() if key in ("rel", "type") else value
+        if "xml:base" in attrs or "base" in attrs:
+            raise Unsupported("xml:base")
+        return attrs
+
+
+class _EntryBuilder:
+    """Replays feedparser's element handlers for one <item>/<entry>."""
+
+    def __init__(self, feed: _Feed):
+        self.feed = feed
+        self.entry = FeedParserDict()
+        self.depths = {}
+        self.title_depth = -1
+        self.guidislink = False
+        self.has_content = False
+        self.in_author = False
+
+    # feedparser.mixin._FeedParserMixin.pop, for an element stored in the entry
+    def text(self, element, name: str, pieces: Optional[List[str]] = None, resolve: bool = True) -> str:
+        output = "".join(pieces) if pieces is not None else (element.text or "")
+        output = output.strip()
+        if resolve and name in _CAN_BE_RELATIVE_URI and output:
+            output = _urljoin(self.feed.base, output)
+        return _fix_text(output)
+
+    def store(self, key: str, value, depth: int):
+        old_depth = self.depths.get(key)
+        if old_depth is None or depth <= old_depth:
+            self.depths[key] = depth
+            self.entry[key] = value
+
+    def resolve(self, href: str) -> str:
+        return _urljoin(self.feed.base, href)
+
+    def leaf(self, element):
+        if len(element):
+            raise Unsupported("nested markup")
+
+    def content_type(self, attrs: Dict, default: str):
+        if "mode" in attrs or "src" in attrs:
+            raise Unsupported("content mode")
+        content_type = _FeedParserMixin.map_content_type(attrs.get("type", default))
+        if content_type not in _TEXT_TYPES:
+            raise Unsupported("content type")
+
+    def add_tag(self, term, scheme, label):
+        tags = self.entry.setdefault("tags", [])
+        if not term and not scheme and not label:
+            return
+        value = FeedParserDict(term=term, scheme=scheme, label=label)
+        if value not in tags:
+            tags.append(value)
+
+    def sync_author(self):
+        entry = self.entry
+        detail = entry.get("authors", [FeedParserDict()])[-1]
+        if detail:
+            name, email = detail.get("name"), detail.get("email")
+            if name and email:
+                entry["author"] = f"{name} ({email})"
+            elif name:
+                entry["author"] = name
+            elif email:
+                entry["author"] = email
+            return
+        author, email = entry.get("author"), None
+        if not author:
+            return
+        match = _EMAIL_RE.search(author)
+        if match:
+            email = match.group(0)
+            author = author.replace(email, "").replace("()", "").replace("<>", "").replace("&lt;&gt;", "").strip()
+            if author and author[0] == "(":
+                author = author[1:]
+            if author and author[-1] == ")":
+                author = author[:-1]
+            author = author.strip()
+        if author:
+            detail["name"] = author
+        if email:
+            detail["email"] = email
+
+    def save_author(self, key: str, value: str):
+        self.sync_author()
+        self.entry.setdefault("authors", [FeedParserDict()])
+        self.entry["authors"][-1][key] = value
+
+    def content(self, element, attrs: Dict, default_type: str, depth: int):
+        self.content_type(attrs, default_type)
+        self.has_content = True
+        value = self.text(element, "content")
+        self.entry.setdefault("content", [])
+        self.entry["content"].append(FeedParserDict(value=value))
+        self.entry.setdefault("summary", value)
+
+    def link(self, element, attrs: Dict, depth: int):
+        attrs.setdefault("rel", "alternate")
+        attrs.setdefault("type", "application/atom+xml" if attrs["rel"] == "self" else "text/html")
+        href = attrs.get("url", attrs.get("uri", attrs.get("href")))
+        if href:
+            attrs.pop("url", None)
+            attrs.pop("uri", None)
+            attrs["href"] = href
+        if "href" in attrs:
+            attrs["href"] = self.resolve(attrs["href"])
+        self.entry.setdefault("links", [])
+        self.entry["links"].append(FeedParserDict(attrs))
+        if "href" in attrs:
+            if attrs["rel"] == "alternate" and _FeedParserMixin.map_content_type(attrs["type"]) in _HTML_TYPES:
+                self.entry["link"] = attrs["href"]
+            if (element.text or "").strip():
+                raise Unsupported("link text")
+            return
+        output = self.text(element, "link")
+        output = _LINK_REF_RE.sub(r"&\g<1>", output.replace("&amp;", "&"))
+        self.entry["link"] = output
+        if output:
+            self.entry["links"][-1]["href"] = output
+
+    def element(self, element, depth: int):
+        name = self.feed.name(element.tag)
+        attrs = self.feed.attributes(element)
+        entry = self.entry
+
+        if name in _TITLE or name == "media_title":
+            self.leaf(element)
+            self.content_type(attrs, "text/plain")
+            value = self.text(element, "title")
+            if not -1 < self.title_depth <= depth:
+                self.store("title", value, depth)
+            if value and name != "media_title":
+                self.title_depth = depth
+        elif name == "link":
+            self.leaf(element)
+            self.link(element, attrs, depth)
+        elif name in ("guid", "id"):
+            self.leaf(element)
+            self.guidislink = attrs.get("ispermalink", "true") == "true"
+            value = self.text(element, "id", resolve=self.guidislink)
+            self.store("id", value, depth)
+            entry.setdefault("guidislink", self.guidislink and "link" not in entry)
+            if self.guidislink:
+                entry.setdefault("link", value)
+        elif name in _DESCRIPTION or name == "summary":
+            self.leaf(element)
+            if "summary" in entry and not self.has_content:
+                self.content(element, attrs, "text/plain", depth)
+            else:
+                self.content_type(attrs, "text/html" if name in _DESCRIPTION else "text/plain")
+                self.store("summary", self.text(element, "summary"), depth)
+        elif name in _CONTENT or name == "content":
+            self.leaf(element)
+            self.content(element, attrs, "text/html" if name in _CONTENT else "text/plain", depth)
+        elif name in _PUBLISHED or name in _UPDATED:
+            self.leaf(element)
+            key = "published" if name in _PUBLISHED else "updated"
+            value = self.text(element, key)
+            self.store(key, value, depth)
+            entry[f"{key}_parsed"] = _parse_date(value)
+        elif name in _AUTHOR:
+            if self.in_author:
+                raise Unsupported("nested author")
+            self.in_author = True
+            entry.setdefault("authors", [])
+            entry["authors"].append(FeedParserDict())
+            pieces = [element.text or ""]
+            for child in element:
+                child_name = self.feed.name(child.tag)
+                if child_name not in _AUTHOR_FIELDS and child_name in _HANDLED:
+                    raise Unsupported("author markup")
+                self.element(child, depth + 1)
+                pieces.append(child.tail or "")
+            self.store("author", self.text(element, "author", pieces), depth)
+            self.in_author = False
+            self.sync_author()
+        elif name in _AUTHOR_FIELDS:
+            self.leaf(element)
+            field = _AUTHOR_FIELDS[name]
+            if field == "href":
+                value = self.text(element, "href")
+                self.store("href", value, depth)
+            else:
+                # pushed without expecting text: feedparser returns it before any fix-ups
+                value = (element.text or "").strip()
+            if self.in_author:
+                self.save_author(field, value)
+        elif name in _CATEGORY:
+            self.leaf(element)
+            if name == "media_category":
+                attrs.setdefault("scheme", "http://search.yahoo.com/mrss/category_schema")
+            self.add_tag(attrs.get("term"), attrs.get("scheme", attrs.get("domain")), attrs.get("label"))
+            value = self.text(element, "category")
+            if value:
+                tags = entry["tags"]
+                if len(tags) and not tags[-1]["term"]:
+                    tags[-1]["term"] = value
+                else:
+                    self.add_tag(value, None, None)
+        elif name == "enclosure":
+            self.leaf(element)
+            if (element.text or "").strip():
+                raise Unsupported("enclosure text")
+            href = attrs.get("url", attrs.get("uri", attrs.get("href")))
+            if href:
+                attrs.pop("url", None)
+                attrs.pop("uri", None)
+                attrs["href"] = href
+            attrs["rel"] = "enclosure"
+            entry.setdefault("links", []).append(FeedParserDict(attrs))
+        elif name == "media_thumbnail":
+            self.leaf(element)
+            entry.setdefault("media_thumbnail", [])
+            entry["media_thumbnail"].append(attrs)
+            url = self.text(element, "url")
+            self.store("url", url, depth)
+            if url.strip() and "url" not in attrs:
+                attrs["url"] = url
+        elif name in ("media_content", "media_group"):
+            if (element.text or "").strip():
+                raise Unsupported("media text")
+            if name == "media_content":
+                entry.setdefault("media_content", [])
+                entry["media_content"].append(attrs)
+            for child in element:
+                self.element(child, depth + 1)
+        elif name == "source":
+            self.leaf(element)
+            self.title_depth = -1
+        elif name in _IGNORED:
+            self.leaf(element)
+        elif name in _IGNORED_TREES:
+            pass
+        elif name in _HANDLED:
+            raise Unsupported(f"<{name}>")
+        else:
+            # No feedparser handler: kept under its own name
+            self.leaf(element)
+            if attrs:
+                if (element.text or "").strip():
+                    raise Unsupported("element text")
+                entry[name] = attrs
+            else:
+                self.store(name, self.text(element, name), depth)
+
+    def build(self, element, depth: int) -> FeedParserDict:
+        attrs = self.feed.attributes(element)
+        if set(attrs) - {"xml:lang"}:
+            raise Unsupported("entry attributes")
+        if (element.text or "").strip():
+            raise Unsupported("entry text")
+        for child in element:
+            self.element(child, depth + 1)
+        for key in ("title", "summary"):
+            if key in self.entry and not _markup_is_plain(self.entry[key]):
+                raise Unsupported("markup")
+        if self.entry.get("content") and not _markup_is_plain(self.entry["content"][0]["value"]):
+            raise Unsupported("markup")
+        return self.entry
+
+
+def parse_fast(body: bytes, headers: Dict, chunk_size: int = 64 * 1024) -> Optional[Tuple[Optional[str], List]]:
+    """Parse a downloaded feed the way feedparser would, without feedparser.
+
+    Returns (feed title or None, entries) where entries are FeedParserDicts
+    carrying the fields parse_feed_body and build_article read, or None when
+    the document is outside what this parser reproduces exactly (including
+    anything feedparser would flag as bozo), or when feedparser's internals
+    are missing.
+    """
+    if not _AVAILABLE:
+        return None
+    try:
+        _document_encoding(body, headers)
+        feed = _Feed(headers)
+        parser = ET.XMLPullParser(events=("start", "end", "start-ns"))
+        entries = []
+        title = None
+        titles = 0
+        stack = []
+        entry_depth = None
+
+        for offset in range(0, len(body) or 1, chunk_size):
+            parser.feed(body[offset:offset + chunk_size])
+            for event, element in parser.read_events():
+                if event == "start-ns":
+                    feed.declare(*element)
+                elif event == "start":
+                    stack.append(element)
+                    depth = len(stack)
+                    if entry_depth is None or depth < entry_depth:
+                        feed.attributes(element)
+                    if depth == 1:
+                        if element.tag == "rss":
+                            entry_depth = 3
+                        elif element.tag == f"{{{ATOM_NS}}}feed":
+                            entry_depth = 2
+                        else:
+                            raise Unsupported("format")
+                    elif depth == 2 and entry_depth == 3 and element.tag != "channel":
+                        raise Unsupported("element outside channel")
+                else:
+                    depth = len(stack)
+                    stack.pop()
+                    if depth == entry_depth:
+                        name = feed.name(element.tag)
+                        if name in ("item", "entry"):
+                            entries.append(_EntryBuilder(feed).build(element, depth))
+                        elif name in ("title", "dc_title", "media_title"):
+                            titles += 1
+                            attrs = feed.attributes(element)
+                            if titles > 1 or len(element) or set(attrs) - {"type", "xml:lang"} \
+                                    or _FeedParserMixin.map_content_type(attrs.get("type", "text")) not in _TEXT_TYPES:
+                                raise Unsupported("feed title")
+                            title = _fix_text((element.text or "").strip())
+                            if "<" in title or "&" in title:
+                                raise Unsupported("feed title")
+                        elif name in ("content", "content_encoded", "fullitem", "body", "xhtml_body"):
+                            raise Unsupported("feed content")
+                        else:
+                            feed.attributes(element)
+                        element.clear()
+                    elif depth > entry_depth and feed.name(stack[entry_depth - 1].tag) not in ("item", "entry") \
+                            and feed.name(element.tag) in ("item", "entry"):
+                        raise Unsupported("misplaced entry")
+        parser.close()
+        return title, entries
+    except (ET.ParseError, Unsupported):
+        return None
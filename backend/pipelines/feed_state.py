@@ -0,0 +1,98 @@
+from typing import Dict, List, Optional
+from .config import (FEED_STATE_FILE, FETCH_POLL_TARGET, FETCH_POLL_MIN_INTERVAL, FETCH_POLL_MAX_INTERVAL,
+                     FETCH_POLL_SMOOTHING, FETCH_BREAKER_THRESHOLD, FETCH_BREAKER_BASE_DELAY,
+                     FETCH_BREAKER_MAX_DELAY)
+from .user_data import load_json_file, save_json_file
+
+
+# Per-feed state persisted between fetch runs, keyed by feed URL:
+# {
+#   "etag": "...",            # ETag from the last 200 response
+#   "last_modified": "...",   # Last-Modified from the last 200 response
+#   "content_hash": "...",    # sha256 of the last body we parsed
+#   "cutoff": 1735689600.0,   # start of the date window that body was filtered with
+#   "watermark": {            # newest entry seen so far (high-water mark)
+#       "id": "...",
+#       "published": 1735776000.0
+#   },
+#   "last_checked": "...",    # ISO time of the last successful check
+#   "last_polled": 1735776000.0,  # epoch of the last successful check
+#   "rate": 0.25,             # smoothed new articles per hour
+#   "next_poll": 1735779600.0,    # epoch before which the feed is not polled
+#   "failures": 0             # failed polls in a row; the circuit is open
+#                             # while >= FETCH_BREAKER_THRESHOLD
+# }
+
+
+def load_feed_state() -> Dict:
+    state = load_json_file(FEED_STATE_FILE, {"feeds": {}})
+    state.setdefault("feeds", {})
+    return state
+
+
+def save_feed_state(state: Dict) -> bool:
+    return save_json_file(FEED_STATE_FILE, state)
+
+
+def get_feed_entry(state: Dict, feed_url: str, cutoff: float) -> Dict:
+    """Return the mutable state entry for a feed, ready to pass to parse_feed.
+
+    Validators and the high-water mark are only reusable if the previous parse
+    covered at least the current date window; otherwise they would hide older
+    articles the caller now asks for, so they are dropped and the feed is
+    downloaded and walked in full. Its poll schedule is dropped too, so it is
+    due right away (an open circuit still holds).
+    """
+    entry = state["feeds"].setdefault(feed_url, {})
+    if entry.get("cutoff") is None or entry["cutoff"] > cutoff:
+        for key in ("etag", "last_modified", "content_hash", "watermark"):
+            entry.pop(key, None)
+        if entry.get("failures", 0) < FETCH_BREAKER_THRESHOLD:
+            entry.pop("next_poll", None)
+    return entry
+
+
+def feed_is_due(entry: Dict, now: float) -> bool:
+    """True if the feed's next poll time has come (or it has never been scheduled)."""
+    return entry.get("next_poll") is None or entry["next_poll"] <= now
+
+
+def schedule_next_poll(entry: Dict, stats: Dict, published: List[Optional[float]], now: float,
+                       window_start: float) -> bool:
+    """Set a feed's next poll time from the outcome of this one.
+
+    `published` holds the published_ts of the articles the poll returned (none
+    for an unchanged feed). The ones newer than the previous poll, or than
+    `window_start` for a first poll, give this poll's publish rate, which is
+    smoothed into entry["rate"]; the next poll is spaced to expect about
+    FETCH_POLL_TARGET new articles. A failure keeps the feed due, and opens its
+    circuit with exponential backoff once it keeps failing. A host asking us to
+    back off (Retry-After) is simply not polled before then.
+
+    Returns True if the feed's circuit is open after this poll.
+    """
+    status = stats.get("status")
+    if status not in ("ok", "not_modified"):
+        if stats.get("error") == "throttled" and stats.get("retry_after") is not None:
+            entry["next_poll"] = now + stats["retry_after"]
+            return False
+        failures = entry.get("failures", 0) + 1
+        entry["failures"] = failures
+        if failures >= FETCH_BREAKER_THRESHOLD:
+            delay = min(FETCH_BREAKER_BASE_DELAY * 2 ** (failures - FETCH_BREAKER_THRESHOLD), FETCH_BREAKER_MAX_DELAY)
+            entry["next_poll"] = now + delay
+            return True
+        entry.pop("next_poll", None)
+        return False
+
+    entry["failures"] = 0
+    since = entry.get("last_polled") or window_start
+    hours = max(now - since, 60.0) / 3600
+    observed = sum(1 for published_ts in published if published_ts is None or published_ts >= since) / hours
+    rate = entry.get("rate")
+    rate = observed if rate is None else FETCH_POLL_SMOOTHING * observed + (1 - FETCH_POLL_SMOOTHING) * rate
+    interval = FETCH_POLL_TARGET / rate * 3600 if rate > 0 else FETCH_POLL_MAX_INTERVAL
+    entry["rate"] = rate
+    entry["last_polled"] = now
+    entry["next_poll"] = now + min(max(interval, FETCH_POLL_MIN_INTERVAL), FETCH_POLL_MAX_INTERVAL)
+    return False
@@ -1,10 +1,110 @@
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict
-from .loader import load_sources, load_articles
+from typing import Optional, Dict, List, Iterator, Tuple, Set
+from .config import (FETCH_MAX_WORKERS, FETCH_PIPELINE, FETCH_RUN_DEADLINE, FETCH_STREAM_COMMIT,
+                     FETCH_ADAPTIVE_SCHEDULE)
+from .loader import load_sources, load_articles, insert_articles
+from .operations import append_pending_articles
 from .parser import parse_feed
+from .feed_state import load_feed_state, save_feed_state, get_feed_entry, feed_is_due, schedule_next_poll
+from .staged import iter_feed_results_staged
+from .http_client import check_interrupted
+from .source_health import source_record, record_source_runs
+from .scheduler import HostScheduler, run_scheduled
 
-def fetch_all_articles(max_sources: Optional[int] = None, days: int = 1, check_cancelled=None) -> Dict:
+
+def _fetch_source(feed_url: str, state: Optional[Dict] = None, cutoff: Optional[float] = None,
+                  known_ids: Optional[Set[str]] = None, deadline: Optional[float] = None) -> Tuple[List[Dict], Dict]:
+    stats = {}
+    articles = parse_feed(feed_url, state=state, stats=stats, cutoff=cutoff, known_ids=known_ids, deadline=deadline)
+    return articles, stats
+
+
+def iter_feed_results(sources: List[str], max_workers: int = FETCH_MAX_WORKERS, check_cancelled=None,
+                      feed_states: Optional[Dict[str, Dict]] = None, cutoff: Optional[float] = None,
+                      known_ids: Optional[Set[str]] = None,
+                      deadline: Optional[float] = None) -> Iterator[Tuple[str, List[Dict], Dict]]:
+    """Yield (feed_url, articles, stats) for every source, in the order of `sources`.
+
+    With max_workers > 1 the feeds are downloaded concurrently on a bounded
+    thread pool, but results are still handed out in source order so the merge
+    in fetch_all_articles stays deterministic. `feed_states` maps each URL to
+    its persisted state entry; `cutoff` and `known_ids` let parse_feed drop old
+    and already-stored entries before materializing them. On cancellation or
+    once `deadline` (time.monotonic()) has passed, in-flight downloads are
+    aborted, the feeds that already finished are still yielded, and iteration
+    stops.
+
+    Concurrent workers take their sources from a HostScheduler, which
+    interleaves hosts, rate-limits each one and honors Retry-After.
+    """
+    feed_states = feed_states or {}
+    if max_workers <= 1:
+        for feed_url in sources:
+            # Check for cancellation before processing each source
+            if check_interrupted(check_cancelled, deadline):
+                print("Fetch stopped during processing", flush=True)
+                return
+            yield (feed_url, *_fetch_source(feed_url, feed_states.get(feed_url), cutoff, known_ids, deadline))
+        return
+
+    def job(index: int):
+        feed_url = sources[index]
+        return _fetch_source(feed_url, feed_states.get(feed_url), cutoff, known_ids, deadline)
+
+    def deliver(index: int, articles, stats: Dict):
+        futures[index].set_result((articles or [], stats))
+
+    scheduler = HostScheduler(sources, deadline=deadline)
+    futures = [Future() for _ in sources]
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="feed-fetch")
+    try:
+        for _ in range(min(max_workers, len(sources))):
+            executor.submit(run_scheduled, scheduler, job, deliver)
+        for index, (feed_url, future) in enumerate(zip(sources, futures)):
+            # Poll so a cancel request or the run deadline is noticed while waiting on a slow feed
+            while True:
+                if check_interrupted(check_cancelled, deadline):
+                    print("Fetch stopped during processing", flush=True)
+                    # Hand out the feeds that already finished so they are kept
+                    for done_url, done_future in zip(sources[index:], futures[index:]):
+                        if done_future.done() and not done_future.cancelled():
+                            yield (done_url, *done_future.result())
+                    return
+                if future.done():
+                    break
+                wait([future], timeout=0.5)
+            yield (feed_url, *future.result())
+    finally:
+        # Drop feeds that have not started yet; in-flight ones were aborted above
+        scheduler.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_all_articles(max_sources: Optional[int] = None, days: int = 1, check_cancelled=None,
+                       max_workers: int = FETCH_MAX_WORKERS, pipeline: str = FETCH_PIPELINE,
+                       deadline: Optional[float] = FETCH_RUN_DEADLINE,
+                       stream_commit: bool = FETCH_STREAM_COMMIT,
+                       adaptive_schedule: bool = FETCH_ADAPTIVE_SCHEDULE) -> Dict:
+    """Fetch every source and merge the new articles into the stored ones.
+
+    `deadline` is the time budget of the whole run in seconds. When it runs out,
+    or `check_cancelled` returns True, in-flight downloads are aborted and the
+    articles gathered so far are returned, with "partial" set in the metadata.
+
+    New articles are merged into the stored list as each source finishes. With
+    `stream_commit` they are also appended to the pending file right away, so
+    a crash before the caller stores them loses nothing; the caller commits
+    result["added_articles"] and result["metadata"] through the article
+    writer, then clears the file with clear_pending_articles().
+
+    With `adaptive_schedule`, only sources that are due are polled: each
+    feed's next poll follows its publish rate, and feeds that keep failing are
+    held back by a circuit breaker (see feed_state.schedule_next_poll).
+    """
     sources = load_sources()
+    run_deadline = time.monotonic() + deadline if deadline else None
     
     if max_sources:
         sources = sources[:max_sources]
@@ -12,116 +112,175 @@ def fetch_all_articles(max_sources: Optional[int] = None, days: int = 1, check_c
     
     # Load existing articles to check for duplicates
     existing_data = load_articles()
-    existing_articles = existing_data.get('articles', []) if existing_data else []
-    existing_ids = {article.get('id') for article in existing_articles if article.get('id')}
+    # The stored list is newest first and is extended in place - PRESERVE ALL DATA
+    all_articles = existing_data.get('articles', []) if existing_data else []
+    existing_count = len(all_articles)
+    existing_ids = {article.get('id') for article in all_articles if article.get('id')}
     
     print(f"Found {len(existing_ids)} existing articles")
     
     # Calculate cutoff time based on days parameter
     cutoff_time = datetime.now() - timedelta(days=days)
-    print(f"Fetching articles from last {days} day(s)")
+    print(f"Fetching articles from last {days} day(s) with {max_workers} worker(s), {pipeline} pipeline")
+    
+    # Conditional GET validators from previous runs
+    feed_state = load_feed_state()
+    cutoff_ts = cutoff_time.timestamp()
+    feed_states = {feed_url: get_feed_entry(feed_state, feed_url, cutoff_ts) for feed_url in sources}
+    
+    skipped_not_due = 0
+    circuit_open = 0
+    if adaptive_schedule:
+        now = time.time()
+        due_sources = [feed_url for feed_url in sources if feed_is_due(feed_states[feed_url], now)]
+        skipped_not_due = len(sources) - len(due_sources)
+        circuit_open = sum(1 for feed_url in sources if feed_url not in due_sources
+                           and feed_states[feed_url].get("failures", 0) > 0)
+        print(f"{len(due_sources)}/{len(sources)} sources due ({circuit_open} held back after failures)")
+        sources = due_sources
     
-    all_articles = []
-    new_articles = []
+    new_count = 0
+    added_articles = []
     skipped_old = 0
     skipped_duplicate = 0
     successful_sources = 0
     failed_sources = 0
+    unchanged_sources = 0
+    skipped_unread = 0
+    source_bytes = {}
+    health_records = {}
+    processed_sources = 0
     
-    for feed_url in sources:
-        # Check for cancellation before processing each source
-        if check_cancelled and check_cancelled():
-            print("Fetch cancelled during processing", flush=True)
-            break
-            
-        articles = parse_feed(feed_url)
-        if articles:
+    if pipeline == "processes":
+        results = iter_feed_results_staged(sources, max_workers, check_cancelled, feed_states, cutoff_ts,
+                                           deadline=run_deadline)
+    else:
+        results = iter_feed_results(sources, max_workers, check_cancelled, feed_states, cutoff_ts, existing_ids,
+                                    deadline=run_deadline)
+    
+    for feed_url, articles, stats in results:
+        processed_sources += 1
+        source_bytes[feed_url] = stats.get("bytes_wire", 0)
+        
+        # A feed stopped by the end of the run is not to blame for it
+        run_stopped = stats.get("error") == "cancelled" or (
+            stats.get("error") == "timeout" and run_deadline is not None and time.monotonic() >= run_deadline)
+        published = []
+        source_articles = []
+        
+        if stats.get("status") == "not_modified":
+            unchanged_sources += 1
+            successful_sources += 1
+            feed_states[feed_url]["last_checked"] = datetime.now().isoformat()
+            health_records[feed_url] = source_record(stats, 0, 0)
+            if adaptive_schedule:
+                schedule_next_poll(feed_states[feed_url], stats, published, time.time(), cutoff_ts)
+            continue
+        
+        # Entries parse_feed rejected before materializing them (a feed with
+        # nothing new now legitimately returns no articles)
+        skipped_old += stats.get("skipped_old", 0)
+        skipped_duplicate += stats.get("skipped_duplicate", 0)
+        skipped_unread += stats.get("skipped_unread", 0)
+        
+        if stats.get("status") == "ok":
             for article in articles:
-                # Check for cancellation during article processing
-                if check_cancelled and check_cancelled():
-                    print("Fetch cancelled during article processing", flush=True)
-                    break
-                    
+                # Dated entries give the publish rate. Only those newer than the
+                # last poll count, and parse_feed only drops entries that were
+                # already stored or behind the high-water mark, i.e. older ones
+                if article.get('published_ts') is not None:
+                    published.append(article['published_ts'])
+                
                 # Skip duplicates
                 if article.get('id') in existing_ids:
                     skipped_duplicate += 1
                     continue
                 
-                # Check if article is from last 24 hours
-                published = article.get('published', '')
-                if published:
-                    try:
-                        # Parse various date formats
-                        from dateutil import parser as date_parser
-                        article_date = date_parser.parse(published)
-                        
-                        # Make timezone-naive for comparison
-                        if article_date.tzinfo:
-                            article_date = article_date.replace(tzinfo=None)
-                        
-                        if article_date < cutoff_time:
-                            skipped_old += 1
-                            continue
-                    except:
-                        # If date parsing fails, include the article
-                        pass
+                # Check if article is within the requested window
+                published_ts = article.get('published_ts')
+                if published_ts is not None and published_ts < cutoff_ts:
+                    skipped_old += 1
+                    continue
                 
-                new_articles.append(article)
+                source_articles.append(article)
+                existing_ids.add(article.get('id'))
+                if published_ts is None:
+                    published.append(None)
+            
+            # Merge this source right away; the sort cost is O(new articles)
+            insert_articles(all_articles, source_articles)
+            new_count += len(source_articles)
+            added_articles.extend(source_articles)
+            if stream_commit:
+                append_pending_articles(source_articles)
             
             successful_sources += 1
         else:
             failed_sources += 1
         
-        # Break out of outer loop if cancelled during article processing
-        if check_cancelled and check_cancelled():
-            break
-    
-    # Merge new articles with existing ones - PRESERVE ALL DATA
-    all_articles = []
-    
-    # Add existing articles first (preserve their categories and summaries)
-    for existing_article in existing_articles:
-        all_articles.append(existing_article)
+        if not run_stopped:
+            health_records[feed_url] = source_record(stats, len(articles), len(source_articles))
+        
+        # Only remember the validators once every article of this body was considered
+        if stats.get("status") == "ok":
+            feed_states[feed_url].update(stats["validators"])
+            feed_states[feed_url]["watermark"] = stats.get("watermark")
+            feed_states[feed_url]["cutoff"] = cutoff_ts
+            feed_states[feed_url]["last_checked"] = datetime.now().isoformat()
+        
+        if adaptive_schedule and not run_stopped:
+            now = time.time()
+            if schedule_next_poll(feed_states[feed_url], stats, published, now, cutoff_ts):
+                entry = feed_states[feed_url]
+                print(f"Circuit open after {entry['failures']} failures, next try in "
+                      f"{(entry['next_poll'] - now) / 3600:.1f}h: {feed_url}")
     
-    # Add new articles
-    for new_article in new_articles:
-        all_articles.append(new_article)
+    save_feed_state(feed_state)
+    record_source_runs(health_records)
     
-    # Sort by published date (newest first)
-    try:
-        from dateutil import parser as date_parser
-        def get_date(article):
-            try:
-                return date_parser.parse(article.get('published', ''))
-            except:
-                return datetime.min
-        
-        all_articles.sort(key=get_date, reverse=True)
-    except:
-        pass  # If sorting fails, keep original order
+    stop_reason = check_interrupted(check_cancelled, run_deadline) if processed_sources < len(sources) else None
+    if stop_reason:
+        print(f"Fetch {'cancelled' if stop_reason == 'cancelled' else 'ran out of time'} after "
+              f"{processed_sources}/{len(sources)} sources, keeping partial results", flush=True)
     
     result = {
         "articles": all_articles,
+        # Just the new ones, for get_article_writer().add_articles()
+        "added_articles": added_articles,
         "metadata": {
             "total_articles": len(all_articles),
-            "new_articles": len(new_articles),
-            "existing_articles": len(existing_articles),
+            "new_articles": new_count,
+            "existing_articles": existing_count,
             "skipped_old": skipped_old,
             "skipped_duplicate": skipped_duplicate,
-            "total_sources": len(sources),
+            "skipped_unread": skipped_unread,
+            "total_sources": len(sources) + skipped_not_due,
+            "scheduled_sources": len(sources),
+            "skipped_not_due": skipped_not_due,
+            "circuit_open": circuit_open,
+            "processed_sources": processed_sources,
+            "partial": processed_sources < len(sources),
+            "stop_reason": stop_reason,
             "successful_sources": successful_sources,
             "failed_sources": failed_sources,
+            "unchanged_sources": unchanged_sources,
+            "bytes_wire": sum(source_bytes.values()),
+            "source_bytes": source_bytes,
             "fetched_at": datetime.now().isoformat()
         }
     }
     
     print(f"Fetch Summary:")
-    print(f"New articles: {len(new_articles)}")
-    print(f"Existing articles: {len(existing_articles)}")
+    print(f"New articles: {new_count}")
+    print(f"Existing articles: {existing_count}")
     print(f"Skipped (old): {skipped_old}")
     print(f"Skipped (duplicate): {skipped_duplicate}")
+    print(f"Skipped (not read, past high-water mark): {skipped_unread}")
     print(f"Total articles: {len(all_articles)}")
+    print(f"Not due (skipped by schedule): {skipped_not_due}")
     print(f"Successful sources: {successful_sources}/{len(sources)}")
     print(f"Failed sources: {failed_sources}/{len(sources)}")
+    print(f"Unchanged sources: {unchanged_sources}/{len(sources)}")
+    print(f"Downloaded: {sum(source_bytes.values())} bytes")
     
     return result
\ No newline at end of file
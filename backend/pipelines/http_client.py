@@ -0,0 +1,253 @@
+import socket
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NameResolutionError
+from urllib3.util.connection import allowed_gai_family
+from typing import List, Optional, Tuple
+from .config import (FETCH_USER_AGENT, FETCH_CONNECTIONS_PER_HOST, FETCH_HOST_POOLS, DNS_CACHE_TTL,
+                     DNS_CACHE_ENTRIES, FETCH_RETRY_AFTER_DEFAULT)
+
+try:
+    # Optional: urllib3 decodes brotli bodies when one of these is installed
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+
+_session = None
+_session_lock = threading.Lock()
+
+# DNS answers for the feed session's connections only (see FeedAdapter); the
+# rest of the process resolves as usual
+_dns_cache: "OrderedDict[Tuple, Tuple[float, List[str]]]" = OrderedDict()
+_dns_lock = threading.Lock()
+
+
+_dns_timing = threading.local()
+
+
+def _resolve(host: str, port: int) -> List[str]:
+    """Addresses of `host`, cached for DNS_CACHE_TTL seconds (at most DNS_CACHE_ENTRIES hosts).
+
+    Several sources share a host (aws.amazon.com, infoworld.com, ...), so one
+    lookup per TTL is enough; failures are not cached.
+    """
+    key = (host, port)
+    now = time.monotonic()
+    with _dns_lock:
+        cached = _dns_cache.get(key)
+        if cached and cached[0] > now:
+            _dns_cache.move_to_end(key)
+            return cached[1]
+    try:
+        results = socket.getaddrinfo(host, port, allowed_gai_family(), socket.SOCK_STREAM)
+    finally:
+        _dns_timing.seconds = getattr(_dns_timing, "seconds", 0.0) + time.monotonic() - now
+    addresses = list(dict.fromkeys(sockaddr[0] for *_, sockaddr in results))
+    with _dns_lock:
+        _dns_cache[key] = (now + DNS_CACHE_TTL, addresses)
+        _dns_cache.move_to_end(key)
+        while len(_dns_cache) > DNS_CACHE_ENTRIES:
+            _dns_cache.popitem(last=False)
+    return addresses
+
+
+def dns_seconds(reset: bool = False) -> float:
+    """Time this thread has spent in DNS lookups (cache misses) since the last reset."""
+    seconds = getattr(_dns_timing, "seconds", 0.0)
+    if reset:
+        _dns_timing.seconds = 0.0
+    return seconds
+
+
+class _CachedDNSConnection:
+    """Connects to the cached addresses of the host; TLS still checks the host name."""
+
+    def _new_conn(self):
+        dns_host = self._dns_host
+        try:
+            addresses = _resolve(dns_host, self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        error = None
+        try:
+            for address in addresses:
+                # An address literal connects without another lookup
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except ConnectTimeoutError as e:
+                    # Refused or timed out (NewConnectionError is one too): try the next address
+                    error = e
+        finally:
+            self._dns_host = dns_host
+        raise error or OSError(f"No addresses for {dns_host}")
+
+
+class _FeedHTTPConnection(_CachedDNSConnection, HTTPConnection):
+    pass
+
+
+class _FeedHTTPSConnection(_CachedDNSConnection, HTTPSConnection):
+    pass
+
+
+class _FeedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _FeedHTTPConnection
+
+
+class _FeedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _FeedHTTPSConnection
+
+
+class FeedAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections resolve host names through the DNS cache."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _FeedHTTPConnectionPool,
+                                                   "https": _FeedHTTPSConnectionPool}
+
+
+def get_session() -> requests.Session:
+    """Process-wide HTTP session used for feed downloads.
+
+    Keeps connections alive across feeds, caps concurrent connections per host
+    at FETCH_CONNECTIONS_PER_HOST (extra requests wait for a free connection),
+    negotiates compressed transfer and caches DNS answers for DNS_CACHE_TTL.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            adapter = FeedAdapter(pool_connections=FETCH_HOST_POOLS,
+                                  pool_maxsize=FETCH_CONNECTIONS_PER_HOST,
+                                  pool_block=True)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({
+                "User-Agent": FETCH_USER_AGENT,
+                "Accept-Encoding": ACCEPT_ENCODING,
+                "Connection": "keep-alive",
+            })
+            _session = session
+        return _session
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Seconds a 429 / 503 response asks us to wait before the next request, else None.
+
+    Retry-After is either a number of seconds or an HTTP date. A 429 without
+    a usable value gets FETCH_RETRY_AFTER_DEFAULT; a bare 503 is a plain error.
+    """
+    if response.status_code not in (429, 503):
+        return None
+    value = (response.headers.get("Retry-After") or "").strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError, IndexError):
+        pass
+    return float(FETCH_RETRY_AFTER_DEFAULT) if response.status_code == 429 else None
+
+
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def _shutdown_response(response):
+    # Shutting the socket down wakes a thread blocked in recv() right away;
+    # closing the response from here would instead wait for that read to end.
+    # When the server answered with "Connection: close", http.client has
+    # already detached the socket from the connection and only the response's
+    # file object still holds it.
+    connection = getattr(response.raw, "_connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is None:
+        fp = getattr(getattr(response.raw, "_fp", None), "fp", None)
+        sock = getattr(getattr(fp, "raw", None), "_sock", None)
+    if sock is None:
+        return
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+class DownloadWatch:
+    """Context manager that bounds the body download of a streamed response.
+
+    The response is aborted when `budget` seconds have passed or when
+    abort_downloads() is called; `aborted` then holds the reason ("timeout" or
+    "cancelled"). A connection that ends without a Content-Length can look
+    like a normal EOF after the abort, so callers must check `aborted` after
+    reading.
+    """
+
+    def __init__(self, response: requests.Response, budget: float):
+        self.response = response
+        self.budget = max(0.0, budget)
+        self.aborted = None
+        self._timer = None
+
+    def abort(self, reason: str):
+        if self.aborted is None:
+            self.aborted = reason
+            _shutdown_response(self.response)
+
+    def __enter__(self):
+        with _in_flight_lock:
+            _in_flight.add(self)
+        self._timer = threading.Timer(self.budget, self.abort, args=("timeout",))
+        self._timer.daemon = True
+        self._timer.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._timer.cancel()
+        with _in_flight_lock:
+            _in_flight.discard(self)
+        return False
+
+
+def abort_downloads() -> int:
+    """Abort every feed body download in progress; returns how many were aborted."""
+    with _in_flight_lock:
+        watches = list(_in_flight)
+    for watch in watches:
+        watch.abort("cancelled")
+    return len(watches)
+
+
+def check_interrupted(check_cancelled=None, deadline: Optional[float] = None) -> Optional[str]:
+    """Return "cancelled" or "timeout" if a fetch run has to stop now, else None.
+
+    When it does, downloads still in progress are aborted so the run stops
+    immediately instead of waiting for slow servers.
+    """
+    if check_cancelled and check_cancelled():
+        reason = "cancelled"
+    elif deadline is not None and time.monotonic() >= deadline:
+        reason = "timeout"
+    else:
+        return None
+    abort_downloads()
+    return reason
@@ -1,6 +1,9 @@
 import json
-from typing import List, Dict, Optional
-from .config import SOURCES_FILE, FETCHED_DATA_DIR
+from bisect import insort
+from typing import List, Dict, Optional, Tuple
+from .config import SOURCES_FILE, FETCHED_DATA_DIR, PENDING_ARTICLES_FILE
+from .parser import parse_published, published_fields, published_sort_key
+from .store import get_article_store, JsonArticleStore
 
 
 def load_sources() -> List[str]:
@@ -20,20 +23,100 @@ def load_sources() -> List[str]:
         return []
 
 
-def load_articles(filename: str = "articles.json") -> Optional[Dict]:
+def load_articles(filename: str = "articles.json", pending: Optional[List[Dict]] = None) -> Optional[Dict]:
+    """The stored corpus as {"articles": [...newest first...], "metadata": {...}, ...}.
+
+    Reads the configured article store (see pipelines.store); another
+    `filename` reads that JSON file under fetched_data/ instead. `pending`
+    replaces the articles read from the pending file.
+    """
     try:
-        file_path = FETCHED_DATA_DIR / filename
+        store = get_article_store() if filename == "articles.json" else JsonArticleStore(FETCHED_DATA_DIR / filename)
+        pending = load_pending_articles() if pending is None else pending
+        data = store.load()
+        
+        if data is None:
+            if not pending:
+                print(f"No saved articles found in {store}")
+                return None
+            data = {"articles": [], "metadata": {"total_articles": 0}}
         
-        if not file_path.exists():
-            print(f"No saved articles found at {file_path}")
-            return None
+        migrate_articles(data)
         
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Articles committed by a fetch that has not stored them yet
+        if pending:
+            known_ids = {article.get('id') for article in data['articles']}
+            insert_articles(data['articles'], [a for a in pending if a.get('id') not in known_ids])
+        # Stored metadata is written with the last fetch; patches since may have added articles
+        data.setdefault('metadata', {})['total_articles'] = len(data['articles'])
         
-        print(f"Loaded {data['metadata']['total_articles']} articles from {file_path}")
+        print(f"Loaded {data['metadata']['total_articles']} articles from {store}")
         return data
         
     except Exception as e:
         print(f"Error loading articles: {e}")
         return None
+
+
+def load_pending_articles() -> List[Dict]:
+    articles, _ = read_pending_articles()
+    if articles:
+        print(f"Found {len(articles)} pending articles in {PENDING_ARTICLES_FILE}")
+    return articles
+
+
+def read_pending_articles(offset: int = 0) -> Tuple[List[Dict], int]:
+    """The pending articles from byte `offset` on, and the offset just past the last complete line.
+
+    A line still being appended is left for the next read.
+    """
+    try:
+        with open(PENDING_ARTICLES_FILE, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], 0
+    
+    complete = data[:data.rfind(b"\n") + 1]
+    articles = []
+    for line in complete.splitlines():
+        try:
+            articles.append(json.loads(line))
+        except json.JSONDecodeError:
+            # A crash mid-append leaves at most one torn line at the end
+            continue
+    return articles, offset + len(complete)
+
+
+def insert_articles(articles: List[Dict], new_articles: List[Dict]) -> None:
+    """Insert new articles into a newest-first list in place.
+
+    Only the new articles are sorted; each one is then placed with a binary
+    search, so the cost grows with the number of new articles instead of the
+    size of the corpus.
+    """
+    new_articles = sorted(new_articles, key=published_sort_key)
+    for article in new_articles:
+        insort(articles, article, key=published_sort_key)
+
+
+def migrate_articles(data: Dict) -> bool:
+    """Add the normalized published_ts/published_iso fields to older records.
+
+    Records saved before the fields existed are parsed once here and the list is
+    re-sorted newest first; the result is persisted with the next save. Returns
+    True if anything changed.
+    """
+    articles = data.get('articles', [])
+    migrated = 0
+    
+    for article in articles:
+        if 'published_ts' not in article:
+            article.update(published_fields(parse_published(article.get('published', ''))))
+            migrated += 1
+    
+    if migrated:
+        articles.sort(key=published_sort_key)
+        print(f"Migrated published dates of {migrated} articles")
+    
+    return migrated > 0
@@ -1,20 +1,60 @@
 import json
-from typing import Dict
-from .config import FETCHED_DATA_DIR
+import os
+from typing import Dict, List
+from .config import FETCHED_DATA_DIR, PENDING_ARTICLES_FILE
+from .store import get_article_store, JsonArticleStore, bump_store_version
 
 
 def save_articles(articles_data: Dict, filename: str = "articles.json") -> bool:
+    """Replace the stored corpus with `articles_data` (see load_articles).
+
+    With the SQLite store only the rows that changed are written. This
+    replaces everything, so it is meant for tools and imports; the app
+    stores its changes as patches through pipelines.writer.
+    """
     try:
-        FETCHED_DATA_DIR.mkdir(exist_ok=True)
+        store = get_article_store() if filename == "articles.json" else JsonArticleStore(FETCHED_DATA_DIR / filename)
+        store.save(articles_data)
         
-        output_path = FETCHED_DATA_DIR / filename
+        print(f"Articles saved to {store}")
+        return True
+        
+    except Exception as e:
+        print(f"Error saving articles: {e}")
+        return False
+
+
+def append_pending_articles(articles: List[Dict]) -> bool:
+    """Durably append newly fetched articles, one JSON object per line.
+
+    load_articles folds these into the snapshot, so they survive a crash
+    before the fetch commits them to the store. The store version is left
+    alone: get_snapshot() notices the file grew and adds just the new lines.
+    """
+    if not articles:
+        return True
+    try:
+        FETCHED_DATA_DIR.mkdir(exist_ok=True)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(articles_data, f, indent=2, ensure_ascii=False)
+        with open(PENDING_ARTICLES_FILE, 'a', encoding='utf-8') as f:
+            for article in articles:
+                f.write(json.dumps(article, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
         
-        print(f"Articles saved to {output_path}")
         return True
         
     except Exception as e:
-        print(f"Error saving articles: {e}")
+        print(f"Error appending pending articles: {e}")
+        return False
+
+
+def clear_pending_articles() -> bool:
+    """Drop the pending file once a saved snapshot contains its articles."""
+    try:
+        PENDING_ARTICLES_FILE.unlink(missing_ok=True)
+        bump_store_version()
+        return True
+    except Exception as e:
+        print(f"Error clearing pending articles: {e}")
         return False
@@ -1,105 +1,423 @@
 import feedparser
-from datetime import datetime
-from typing import List, Dict
+import calendar
+import hashlib
+import requests
+import time
+from datetime import datetime, timezone
+from dateutil import parser as date_parser
+from typing import List, Dict, Optional, Set, Tuple
 import re
 from html import unescape
+from .config import FETCH_FEED_TIMEOUT, FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT, FETCH_FAST_PARSER
+from .http_client import get_session, DownloadWatch, retry_after_seconds, dns_seconds
+from .fastparser import parse_fast
 
 
-def clean_html(text: str) -> str:
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def clean_html(text: str, limit: Optional[int] = None, chunk_size: int = 8 * 1024) -> str:
+    """Visible text of an HTML fragment: tags removed, entities decoded, whitespace collapsed.
+
+    Tags are stripped before entities are decoded, so escaped markup such as
+    "&lt;b&gt;" stays in the text. With `limit` the result equals
+    clean_html(text)[:limit], but long bodies are read chunk by chunk and only
+    until `limit` visible characters have been produced.
+    """
     if not text:
         return ""
+    if limit is None or len(text) <= chunk_size:
+        return " ".join(unescape(_TAG_RE.sub("", text)).split())[:limit]
+
+    words = []
+    size = -1  # len(" ".join(words))
+    pending = ""  # tag-free text not decoded yet; may end inside an entity
+    position = 0
+    while position < len(text) and size < limit:
+        end = min(position + chunk_size, len(text))
+        # Never split a tag: extend the chunk to the ">" closing its last "<"
+        opening = text.rfind("<", position, end)
+        if opening != -1 and text.find(">", opening, end) == -1:
+            closing = text.find(">", end)
+            end = closing + 1 if closing != -1 else len(text)
+        pending += _TAG_RE.sub("", text[position:end])
+        position = end
+        # Entities never contain a space or newline, so the text up to the
+        # last one can be decoded on its own and its words are complete
+        cut = max(pending.rfind(" "), pending.rfind("\n")) + 1 if position < len(text) else len(pending)
+        for word in unescape(pending[:cut]).split():
+            words.append(word)
+            size += len(word) + 1
+        pending = pending[cut:]
+    return " ".join(words)[:limit]
+
+
+def _elapsed_ms(since: float) -> float:
+    return round((time.monotonic() - since) * 1000, 1)
+
+
+def entry_timestamp(entry) -> Optional[float]:
+    """UTC epoch of the date `parse_feed` reports as "published", if feedparser could parse it."""
+    parsed = entry.get("published_parsed") if "published" in entry else entry.get("updated_parsed")
+    if not parsed:
+        return None
+    return float(calendar.timegm(parsed))
+
+
+def parse_published(value: str) -> Optional[float]:
+    """Parse a feed date string to a UTC epoch; naive dates are taken as UTC."""
+    if not value:
+        return None
+    try:
+        parsed = date_parser.parse(value)
+        if not parsed.tzinfo:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def published_fields(published_ts: Optional[float]) -> Dict:
+    """The normalized date fields stored next to the raw "published" string."""
+    if published_ts is None:
+        return {"published_ts": None, "published_iso": ""}
+    return {
+        "published_ts": published_ts,
+        "published_iso": datetime.fromtimestamp(published_ts, timezone.utc).isoformat()
+    }
+
+
+def published_sort_key(article: Dict) -> float:
+    """Key that orders articles newest first, undated ones last."""
+    published_ts = article.get("published_ts")
+    return -published_ts if published_ts is not None else float("inf")
+
+
+def build_article(entry, entry_id: str, feed_url: str, source_name: str, fetched_at: str,
+                  published_ts: Optional[float] = None) -> Dict:
+    author = entry.get("author", "")
+    if not author and "authors" in entry:
+        author = ", ".join([a.get("name", "") for a in entry.authors if a.get("name")])
+
+    tags = []
+    if "tags" in entry:
+        tags = [tag.get("term", "") for tag in entry.tags if tag.get("term")]
+    
+    # Extract image URL
+    image_url = ""
+    
+    # Try media_thumbnail
+    if "media_thumbnail" in entry and entry.media_thumbnail:
+        image_url = entry.media_thumbnail[0].get("url", "")
+    
+    # Try media_content
+    elif "media_content" in entry and entry.media_content:
+        for media in entry.media_content:
+            if media.get("medium") == "image" or media.get("type", "").startswith("image/"):
+                image_url = media.get("url", "")
+                break
     
-    # Unescape HTML entities
-    text = unescape(text)
+    # Try enclosures
+    elif "enclosures" in entry:
+        for enclosure in entry.enclosures:
+            if enclosure.get("type", "").startswith("image/"):
+                image_url = enclosure.get("href", "")
+                break
     
-    # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
+    # Try links
+    elif "links" in entry:
+        for link in entry.links:
+            if link.get("type", "").startswith("image/"):
+                image_url = link.get("href", "")
+                break
     
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
+    # Extract and clean summary/content
+    summary = entry.get("summary", entry.get("description", ""))
+    content = entry.get("content", [{}])[0].get("value", "") if entry.get("content") else ""
     
-    return text.strip()
+    # Clean HTML from summary and content
+    summary_clean = clean_html(summary, 500)
+    content_clean = clean_html(content, 1000)
 
+    published = entry.get("published", entry.get("updated", ""))
+    if published_ts is None:
+        published_ts = parse_published(published)
+    
+    article = {
+        "id": entry_id,
+        "title": clean_html(entry.get("title", "No Title")),
+        "link": entry.get("link", ""),
+        "published": published,
+        **published_fields(published_ts),
+        "summary": summary_clean,
+        "content": content_clean,
+        "author": author,
+        "tags": tags,
+        "image_url": image_url,
+        "source": source_name,
+        "feed_url": feed_url,
+        "fetched_at": fetched_at
+    }
+    
+    return article
 
-def parse_feed(feed_url: str, timeout: int = 50) -> List[Dict]:
-    articles = []
 
+def download_feed(feed_url: str, timeout: float = FETCH_FEED_TIMEOUT, state: Optional[Dict] = None,
+                  stats: Optional[Dict] = None, deadline: Optional[float] = None) -> Optional[Dict]:
+    """I/O stage: download one feed's raw bytes.
+
+    `state` is the feed's persisted cache entry (see pipelines.feed_state). Its
+    ETag / Last-Modified validators are sent with the request, and a 304 or a
+    body identical to the last one short-circuits before any XML parsing.
+
+    Returns {"body", "headers", "validators"} for a changed feed, or None
+    when it is unchanged or failed; `stats["status"]` says which. Downloads go
+    through the shared pooled session, and `stats` also receives "bytes_wire"
+    (compressed bytes received) and "bytes_body" (decoded size).
+
+    The whole download gets `timeout` seconds, cut short by `deadline` (a
+    time.monotonic() value, e.g. the end of the fetch run). Connecting and each
+    socket read are bounded by FETCH_CONNECT_TIMEOUT / FETCH_READ_TIMEOUT, the
+    body transfer by a DownloadWatch, and abort_downloads() interrupts it.
+    `stats["error"]` is "timeout" or "cancelled" when the budget ran out,
+    "throttled" for a 429 / 503 asking to back off, with the wait in
+    `stats["retry_after"]` (see pipelines.scheduler), or else the exception
+    class (e.g. "HTTPError", "ConnectionError").
+
+    Timings go to "dns_ms", "connect_ms" (connection, TLS and the wait for the
+    response headers) and "download_ms" (the body transfer).
+    """
+    state = state if state is not None else {}
+    stats = stats if stats is not None else {}
+    stats["status"] = "failed"
+    
+    feed_deadline = time.monotonic() + timeout
+    if deadline is not None:
+        feed_deadline = min(feed_deadline, deadline)
+    remaining = feed_deadline - time.monotonic()
+    if remaining <= 0:
+        print(f"Skipped (out of time): {feed_url}")
+        stats["error"] = "timeout"
+        return None
+
+    started = None
     try:
         print(f"Fetching: {feed_url}")
-        feed = feedparser.parse(feed_url, request_headers={'User-Agent': 'Mozilla/5.0'})
-        
-        if feed.bozo:
-            print(f"Failed to parse: {feed_url}")
-            return articles
-        
-        source_name = feed.feed.get("title", feed_url.split('/')[2] if '/' in feed_url else "Unknown")
+        request_timeout = (min(FETCH_CONNECT_TIMEOUT, remaining), min(FETCH_READ_TIMEOUT, remaining))
+        headers = {}
+        if state.get("etag"):
+            headers['If-None-Match'] = state["etag"]
+        if state.get("last_modified"):
+            headers['If-Modified-Since'] = state["last_modified"]
         
-        for entry in feed.entries:
-            author = entry.get("author", "")
-            if not author and "authors" in entry:
-                author = ", ".join([a.get("name", "") for a in entry.authors if a.get("name")])
+        started = time.monotonic()
+        dns_seconds(reset=True)
+        with get_session().get(feed_url, headers=headers, timeout=request_timeout, stream=True) as response:
+            stats["http_status"] = response.status_code
+            stats["dns_ms"] = round(dns_seconds() * 1000, 1)
+            stats["connect_ms"] = round(_elapsed_ms(started) - stats["dns_ms"], 1)
             
-            tags = []
-            if "tags" in entry:
-                tags = [tag.get("term", "") for tag in entry.tags if tag.get("term")]
+            if response.status_code == 304:
+                print(f"Not modified: {feed_url}")
+                stats["status"] = "not_modified"
+                stats["bytes_wire"] = 0
+                return None
             
-            # Extract image URL
-            image_url = ""
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                print(f"Throttled ({response.status_code}, retry after {retry_after:.0f}s): {feed_url}")
+                stats["error"] = "throttled"
+                stats["retry_after"] = retry_after
+                return None
             
-            # Try media_thumbnail
-            if "media_thumbnail" in entry and entry.media_thumbnail:
-                image_url = entry.media_thumbnail[0].get("url", "")
+            response.raise_for_status()
+            chunks = []
+            download_started = time.monotonic()
+            with DownloadWatch(response, feed_deadline - time.monotonic()) as watch:
+                try:
+                    for chunk in response.raw.stream(64 * 1024, decode_content=True):
+                        chunks.append(chunk)
+                except Exception:
+                    if not watch.aborted:
+                        raise
+            stats["download_ms"] = _elapsed_ms(download_started)
+            if watch.aborted:
+                print(f"Download {'cancelled' if watch.aborted == 'cancelled' else 'timed out'}: {feed_url}")
+                stats["error"] = watch.aborted
+                return None
+            body = b"".join(chunks)
+            # tell() counts what came off the socket, i.e. before gzip/br decoding
+            stats["bytes_wire"] = response.raw.tell()
+            stats["bytes_body"] = len(body)
+            response_url = response.url
+            response_headers = response.headers
+        
+        # Servers without validators (or with weak ones) often resend the same body
+        content_hash = hashlib.sha256(body).hexdigest()
+        if content_hash == state.get("content_hash"):
+            print(f"Unchanged: {feed_url}")
+            stats["status"] = "not_modified"
+            return None
+        
+        stats["status"] = "downloaded"
+        return {
+            "body": body,
+            "headers": {
+                'content-location': response_url,
+                'content-type': response_headers.get('Content-Type', ''),
+                'content-language': response_headers.get('Content-Language', ''),
+            },
+            "validators": {
+                "etag": response_headers.get('ETag'),
+                "last_modified": response_headers.get('Last-Modified'),
+                "content_hash": content_hash,
+            }
+        }
+        
+    except requests.Timeout as e:
+        print(f"Timed out fetching feed {feed_url}: {e}")
+        stats["error"] = "timeout"
+        return None
+    except Exception as e:
+        print(f"Error fetching feed {feed_url}: {e}")
+        stats["error"] = type(e).__name__
+        return None
+    finally:
+        # A connection that failed before any response still took this long
+        if started is not None and "connect_ms" not in stats:
+            stats["dns_ms"] = round(dns_seconds() * 1000, 1)
+            stats["connect_ms"] = round(_elapsed_ms(started) - stats["dns_ms"], 1)
+
+
+def parse_feed_body(feed_url: str, download: Dict, state: Optional[Dict] = None, stats: Optional[Dict] = None,
+                    cutoff: Optional[float] = None, known_ids: Optional[Set[str]] = None,
+                    fast_parser: bool = FETCH_FAST_PARSER) -> List[Dict]:
+    """CPU stage: run feedparser and normalize the entries of a downloaded feed.
+
+    With `fast_parser`, plain RSS 2.0 / Atom is read by fastparser.parse_fast
+    instead, which yields the same entries; feedparser still handles every
+    document it declines. `stats["parser"]` says which one was used, and
+    "parse_ms" / "normalize_ms" time the parse and the entry walk; "entries"
+    counts the feed's entries.
+
+    Entries older than `cutoff` (UTC epoch), already seen (in `known_ids` or the
+    stored high-water id) or older than the stored high-water time are rejected
+    before any HTML cleaning, and the walk stops at the first such entry while
+    the feed is newest-first. The per-feed skip counters, the new "watermark"
+    and the download's "validators" are reported in `stats`.
+    """
+    articles = []
+    state = state if state is not None else {}
+    stats = stats if stats is not None else {}
+    stats["status"] = "failed"
+
+    try:
+        started = time.monotonic()
+        parsed = parse_fast(download["body"], download["headers"]) if fast_parser else None
+        if parsed is not None:
+            feed_title, entries = parsed
+            stats["parser"] = "fast"
+        else:
+            feed = feedparser.parse(download["body"], response_headers=download["headers"])
             
-            # Try media_content
-            elif "media_content" in entry and entry.media_content:
-                for media in entry.media_content:
-                    if media.get("medium") == "image" or media.get("type", "").startswith("image/"):
-                        image_url = media.get("url", "")
-                        break
+            if feed.bozo:
+                print(f"Failed to parse: {feed_url}")
+                stats["error"] = "parse"
+                stats["parse_ms"] = _elapsed_ms(started)
+                return articles
             
-            # Try enclosures
-            elif "enclosures" in entry:
-                for enclosure in entry.enclosures:
-                    if enclosure.get("type", "").startswith("image/"):
-                        image_url = enclosure.get("href", "")
-                        break
+            feed_title, entries = feed.feed.get("title"), feed.entries
+            stats["parser"] = "feedparser"
+        stats["parse_ms"] = _elapsed_ms(started)
+        stats["entries"] = len(entries)
+        started = time.monotonic()
+        
+        source_name = feed_title if feed_title is not None else (feed_url.split('/')[2] if '/' in feed_url else "Unknown")
+        
+        watermark = state.get("watermark") or {}
+        fetched_at = datetime.now().isoformat()
+        skipped_old = skipped_duplicate = skipped_unread = 0
+        newest_id, newest_ts = None, None
+        previous_ts = None
+        ordered = True
+        
+        for index, entry in enumerate(entries):
+            # Cheap checks first: only entries that survive them get cleaned and materialized
+            entry_id = entry.get("id", entry.get("link", ""))
+            entry_ts = entry_timestamp(entry)
             
-            # Try links
-            elif "links" in entry:
-                for link in entry.links:
-                    if link.get("type", "").startswith("image/"):
-                        image_url = link.get("href", "")
-                        break
+            if entry_ts is not None:
+                if newest_ts is None or entry_ts > newest_ts:
+                    newest_id, newest_ts = entry_id, entry_ts
+                # Early termination is only safe while the feed is newest-first
+                if previous_ts is not None and entry_ts > previous_ts:
+                    ordered = False
+                previous_ts = entry_ts
             
-            # Extract and clean summary/content
-            summary = entry.get("summary", entry.get("description", ""))
-            content = entry.get("content", [{}])[0].get("value", "") if entry.get("content") else ""
+            seen = (known_ids is not None and entry_id in known_ids) or entry_id == watermark.get("id")
+            too_old = entry_ts is not None and cutoff is not None and entry_ts < cutoff
+            below_watermark = entry_ts is not None and watermark.get("published") is not None \
+                and entry_ts < watermark["published"]
             
-            # Clean HTML from summary and content
-            summary_clean = clean_html(summary)[:500]
-            content_clean = clean_html(content)[:1000]
+            if seen or too_old or below_watermark:
+                if too_old:
+                    skipped_old += 1
+                else:
+                    skipped_duplicate += 1
+                # Everything below an already-seen entry was walked last run, but only
+                # if that run covered this window (the watermark is kept only then)
+                if ordered and (too_old or watermark):
+                    skipped_unread = len(entries) - index - 1
+                    break
+                continue
             
-            article = {
-                "id": entry.get("id", entry.get("link", "")),
-                "title": clean_html(entry.get("title", "No Title")),
-                "link": entry.get("link", ""),
-                "published": entry.get("published", entry.get("updated", "")),
-                "summary": summary_clean,
-                "content": content_clean,
-                "author": author,
-                "tags": tags,
-                "image_url": image_url,
-                "source": source_name,
-                "feed_url": feed_url,
-                "fetched_at": datetime.now().isoformat()
-            }
+            article = build_article(entry, entry_id, feed_url, source_name, fetched_at, entry_ts)
             
             if article["title"] and article["link"]:
                 articles.append(article)
         
+        stats["normalize_ms"] = _elapsed_ms(started)
+        stats["skipped_old"] = skipped_old
+        stats["skipped_duplicate"] = skipped_duplicate
+        stats["skipped_unread"] = skipped_unread
+        if newest_ts is not None and newest_ts >= watermark.get("published", newest_ts):
+            stats["watermark"] = {"id": newest_id, "published": newest_ts}
+        else:
+            stats["watermark"] = watermark or None
+        
         print(f"Fetched {len(articles)} articles from {source_name}")
         
+        stats["status"] = "ok"
+        stats["validators"] = download["validators"]
+        
     except Exception as e:
         print(f"Error parsing feed {feed_url}: {e}")
+        stats["error"] = type(e).__name__
     
     return articles
+
+
+def parse_feed_job(feed_url: str, download: Dict, state: Optional[Dict] = None,
+                   cutoff: Optional[float] = None) -> Tuple[List[Dict], Dict]:
+    """Picklable wrapper around parse_feed_body for a process pool; returns (articles, stats)."""
+    stats = {}
+    articles = parse_feed_body(feed_url, download, state=state, stats=stats, cutoff=cutoff)
+    return articles, stats
+
+
+def parse_feed(feed_url: str, timeout: float = FETCH_FEED_TIMEOUT, state: Optional[Dict] = None, stats: Optional[Dict] = None,
+               cutoff: Optional[float] = None, known_ids: Optional[Set[str]] = None,
+               deadline: Optional[float] = None) -> List[Dict]:
+    """Download and parse one feed (download_feed followed by parse_feed_body).
+
+    `stats`, if given, receives "status" ("ok", "not_modified" or "failed"),
+    "http_status" and, after a successful parse, the new "validators" and
+    "watermark". They are not written back to `state` here: the caller commits
+    them once it has actually consumed the articles, so a cancelled run never
+    marks a feed as seen.
+    """
+    stats = stats if stats is not None else {}
+    download = download_feed(feed_url, timeout=timeout, state=state, stats=stats, deadline=deadline)
+    if download is None:
+        return []
+    return parse_feed_body(feed_url, download, state=state, stats=stats, cutoff=cutoff, known_ids=known_ids)
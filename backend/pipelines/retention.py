@@ -0,0 +1,94 @@
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from .archive import archive_articles
+from .config import ARCHIVE_ENABLED
+from .loader import load_articles
+from .user_data import load_user_settings, load_saved_articles
+from .writer import get_article_writer
+
+
+# Retention of the stored articles, driven by the user settings: articles
+# published more than `cleanupDays` ago are evicted, then the oldest ones
+# until at most `maxArticles` are left. Saved articles are never evicted
+# (they still count towards maxArticles). Undated articles are only evicted
+# by count, after the dated ones. With ARCHIVE_ENABLED, evicted articles are
+# moved to the archive rather than dropped (undated ones cannot be).
+
+
+def select_evictions(articles: List[Dict], max_articles: Optional[int], cleanup_days: Optional[float],
+                     protected_ids: Set[str], now: Optional[float] = None) -> Dict[str, List[Dict]]:
+    """The articles to evict from a newest-first list, as {"age": [...], "count": [...]}."""
+    now = time.time() if now is None else now
+    cutoff_ts = now - cleanup_days * 86400 if cleanup_days else None
+    by_age = []
+    kept = []
+    for article in articles:
+        published_ts = article.get("published_ts")
+        if (cutoff_ts is not None and published_ts is not None and published_ts < cutoff_ts
+                and article.get("id") not in protected_ids):
+            by_age.append(article)
+        else:
+            kept.append(article)
+
+    by_count = []
+    if max_articles and len(kept) > max_articles:
+        excess = len(kept) - max_articles
+        # The list is newest first with undated articles last, so walk it backwards
+        for article in reversed(kept):
+            if excess == 0:
+                break
+            if article.get("id") not in protected_ids:
+                by_count.append(article)
+                excess -= 1
+    return {"age": by_age, "count": by_count}
+
+
+def run_retention(articles: Optional[List[Dict]] = None, max_articles: Optional[int] = None,
+                  cleanup_days: Optional[float] = None, dry_run: bool = False) -> Dict:
+    """Evict articles by age and count and return a report of what was reclaimed.
+
+    `articles` defaults to the stored corpus; limits default to the user
+    settings (maxArticles, cleanupDays). The evictions are committed through
+    the article writer, together with the report (under the "retention" key).
+    """
+    settings = load_user_settings()
+    max_articles = settings.get("maxArticles") if max_articles is None else max_articles
+    cleanup_days = settings.get("cleanupDays") if cleanup_days is None else cleanup_days
+    # Settings come from the frontend as numbers or strings; 0 or empty means no limit
+    max_articles = int(max_articles) if max_articles else None
+    cleanup_days = float(cleanup_days) if cleanup_days else None
+    if articles is None:
+        data = load_articles()
+        articles = data.get("articles", []) if data else []
+
+    protected_ids = {a.get("id") for a in load_saved_articles().get("articles", [])}
+    evicted = select_evictions(articles, max_articles, cleanup_days, protected_ids)
+    evicted_ids = [a.get("id") for group in evicted.values() for a in group if a.get("id")]
+
+    report = {
+        "ran_at": datetime.now().isoformat(),
+        "dry_run": dry_run,
+        "max_articles": max_articles,
+        "cleanup_days": cleanup_days,
+        "articles_before": len(articles),
+        "evicted": len(evicted_ids),
+        "evicted_by_age": len(evicted["age"]),
+        "evicted_by_count": len(evicted["count"]),
+        "protected": sum(1 for a in articles if a.get("id") in protected_ids),
+        "articles_after": len(articles) - len(evicted_ids),
+        "archived": 0,
+        # Size of the evicted records as compact JSON, roughly what leaves the store
+        "bytes_reclaimed": sum(len(json.dumps(a, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+                               for group in evicted.values() for a in group),
+    }
+    if not dry_run:
+        if ARCHIVE_ENABLED:
+            report["archived"] = archive_articles([a for group in evicted.values() for a in group])
+        get_article_writer().submit([{"op": "remove", "ids": evicted_ids},
+                                     {"op": "meta", "key": "retention", "value": report}]).result()
+    print(f"Retention{' (dry run)' if dry_run else ''}: evicted {report['evicted_by_age']} by age and "
+          f"{report['evicted_by_count']} by count, {report['articles_after']} articles left, "
+          f"{report['bytes_reclaimed'] / 1024:.0f} KB reclaimed")
+    return report
@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from .config import (FETCH_HOST_CONCURRENCY, FETCH_HOST_RATE, FETCH_HOST_BURST, FETCH_HOST_RETRIES,
+                     FETCH_RETRY_AFTER_MAX)
+
+
+class HostScheduler:
+    """Hands the sources of a fetch run to worker threads, politely per host.
+
+    Hosts are served round-robin, so sources of one host (www.reddit.com,
+    infoworld.com, ...) are spread over the run instead of hitting it at once,
+    while workers move on to other hosts. Each host has at most `per_host`
+    requests in flight and a token bucket starting `rate` requests per second
+    with bursts of `burst`. A Retry-After answer (stats["retry_after"], see
+    download_feed) pauses the host and puts the source back for up to
+    `max_retries` more attempts; when a host is paused past `deadline` or for
+    more than FETCH_RETRY_AFTER_MAX seconds, its remaining sources are handed
+    out as throttled instead of fetched.
+
+    Sources are referred to by their index in `sources`.
+    """
+
+    def __init__(self, sources: List[str], per_host: int = FETCH_HOST_CONCURRENCY, rate: float = FETCH_HOST_RATE,
+                 burst: int = FETCH_HOST_BURST, max_retries: int = FETCH_HOST_RETRIES,
+                 deadline: Optional[float] = None):
+        self.sources = sources
+        self.per_host = max(1, per_host)
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self._condition = threading.Condition()
+        self._closed = False
+        self._in_flight = 0
+        self._attempts: Dict[int, int] = {}
+        self._hosts: Dict[str, Dict] = {}
+        self._order = deque()  # hosts with queued sources, next to serve first
+        now = time.monotonic()
+        for index, feed_url in enumerate(sources):
+            host = self.host_of(index)
+            if host not in self._hosts:
+                self._hosts[host] = {"queue": deque(), "in_flight": 0, "tokens": float(self.burst),
+                                     "refilled": now, "paused_until": 0.0}
+                self._order.append(host)
+            self._hosts[host]["queue"].append(index)
+
+    def host_of(self, index: int) -> str:
+        try:
+            return (urlsplit(self.sources[index]).hostname or "").lower()
+        except ValueError:
+            return ""
+
+    def _wait_limit(self, now: float) -> float:
+        limit = now + FETCH_RETRY_AFTER_MAX
+        return min(limit, self.deadline) if self.deadline is not None else limit
+
+    def take(self) -> Optional[Tuple[int, bool]]:
+        """Block until a source may be fetched; returns (index, throttled) or None when none are left.
+
+        `throttled` is True for a source that must not be fetched because its
+        host asked us to back off for longer than the run can wait.
+        """
+        with self._condition:
+            while not self._closed:
+                now = time.monotonic()
+                wake = None
+                for host in list(self._order):
+                    state = self._hosts[host]
+                    if state["paused_until"] > self._wait_limit(now):
+                        return self._pop(host), True
+                    if state["in_flight"] >= self.per_host:
+                        continue
+                    if self.rate > 0:
+                        state["tokens"] = min(float(self.burst),
+                                              state["tokens"] + (now - state["refilled"]) * self.rate)
+                        state["refilled"] = now
+                        ready_at = now if state["tokens"] >= 1 else now + (1 - state["tokens"]) / self.rate
+                    else:
+                        ready_at = now
+                    ready_at = max(ready_at, state["paused_until"])
+                    if ready_at <= now:
+                        if self.rate > 0:
+                            state["tokens"] -= 1
+                        state["in_flight"] += 1
+                        self._in_flight += 1
+                        return self._pop(host), False
+                    wake = ready_at if wake is None else min(wake, ready_at)
+                if not self._order and not self._in_flight:
+                    return None
+                # Woken early by finish() / close(); otherwise when a host becomes ready
+                self._condition.wait(None if wake is None else wake - now)
+            return None
+
+    def _pop(self, host: str) -> int:
+        state = self._hosts[host]
+        index = state["queue"].popleft()
+        self._order.remove(host)
+        if state["queue"]:
+            self._order.append(host)
+        return index
+
+    def finish(self, index: int, stats: Dict) -> bool:
+        """Record that a fetch taken with take() ended; returns True if it was queued again for a retry."""
+        host = self.host_of(index)
+        retry_after = stats.get("retry_after")
+        with self._condition:
+            state = self._hosts[host]
+            state["in_flight"] -= 1
+            self._in_flight -= 1
+            retried = False
+            if retry_after is not None:
+                now = time.monotonic()
+                state["paused_until"] = max(state["paused_until"], now + retry_after)
+                attempts = self._attempts.get(index, 0) + 1
+                self._attempts[index] = attempts
+                if attempts <= self.max_retries and not self._closed \
+                        and state["paused_until"] <= self._wait_limit(now):
+                    if not state["queue"]:
+                        self._order.append(host)
+                    state["queue"].appendleft(index)
+                    retried = True
+                print(f"Pausing {host} for {retry_after:.0f}s (Retry-After)"
+                      f"{', will retry ' + self.sources[index] if retried else ''}", flush=True)
+            self._condition.notify_all()
+            return retried
+
+    def close(self):
+        """Make take() return None right away, e.g. when the run is cancelled."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+def run_scheduled(scheduler: HostScheduler, job: Callable[[int], Tuple[object, Dict]],
+                  deliver: Callable[[int, object, Dict], None]):
+    """Worker loop: fetch the sources `scheduler` hands out with `job(index) -> (result, stats)`.
+
+    `deliver(index, result, stats)` receives each source's final outcome; a
+    source retried after a Retry-After is delivered once, after its last
+    attempt. Submit one of these per worker thread.
+    """
+    while True:
+        task = scheduler.take()
+        if task is None:
+            return
+        index, throttled = task
+        if throttled:
+            print(f"Skipped (host asked to back off): {scheduler.sources[index]}")
+            deliver(index, None, {"status": "failed", "error": "throttled"})
+            continue
+        result, stats = None, {"status": "failed"}
+        try:
+            result, stats = job(index)
+        except Exception as e:
+            print(f"Error fetching feed {scheduler.sources[index]}: {e}")
+        finally:
+            retried = scheduler.finish(index, stats)
+        if not retried:
+            deliver(index, result, stats)
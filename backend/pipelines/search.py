@@ -0,0 +1,459 @@
+import heapq
+import math
+import re
+import threading
+import time
+import weakref
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+from .config import (SEARCH_PREFIX_MIN, SEARCH_PREFIX_EXPANSIONS, SEARCH_RANKED_MIN_DOCS, SEARCH_SYNC_BATCH,
+                     SEARCH_READY_WAIT)
+
+
+# Full-text search over the stored articles: an in-memory inverted index of
+# title, tags, summary and content, ranked with BM25. The index follows the
+# article snapshot (pipelines.snapshot): sync() adds the articles that are new
+# or changed since the last snapshot and drops the removed ones, so a fetch
+# costs the tokenizing of its new articles, never a rebuild. Syncs run on a
+# background thread (sync_in_background), taking the index lock only to apply
+# each batch of articles, so queries are answered meanwhile from the index as
+# it stands. Until the first build after startup is done, queries scan the
+# snapshot's articles instead (scan_articles).
+#
+# Postings hold each article's BM25 term-frequency part quantized to
+# 1..IMPACT_LEVELS (lengths normalized against the average length when the
+# index was built), so a score is idf * impact and the postings of common
+# words can be walked best first without scoring every article they contain.
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+# Title and tag words count more than words of the body
+FIELD_WEIGHTS = (("title", 3), ("tags", 2), ("ai_tags", 2), ("summary", 1), ("ai_summary", 1), ("content", 1))
+# The searchable fields set after an article is stored (by /api/summarize);
+# the others never change once an article is in the store
+LATE_FIELDS = ("ai_summary", "ai_tags")
+# What _adopt() takes over from an index built aside
+INDEX_FIELDS = ("postings", "terms", "doc_ids", "docs", "doc_terms", "doc_prints", "avgdl", "ranked", "synced",
+                "hidden")
+STOPWORDS = frozenset("""
+    a an and are as at be but by for from has have in into is it its of on or that the their this to was were
+    will with you your we our not can how what why when which who
+""".split())
+BM25_K1 = 1.2
+BM25_B = 0.75
+IMPACT_LEVELS = 255
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_RE.findall(text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+
+def fingerprint(article: Dict) -> int:
+    """Changes when the AI summary or tags of an article are set."""
+    return hash((article.get("ai_summary"), repr(article.get("ai_tags"))))
+
+
+def article_terms(article: Dict) -> Dict[str, int]:
+    """Weighted term frequencies of an article's searchable fields."""
+    counts = {}
+    for field, weight in FIELD_WEIGHTS:
+        value = article.get(field) or ""
+        if isinstance(value, list):
+            value = " ".join(str(tag) for tag in value)
+        # Count every token first and filter the distinct ones, fewer than the tokens
+        for token, count in Counter(TOKEN_RE.findall(value.lower())).items():
+            if len(token) > 1 and token not in STOPWORDS:
+                counts[token] = counts.get(token, 0) + count * weight
+    return counts
+
+
+class SearchIndex:
+    """Inverted index from term to {doc: impact}; docs are numbered as they are added."""
+
+    def __init__(self):
+        self._lock = threading.Lock()       # held by searches, and by sync() per batch
+        self._sync_lock = threading.Lock()  # one sync at a time
+        self._state_lock = threading.Lock()
+        self._wanted = None                 # snapshot the background thread syncs with next
+        self._syncing = False
+        self.ready = threading.Event()      # set once the first sync is done
+        self._clear()
+
+    def _clear(self):
+        # Weak reference to the snapshot the index matches; None while a sync is under way
+        self.synced = None
+        # While syncing: (weak reference to the snapshot synced with, ids of the
+        # articles it no longer has), which searches of that snapshot leave out
+        self.hidden = None
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.terms: List[str] = []          # sorted vocabulary, for prefix matching
+        self.doc_ids: Dict[str, int] = {}   # article id -> doc
+        self.docs: List[Optional[str]] = [] # doc -> article id (None once removed)
+        self.doc_terms: List[Tuple[str, ...]] = []
+        self.doc_prints: List[int] = []
+        self.avgdl: Optional[float] = None
+        # term -> docs by impact (list index), for the terms that have reached
+        # SEARCH_RANKED_MIN_DOCS docs; removed docs are skipped when read
+        self.ranked: Dict[str, List[List[int]]] = {}
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def add(self, article: Dict, counts: Optional[Dict[str, int]] = None) -> List[str]:
+        """Index one article; returns the terms it introduced, which add_terms() must file."""
+        article_id = article.get("id")
+        if not article_id or article_id in self.doc_ids:
+            return []
+        counts = article_terms(article) if counts is None else counts
+        length = sum(counts.values())
+        if self.avgdl is None:
+            self.avgdl = float(length or 1)
+        doc = len(self.docs)
+        self.docs.append(article_id)
+        self.doc_ids[article_id] = doc
+        self.doc_terms.append(tuple(counts))
+        self.doc_prints.append(fingerprint(article))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.avgdl)
+        new_terms = []
+        for term, tf in counts.items():
+            impact = max(1, round(IMPACT_LEVELS * tf / (tf + norm)))
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                new_terms.append(term)
+            postings[doc] = impact
+            ranked = self.ranked.get(term)
+            if ranked is not None:
+                ranked[impact].append(doc)
+            elif len(postings) == SEARCH_RANKED_MIN_DOCS:
+                ranked = self.ranked[term] = [[] for _ in range(IMPACT_LEVELS + 1)]
+                for posting_doc, posting_impact in postings.items():
+                    ranked[posting_impact].append(posting_doc)
+        return new_terms
+
+    def add_terms(self, new_terms: List[str]):
+        if len(new_terms) < 64:
+            for term in new_terms:
+                insort(self.terms, term)
+        else:
+            self.terms = sorted(self.postings)
+
+    def remove(self, article_id: str):
+        doc = self.doc_ids.pop(article_id, None)
+        if doc is None:
+            return
+        for term in self.doc_terms[doc]:
+            postings = self.postings[term]
+            del postings[doc]
+            if not postings:
+                # Left in self.terms; prefix lookups skip terms without postings
+                del self.postings[term]
+                self.ranked.pop(term, None)
+        self.docs[doc] = None
+        self.doc_terms[doc] = ()
+        self.doc_prints[doc] = 0
+
+    def synced_with(self, snapshot) -> bool:
+        synced = self.synced
+        return synced is not None and synced() is snapshot
+
+    def _adopt(self, other: "SearchIndex"):
+        for name in INDEX_FIELDS:
+            setattr(self, name, getattr(other, name))
+
+    def sync(self, snapshot):
+        """Bring the index in line with `snapshot`: index new and changed articles, drop removed ones.
+
+        Only this thread changes the index, so the work is planned and the
+        articles tokenized without the lock; it is taken to apply each batch
+        of SEARCH_SYNC_BATCH articles, so searches are not held up for long.
+        """
+        with self._sync_lock:
+            if self.synced_with(snapshot):
+                return
+            stored = snapshot.by_id
+            removed = self.doc_ids.keys() - stored.keys()
+            with self._lock:
+                # From here on searches of `snapshot` leave out what it no longer has
+                self.hidden = (weakref.ref(snapshot), removed)
+            if len(self.docs) - len(self.doc_ids) > max(len(self.doc_ids), 1000):
+                # Mostly removed docs: renumbering everything is cheaper from here on.
+                # The new index is built aside, so searches keep the old one until then
+                fresh = SearchIndex()
+                fresh.sync(snapshot)
+                with self._lock:
+                    self._adopt(fresh)
+                self.ready.set()
+                return
+
+            doc_prints = self.doc_prints
+            work = [(article_id, None) for article_id in removed]
+            work += [(article_id, stored[article_id]) for article_id, doc in self.doc_ids.items()
+                     if article_id in stored and doc_prints[doc] != fingerprint(stored[article_id])]
+            work += [(article_id, stored[article_id]) for article_id in stored.keys() - self.doc_ids.keys()]
+            counts = None
+            if self.avgdl is None and work:
+                # Lengths are normalized against the average of the first articles indexed
+                counts = [article_terms(article) for _, article in work]
+                self.avgdl = sum(sum(c.values()) for c in counts) / len(counts) or 1.0
+            with self._lock:
+                # Until it is done, the index matches neither snapshot
+                self.synced = None
+
+            new_terms = []
+            for start in range(0, len(work), SEARCH_SYNC_BATCH):
+                batch = work[start:start + SEARCH_SYNC_BATCH]
+                if counts is None:
+                    batch_counts = [article_terms(article) if article is not None else None for _, article in batch]
+                else:
+                    batch_counts = counts[start:start + SEARCH_SYNC_BATCH]
+                with self._lock:
+                    # A changed article is removed and indexed again in the same batch
+                    for (article_id, article), article_counts in zip(batch, batch_counts):
+                        self.remove(article_id)
+                        if article is not None:
+                            new_terms.extend(self.add(article, article_counts))
+            # The vocabulary is sorted without the lock, searches read the old list meanwhile
+            terms = None
+            if len(self.terms) > 2 * len(self.postings) or len(new_terms) >= 64:
+                terms = sorted(self.postings)
+            with self._lock:
+                if terms is not None:
+                    self.terms = terms
+                elif new_terms:
+                    self.add_terms(new_terms)
+                self.synced = weakref.ref(snapshot)
+                self.hidden = None
+            self.ready.set()
+
+    def sync_in_background(self, snapshot):
+        """Sync with `snapshot` on a background thread; a later call made meanwhile is synced next."""
+        if self.synced_with(snapshot):
+            return
+        with self._state_lock:
+            self._wanted = snapshot
+            if self._syncing:
+                return
+            self._syncing = True
+        threading.Thread(target=self._sync_loop, name="search-sync", daemon=True).start()
+
+    def _sync_loop(self):
+        while True:
+            with self._state_lock:
+                snapshot, self._wanted = self._wanted, None
+                if snapshot is None:
+                    self._syncing = False
+                    return
+            try:
+                started = time.perf_counter()
+                self.sync(snapshot)
+                print(f"Search index synced: {len(self)} articles in {time.perf_counter() - started:.2f}s")
+            except Exception as e:
+                print(f"Error syncing the search index: {e}")
+                # Never leave a query waiting on a first build that failed
+                self.ready.set()
+
+    def _expand(self, token: str) -> List[str]:
+        """The token itself if indexed, plus the most common indexed terms it is a prefix of."""
+        matches = [token] if token in self.postings else []
+        if len(token) < SEARCH_PREFIX_MIN:
+            return matches
+        longer = []
+        for index in range(bisect_left(self.terms, token), len(self.terms)):
+            term = self.terms[index]
+            if not term.startswith(token):
+                break
+            if term != token and term in self.postings:
+                longer.append(term)
+        if len(longer) > SEARCH_PREFIX_EXPANSIONS:
+            longer = heapq.nlargest(SEARCH_PREFIX_EXPANSIONS, longer, key=lambda term: len(self.postings[term]))
+        return matches + longer
+
+    def _idf(self, term: str) -> float:
+        """BM25 idf of `term`, scaled so that idf * impact is the doc's score for it."""
+        n = len(self.doc_ids)
+        df = len(self.postings[term])
+        return math.log(1 + (n - df + 0.5) / (df + 0.5)) * (BM25_K1 + 1) / IMPACT_LEVELS
+
+    def _walk(self, term: str) -> Iterator[Tuple[float, int]]:
+        """(-score, doc) for the docs containing `term`, best first."""
+        postings = self.postings[term]
+        idf = self._idf(term)
+        ranked = self.ranked.get(term)
+        if ranked is None:
+            for doc in sorted(postings, key=postings.__getitem__, reverse=True):
+                yield -idf * postings[doc], doc
+            return
+        for impact in range(IMPACT_LEVELS, 0, -1):
+            score = -idf * impact
+            for doc in ranked[impact]:
+                # Removed docs are gone from the postings
+                if doc in postings:
+                    yield score, doc
+
+    def _best(self, terms: List[str], limit: int, keep=None) -> List[Tuple[float, int]]:
+        """The `limit` best docs for one query word, each scored by the best of its `terms`."""
+        best = []
+        seen = set()
+        # Merged best first, a doc's first appearance carries its best score
+        for negative_score, doc in heapq.merge(*[self._walk(term) for term in terms]):
+            if len(best) == limit:
+                break
+            if doc in seen:
+                continue
+            seen.add(doc)
+            if keep is None or keep(self.docs[doc]):
+                best.append((-negative_score, doc))
+        return best
+
+    def _best_of_all(self, words: List[List[str]], matched, limit: int) -> List[Tuple[float, int]]:
+        """The `limit` best of the `matched` docs for several query words (a score per word, summed).
+
+        Walks every word's postings best first, in turns, and stops once no
+        doc yet to be seen can beat the `limit` best so far: the sum of the
+        scores last read from each word bounds any such doc.
+        """
+        weighted = [[(self.postings[term], self._idf(term)) for term in terms] for terms in words]
+        walks = [heapq.merge(*[self._walk(term) for term in terms]) for terms in words]
+        bounds = [0.0] * len(walks)
+        best = []
+        seen = set()
+        while True:
+            for index, walk in enumerate(walks):
+                item = next(walk, None)
+                if item is None:
+                    # Every match contains this word, so all of them have been seen
+                    return sorted(best, reverse=True)
+                bounds[index] = -item[0]
+                doc = item[1]
+                if doc in matched and doc not in seen:
+                    seen.add(doc)
+                    score = sum(max(idf * postings[doc] for postings, idf in word if doc in postings)
+                                for word in weighted)
+                    if len(best) < limit:
+                        heapq.heappush(best, (score, doc))
+                    elif score > best[0][0]:
+                        heapq.heapreplace(best, (score, doc))
+            if len(best) == limit and best[0][0] >= sum(bounds):
+                return sorted(best, reverse=True)
+
+    def _word_docs(self, terms: List[str]):
+        if len(terms) == 1:
+            return self.postings[terms[0]].keys()
+        return set().union(*[self.postings[term].keys() for term in terms])
+
+    def search(self, query: str, limit: Optional[int] = None, keep=None,
+               snapshot=None) -> Tuple[int, List[Tuple[float, str]]]:
+        """Articles matching every word of `query`: (how many, [(score, article id), ...] best first).
+
+        Each word also matches the indexed words it is a prefix of (from
+        SEARCH_PREFIX_MIN characters on). `keep(article_id)` filters the
+        matches; only the best `limit` are ranked and returned. With a
+        `snapshot` the index is not synced with, only articles in it match.
+        """
+        with self._lock:
+            hidden = ()
+            if snapshot is not None and not self.synced_with(snapshot):
+                if self.hidden is not None and self.hidden[0]() is snapshot:
+                    # The snapshot being synced with: only the articles it no longer has are left out
+                    hidden = self.hidden[1]
+                else:
+                    stored, wanted = snapshot.by_id, keep
+                    keep = stored.__contains__ if wanted is None else (
+                        lambda article_id: article_id in stored and wanted(article_id))
+            words = [self._expand(token) for token in dict.fromkeys(tokenize(query))]
+            if not words or not all(words):
+                return 0, []
+            docs = self.docs
+            # Without another filter, the hidden docs still indexed are counted
+            # out instead of testing every match
+            filtered = keep is not None
+            hidden_docs = {self.doc_ids[article_id] for article_id in hidden if article_id in self.doc_ids}
+            if hidden:
+                wanted = keep
+                keep = (lambda article_id: article_id not in hidden) if wanted is None else (
+                    lambda article_id: article_id not in hidden and wanted(article_id))
+
+            if len(words) == 1:
+                # One word: walk its postings best first, stopping after `limit` matches
+                matched = self._word_docs(words[0])
+                if filtered:
+                    total = sum(1 for doc in matched if keep(docs[doc]))
+                else:
+                    total = len(matched) - sum(1 for doc in hidden_docs if doc in matched)
+                best = self._best(words[0], total if limit is None else limit, keep)
+                return total, [(score, docs[doc]) for score, doc in best]
+
+            # Several words: intersect their docs, rarest first, then rank those
+            words.sort(key=lambda terms: sum(len(self.postings[term]) for term in terms))
+            matched = set(self._word_docs(words[0]))
+            for terms in words[1:]:
+                matched &= self._word_docs(terms)
+            if filtered:
+                matched = {doc for doc in matched if keep(docs[doc])}
+            else:
+                matched -= hidden_docs
+            if not matched:
+                return 0, []
+            best = self._best_of_all(words, matched, len(matched) if limit is None else limit)
+            return len(matched), [(score, docs[doc]) for score, doc in best]
+
+
+_index = SearchIndex()
+
+
+def search_articles(snapshot, query: str, limit: Optional[int] = None,
+                    keep=None) -> Tuple[int, List[Tuple[float, str]], bool]:
+    """SearchIndex.search over `snapshot`'s articles, and whether the index was synced with it.
+
+    The shared index catches up with `snapshot` in the background; until it
+    has, the articles it holds that `snapshot` does not are left out, and
+    those new in `snapshot` are not found yet.
+    """
+    _index.sync_in_background(snapshot)
+    if not _index.ready.wait(SEARCH_READY_WAIT):
+        return (*scan_articles(snapshot, query, limit, keep), False)
+    synced = _index.synced_with(snapshot)
+    return (*_index.search(query, limit, keep, snapshot), synced)
+
+
+def scan_articles(snapshot, query: str, limit: Optional[int] = None,
+                  keep=None) -> Tuple[int, List[Tuple[float, str]]]:
+    """search_articles without the index, for while it is first built: reads every article.
+
+    An article matches if each word of `query` occurs in its searchable
+    fields, also inside longer words; it scores the weighted number of
+    occurrences.
+    """
+    words = list(dict.fromkeys(tokenize(query)))
+    if not words:
+        return 0, []
+    matches = []
+    for article in snapshot.articles:
+        if keep is not None and not keep(article.get("id")):
+            continue
+        texts = []
+        for field, weight in FIELD_WEIGHTS:
+            value = article.get(field) or ""
+            if isinstance(value, list):
+                value = " ".join(str(tag) for tag in value)
+            if value:
+                texts.append((value.lower(), weight))
+        score = 0
+        for word in words:
+            occurrences = sum(text.count(word) * weight for text, weight in texts)
+            if not occurrences:
+                break
+            score += occurrences
+        else:
+            matches.append((float(score), article.get("id")))
+    best = heapq.nlargest(len(matches) if limit is None else limit, matches)
+    return len(matches), best
+
+
+def warm_search_index():
+    """Build the shared index from the current snapshot in the background, so the first query need not."""
+    def warm():
+        from .snapshot import get_snapshot
+        _index.sync_in_background(get_snapshot())
+    threading.Thread(target=warm, name="search-warm", daemon=True).start()
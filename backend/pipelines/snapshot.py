@@ -0,0 +1,279 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Sequence, Tuple
+from .config import PENDING_ARTICLES_FILE, SNAPSHOT_CHECK_INTERVAL
+from .facets import FacetIndex
+from .loader import load_articles, read_pending_articles
+from .parser import published_sort_key
+from .store import get_article_store, store_version
+
+
+# Read model for the article endpoints: the corpus as loaded by load_articles,
+# plus what the endpoints compute from it, built once per store change and
+# shared by every request. A snapshot is never modified after it is built; a
+# newer one replaces the module-level reference in a single assignment, so a
+# request keeps whichever snapshot it picked up and never sees a partial one.
+#
+# A fetch appends each source's new articles to the pending file as it goes.
+# When nothing else changed, the next snapshot is the previous one plus the
+# pending lines appended since, not a reload of the store; like any change
+# made on disk, those lines are picked up within SNAPSHOT_CHECK_INTERVAL.
+
+SELECTION_CACHE_SIZE = 64
+# Field sets (see encode_article) whose per-article JSON is kept
+ENCODED_FIELD_SETS = 8
+
+
+def article_sort_key(article: Dict) -> Tuple[float, str]:
+    """Newest first, undated last, ties broken by id: a total order, so cursors are stable."""
+    return published_sort_key(article), article.get("id") or ""
+
+
+def encode_cursor(article: Dict) -> str:
+    """An opaque cursor pointing just past `article` (its published_ts and id)."""
+    raw = json.dumps([article.get("published_ts"), article.get("id") or ""], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """The sort key encoded by encode_cursor; ValueError if the cursor is malformed."""
+    try:
+        published_ts, article_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return article_sort_key({"published_ts": published_ts, "id": article_id})
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def range_bounds(articles: Sequence[Dict], since_ts: Optional[float] = None,
+                 until_ts: Optional[float] = None) -> Tuple[int, int]:
+    """[start, end) of the articles published within [since_ts, until_ts] in a list sorted by article_sort_key.
+
+    With a range, undated articles are left out.
+    """
+    start, end = 0, len(articles)
+    if until_ts is not None:
+        start = bisect_left(articles, -until_ts, key=published_sort_key)
+    if since_ts is not None:
+        end = bisect_right(articles, -since_ts, key=published_sort_key)
+    if since_ts is not None or until_ts is not None:
+        end = min(end, bisect_left(articles, float("inf"), key=published_sort_key))
+    return start, max(start, end)
+
+
+def page_articles(articles: Sequence[Dict], limit: int, since_ts: Optional[float] = None,
+                  until_ts: Optional[float] = None, after: Optional[str] = None) -> Tuple[Sequence[Dict], int, Optional[str]]:
+    """One page of `articles`, which must be sorted by article_sort_key.
+
+    Returns (page, number of articles in the range, cursor of the next page or
+    None). The range and cursor positions are found by binary search, so only
+    the returned articles are touched.
+    """
+    start, end = range_bounds(articles, since_ts, until_ts)
+    total = end - start
+    if after:
+        start = max(start, bisect_right(articles, decode_cursor(after), key=article_sort_key))
+    page = articles[start:min(end, start + limit)]
+    next_cursor = encode_cursor(page[-1]) if page and start + limit < end else None
+    return page, total, next_cursor
+
+
+class ArticleSnapshot:
+    """An immutable view of the corpus at one store version. Treat every field as read-only.
+
+    What is built on first use (facet indexes, selections, encodings) is
+    built under the snapshot's lock, once.
+    """
+
+    def __init__(self, data: Optional[Dict], version: int, files_token: Tuple, pending_offset: int = 0):
+        self.version = version
+        self.files_token = files_token
+        # Bytes of the pending file this snapshot includes
+        self.pending_offset = pending_offset
+        # Names this state of the store (the files it was read from), for HTTP ETags
+        self.tag = hashlib.sha1(repr((version, files_token)).encode("utf-8")).hexdigest()[:16]
+        self.empty = data is None
+        data = data or {}
+        # Stored order already is newest first; sorting settles ties by id
+        articles = tuple(sorted(data.get("articles", []), key=article_sort_key))
+
+        sources = {}
+        for article in articles:
+            source = article.get("source", "Unknown")
+            sources[source] = sources.get(source, 0) + 1
+        self._fill(articles, data.get("metadata", {}), {article.get("id"): article for article in articles}, sources)
+
+    def _fill(self, articles: Tuple[Dict, ...], metadata: Dict, by_id: Dict[str, Dict], sources: Dict[str, int]):
+        self.articles = articles
+        self.metadata = metadata
+        self.count = len(articles)
+        self.by_id = by_id
+        self._sources = sources  # articles per source
+        self.total_sources = len(sources)
+        self.top_sources = sorted(sources.items(), key=lambda x: x[1], reverse=True)[:10]
+        self._lock = threading.Lock()
+        self._selections = {}
+        self._facets = None
+        self._encoded = {}
+
+    def extended(self, articles: List[Dict], version: int, files_token: Tuple, pending_offset: int) -> "ArticleSnapshot":
+        """A snapshot of these articles plus those of `articles` not in it yet, without reloading the store.
+
+        Only the new articles are placed, each with a binary search; the
+        corpus is not sorted again.
+        """
+        added = {}
+        for article in articles:
+            if article.get("id") not in self.by_id:
+                added.setdefault(article.get("id"), article)
+        corpus = list(self.articles)
+        by_id = dict(self.by_id)
+        sources = dict(self._sources)
+        for article_id, article in added.items():
+            insort(corpus, article, key=article_sort_key)
+            by_id[article_id] = article
+            source = article.get("source", "Unknown")
+            sources[source] = sources.get(source, 0) + 1
+        metadata = {**self.metadata, "total_articles": len(corpus)} if added else self.metadata
+
+        snapshot = ArticleSnapshot(None, version, files_token, pending_offset)
+        snapshot.empty = self.empty and not added
+        snapshot._fill(tuple(corpus), metadata, by_id, sources)
+        # The articles both have are the same dicts, so their encodings still hold
+        snapshot._encoded = {fields: dict(cached) for fields, cached in self._encoded.items()}
+        return snapshot
+
+    def encode_article(self, article: Dict, fields: Optional[Tuple[str, ...]] = None) -> str:
+        """`article` as compact JSON with only `fields` (every field if None).
+
+        Stored articles are encoded once per field set, for the first
+        ENCODED_FIELD_SETS field sets asked for.
+        """
+        article_id = article.get("id")
+        cached = self._encoded.get(fields)
+        if cached is None and len(self._encoded) < ENCODED_FIELD_SETS:
+            with self._lock:
+                cached = self._encoded.get(fields)
+                if cached is None and len(self._encoded) < ENCODED_FIELD_SETS:
+                    cached = self._encoded[fields] = {}
+        encoded = cached.get(article_id) if cached is not None else None
+        if encoded is None:
+            value = article if fields is None else {field: article[field] for field in fields if field in article}
+            encoded = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+            # Archived articles are not part of the snapshot: not cached. Two
+            # requests encoding the same article store the same string
+            if cached is not None and self.by_id.get(article_id) is article:
+                cached[article_id] = encoded
+        return encoded
+
+    def facet_index(self) -> FacetIndex:
+        """Secondary indexes of the articles, built on first use."""
+        if self._facets is None:
+            with self._lock:
+                # Concurrent first requests wait for one build
+                if self._facets is None:
+                    self._facets = FacetIndex(self.articles)
+        return self._facets
+
+    def _select(self, category: Optional[str], filters: Dict[str, List[str]], match: str) -> Tuple[Tuple[int, ...], Tuple[Dict, ...]]:
+        key = ((category or "").lower(), match,
+               tuple(sorted((facet, tuple(sorted(values))) for facet, values in filters.items())))
+        selection = self._selections.get(key)
+        if selection is None:
+            facets = self.facet_index()
+            with self._lock:
+                selection = self._selections.get(key)
+                if selection is not None:
+                    return selection
+                lists = [facets.select(filters, match)] if filters else []
+                if category:
+                    # Only the distinct source names are compared
+                    sources = [source for source in facets.values["source"] if category.lower() in source.lower()]
+                    lists.append(facets.positions("source", sources))
+                positions = lists[0] if len(lists) == 1 else tuple(sorted(set(lists[0]).intersection(lists[1])))
+                selection = (positions, tuple(self.articles[position] for position in positions))
+                if len(self._selections) < SELECTION_CACHE_SIZE:
+                    self._selections[key] = selection
+        return selection
+
+    def select_positions(self, category: Optional[str] = None, filters: Optional[Dict[str, List[str]]] = None,
+                         match: str = "all") -> Optional[Tuple[int, ...]]:
+        """Positions in self.articles of filter_articles(); None when nothing is filtered."""
+        if not category and not filters:
+            return None
+        return self._select(category, filters or {}, match)[0]
+
+    def filter_articles(self, category: Optional[str] = None, filters: Optional[Dict[str, List[str]]] = None,
+                        match: str = "all") -> Tuple[Dict, ...]:
+        """Articles whose source contains `category` (case-insensitive) and that pass facet
+        `filters` (see FacetIndex.select), from the indexes and cached per filter."""
+        if not category and not filters:
+            return self.articles
+        return self._select(category, filters or {}, match)[1]
+
+
+_snapshot = None
+_checked_at = 0.0
+_build_lock = threading.Lock()
+
+
+def _files_token() -> Tuple:
+    """(inode, mtime, size) of every file the corpus is read from, the pending file last;
+    changes when another process writes."""
+    token = []
+    for path in get_article_store().files() + [PENDING_ARTICLES_FILE]:
+        try:
+            stat = path.stat()
+            token.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            token.append(None)
+    return tuple(token)
+
+
+def _only_pending_grew(snapshot: ArticleSnapshot, version: int, files_token: Tuple) -> bool:
+    """Whether the store is as `snapshot` read it and the pending file was only appended to since."""
+    if snapshot.version != version or snapshot.files_token[:-1] != files_token[:-1]:
+        return False
+    before, after = snapshot.files_token[-1], files_token[-1]
+    if after is None:
+        return False
+    return before is None or (before[0] == after[0] and after[2] >= snapshot.pending_offset)
+
+
+def get_snapshot() -> ArticleSnapshot:
+    """The current snapshot, rebuilt first if the store changed since it was built.
+
+    While one request rebuilds, the others keep being served the previous
+    snapshot; only the very first build makes them wait.
+    """
+    global _snapshot, _checked_at
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == store_version():
+        if time.monotonic() - _checked_at < SNAPSHOT_CHECK_INTERVAL:
+            return snapshot
+        _checked_at = time.monotonic()
+        if snapshot.files_token == _files_token():
+            return snapshot
+
+    if not _build_lock.acquire(blocking=snapshot is None):
+        return snapshot
+    try:
+        if _snapshot is not None and _snapshot is not snapshot:
+            # Rebuilt by another request while this one waited for the lock
+            return _snapshot
+        # Version and files are read before loading: a write that lands
+        # during the load leaves them stale, so the next call rebuilds again
+        version, files_token = store_version(), _files_token()
+        if snapshot is not None and _only_pending_grew(snapshot, version, files_token):
+            articles, pending_offset = read_pending_articles(snapshot.pending_offset)
+            _snapshot = snapshot.extended(articles, version, files_token, pending_offset)
+        else:
+            pending, pending_offset = read_pending_articles()
+            _snapshot = ArticleSnapshot(load_articles(pending=pending), version, files_token, pending_offset)
+        _checked_at = time.monotonic()
+        return _snapshot
+    finally:
+        _build_lock.release()
@@ -0,0 +1,121 @@
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+from .config import SOURCE_HEALTH_FILE, SOURCE_HEALTH_RUNS
+from .user_data import load_json_file, save_json_file
+
+
+# Per-source fetch telemetry persisted across runs, keyed by feed URL:
+# {
+#   "feeds": {
+#     "https://example.com/feed": {
+#       "runs": [                      # oldest first, at most SOURCE_HEALTH_RUNS
+#         {"at": "...", "status": "ok", "error": None, "http_status": 200,
+#          "dns_ms": 1.2, "connect_ms": 80.5, "download_ms": 40.1,
+#          "parse_ms": 3.0, "normalize_ms": 1.1, "total_ms": 125.9,
+#          "bytes_wire": 12000, "bytes_body": 48000, "entries": 20, "articles": 3,
+#          "new": 2, "skipped_old": 15, "skipped_duplicate": 1, "skipped_unread": 2,
+#          "parser": "fast"}
+#       ]
+#     }
+#   }
+# }
+
+TIMINGS = ("dns_ms", "connect_ms", "download_ms", "parse_ms", "normalize_ms", "total_ms")
+COUNTERS = ("http_status", "bytes_wire", "bytes_body", "entries", "skipped_old", "skipped_duplicate",
+            "skipped_unread")
+
+
+def source_record(stats: Dict, articles: int, new: int) -> Dict:
+    """One run's telemetry for a source, from the stats its fetch reported."""
+    record = {
+        "at": datetime.now().isoformat(),
+        "status": stats.get("status"),
+        "error": stats.get("error"),
+        "articles": articles,
+        "new": new,
+        "parser": stats.get("parser"),
+    }
+    for key in COUNTERS:
+        record[key] = stats.get(key)
+    for key in TIMINGS[:-1]:
+        record[key] = stats.get(key)
+    record["total_ms"] = round(sum(record[key] or 0 for key in TIMINGS[:-1]), 1)
+    return record
+
+
+def load_source_health() -> Dict:
+    health = load_json_file(SOURCE_HEALTH_FILE, {"feeds": {}})
+    health.setdefault("feeds", {})
+    return health
+
+
+def record_source_runs(records: Dict[str, Dict], runs: int = SOURCE_HEALTH_RUNS) -> bool:
+    """Append this run's record of each source, keeping the last `runs` per source."""
+    if not records:
+        return True
+    health = load_source_health()
+    for feed_url, record in records.items():
+        entry = health["feeds"].setdefault(feed_url, {"runs": []})
+        entry["runs"] = (entry["runs"] + [record])[-runs:]
+    return save_json_file(SOURCE_HEALTH_FILE, health)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile, None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize_source(feed_url: str, runs: List[Dict]) -> Dict:
+    """Percentiles and rates over a source's recorded runs."""
+    failures = [run for run in runs if run.get("status") not in ("ok", "not_modified")]
+    errors = {}
+    for run in failures:
+        error = run.get("error") or (f"HTTP {run['http_status']}" if run.get("http_status") else "unknown")
+        errors[error] = errors.get(error, 0) + 1
+
+    timings = {}
+    for key in TIMINGS:
+        values = [run[key] for run in runs if run.get(key) is not None]
+        timings[key] = {"p50": percentile(values, 50), "p95": percentile(values, 95),
+                        "max": max(values) if values else None}
+
+    polled = [run for run in runs if run.get("status") == "ok"]
+    last = runs[-1] if runs else {}
+    return {
+        "feed_url": feed_url,
+        "runs": len(runs),
+        "failures": len(failures),
+        "failure_rate": round(len(failures) / len(runs), 3) if runs else None,
+        "not_modified": sum(1 for run in runs if run.get("status") == "not_modified"),
+        "errors": errors,
+        "timings": timings,
+        "avg_bytes_wire": round(sum(run.get("bytes_wire") or 0 for run in runs) / len(runs)) if runs else None,
+        "avg_entries": round(sum(run.get("entries") or 0 for run in polled) / len(polled), 1) if polled else None,
+        "new_articles": sum(run.get("new") or 0 for run in runs),
+        "last_status": last.get("status"),
+        "last_error": last.get("error"),
+        "last_http_status": last.get("http_status"),
+        "last_run": last.get("at"),
+    }
+
+
+def source_health_report(sort: str = "p95", limit: Optional[int] = None) -> List[Dict]:
+    """Summaries of every recorded source, slowest (or most failing) first.
+
+    `sort` is "p95" / "p50" (total time), "failures" or "bytes"; `limit`
+    (at least 1) keeps the first ones, None keeps all.
+    """
+    summaries = [summarize_source(feed_url, entry.get("runs", []))
+                 for feed_url, entry in load_source_health()["feeds"].items()]
+    keys = {
+        "p95": lambda summary: summary["timings"]["total_ms"]["p95"] or 0,
+        "p50": lambda summary: summary["timings"]["total_ms"]["p50"] or 0,
+        "failures": lambda summary: (summary["failure_rate"] or 0, summary["failures"]),
+        "bytes": lambda summary: summary["avg_bytes_wire"] or 0,
+    }
+    summaries.sort(key=keys.get(sort, keys["p95"]), reverse=True)
+    return summaries if limit is None else summaries[:max(1, limit)]
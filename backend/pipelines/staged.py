@@ -0,0 +1,115 @@
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Iterator, List, Optional, Tuple
+from .config import FETCH_MAX_WORKERS, FETCH_PARSE_WORKERS, FETCH_QUEUE_SIZE
+from .parser import download_feed, parse_feed_job
+from .http_client import check_interrupted
+from .scheduler import HostScheduler, run_scheduled
+
+
+def iter_feed_results_staged(sources: List[str], max_workers: int = FETCH_MAX_WORKERS, check_cancelled=None,
+                             feed_states: Optional[Dict[str, Dict]] = None, cutoff: Optional[float] = None,
+                             parse_workers: int = FETCH_PARSE_WORKERS,
+                             queue_size: int = FETCH_QUEUE_SIZE,
+                             deadline: Optional[float] = None) -> Iterator[Tuple[str, List[Dict], Dict]]:
+    """Two-stage version of fetcher.iter_feed_results.
+
+    `max_workers` threads download raw feed bytes (I/O stage) into a queue of at
+    most `queue_size` bodies; `parse_workers` processes run feedparser and the
+    entry normalization on them (CPU stage), so parsing is not capped by the GIL.
+    A full queue blocks the downloaders, which keeps memory flat no matter how
+    far the network runs ahead of parsing. Results are yielded in source order,
+    same as the single-stage path.
+
+    Cancellation, `deadline` and the per-host HostScheduler behave as in
+    iter_feed_results.
+
+    Duplicate ids are not checked in the workers (the corpus id set is too big
+    to ship to every process); fetch_all_articles drops them when merging.
+    """
+    feed_states = feed_states or {}
+    downloaded = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def download(index: int):
+        stats = {}
+        feed_url = sources[index]
+        payload = download_feed(feed_url, state=feed_states.get(feed_url), stats=stats, deadline=deadline)
+        return payload, stats
+
+    def deliver(index: int, payload, stats: Dict):
+        # Blocks while the parse stage is behind; gives up once the run is over
+        while not stop.is_set():
+            try:
+                downloaded.put((index, sources[index], payload, stats), timeout=0.2)
+                return
+            except queue.Full:
+                continue
+
+    scheduler = HostScheduler(sources, deadline=deadline)
+    downloader = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="feed-download")
+    # spawn rather than fork: the API process is multi-threaded when a fetch runs
+    parser_pool = ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        for _ in range(min(max_workers, len(sources))):
+            downloader.submit(run_scheduled, scheduler, download, deliver)
+
+        ready = {}    # index -> (articles, stats) waiting for its turn to be yielded
+        parsing = {}  # future -> (index, download stats)
+        next_index = 0
+
+        while next_index < len(sources):
+            if check_interrupted(check_cancelled, deadline):
+                print("Fetch stopped during processing", flush=True)
+                # Hand out the feeds that already finished so they are kept
+                for future in [future for future in parsing if future.done()]:
+                    index, stats = parsing.pop(future)
+                    if future.exception() is None:
+                        articles, parse_stats = future.result()
+                        stats.update(parse_stats)
+                        ready[index] = (articles, stats)
+                for index in sorted(ready):
+                    yield (sources[index], *ready[index])
+                return
+
+            # Hand downloaded bodies to the process pool, at most one per worker at a time
+            while len(parsing) < parse_workers:
+                try:
+                    index, feed_url, payload, stats = downloaded.get(timeout=0.05 if parsing else 0.2)
+                except queue.Empty:
+                    break
+                if payload is None:
+                    ready[index] = ([], stats)
+                else:
+                    try:
+                        future = parser_pool.submit(parse_feed_job, feed_url, payload, feed_states.get(feed_url), cutoff)
+                    except Exception as e:
+                        print(f"Error parsing feed {feed_url}: {e}")
+                        stats["status"] = "failed"
+                        ready[index] = ([], stats)
+                        continue
+                    parsing[future] = (index, stats)
+
+            if parsing:
+                done, _ = wait(parsing, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, stats = parsing.pop(future)
+                    try:
+                        articles, parse_stats = future.result()
+                    except Exception as e:
+                        print(f"Error parsing feed {sources[index]}: {e}")
+                        articles, parse_stats = [], {"status": "failed"}
+                    stats.update(parse_stats)
+                    ready[index] = (articles, stats)
+
+            while next_index in ready:
+                articles, stats = ready.pop(next_index)
+                yield sources[next_index], articles, stats
+                next_index += 1
+    finally:
+        stop.set()
+        scheduler.close()
+        downloader.shutdown(wait=False, cancel_futures=True)
+        parser_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,534 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from .config import (ARTICLE_STORE, ARTICLES_JSON_FILE, ARTICLES_DB_FILE, ARTICLES_JOURNAL_FILE,
+                     ARTICLES_JOURNAL_COMPACT_BYTES)
+
+
+# Article storage behind load_articles / save_articles. Every backend takes and
+# returns the same {"articles": [...newest first...], "metadata": {...}, ...}
+# document. The SQLite one also reads and updates single rows, and the journal
+# one appends changes to a log, so touching one article no longer rewrites
+# the whole corpus.
+#
+# The app writes through pipelines.writer, which turns queued patches into
+# one apply_patch() call; the other write methods are for tools and imports.
+#
+# Every write made through this process bumps store_version(); files()
+# lists what changes on disk when another process writes (see
+# pipelines.snapshot).
+
+_version = 0
+_version_lock = threading.Lock()
+
+
+def bump_store_version() -> int:
+    global _version
+    with _version_lock:
+        _version += 1
+        return _version
+
+
+def store_version() -> int:
+    return _version
+
+
+def fsync_directory(path: Path):
+    """Make a file created or renamed in `path` survive a crash."""
+    directory = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+class JsonArticleStore:
+    """The whole corpus as one JSON document (fetched_data/articles.json)."""
+
+    def __init__(self, path: Path = ARTICLES_JSON_FILE):
+        self.path = Path(path)
+
+    def __str__(self):
+        return str(self.path)
+
+    def files(self) -> List[Path]:
+        return [self.path]
+
+    def load(self) -> Optional[Dict]:
+        if not self.path.exists():
+            return None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, data: Dict) -> bool:
+        """Write the document to a temporary file and rename it over the old one.
+
+        Readers see either the old or the new file, and a crash mid-write
+        leaves the old one in place.
+        """
+        self.path.parent.mkdir(exist_ok=True)
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        fsync_directory(self.path.parent)
+        bump_store_version()
+        return True
+
+    def count(self) -> int:
+        data = self.load()
+        return len(data.get("articles", [])) if data else 0
+
+    def get_article(self, article_id: str) -> Optional[Dict]:
+        data = self.load()
+        return next((a for a in data.get("articles", []) if a.get("id") == article_id), None) if data else None
+
+    def update_articles(self, articles: List[Dict]) -> bool:
+        """Replace the stored articles with the same ids; ids not stored are ignored."""
+        data = self.load()
+        if not data:
+            return False
+        by_id = {article.get("id"): article for article in articles}
+        data["articles"] = [by_id.get(a.get("id"), a) for a in data.get("articles", [])]
+        return self.save(data)
+
+    def add_articles(self, articles: List[Dict]) -> bool:
+        """Insert new articles in date order, replacing stored ones with the same id."""
+        from .loader import insert_articles
+        data = self.load() or {"articles": [], "metadata": {}}
+        by_id = {article.get("id"): article for article in articles}
+        stored = data.setdefault("articles", [])
+        stored_ids = set()
+        for index, article in enumerate(stored):
+            if article.get("id") in by_id:
+                stored[index] = by_id[article.get("id")]
+                stored_ids.add(article.get("id"))
+        insert_articles(stored, [a for a in articles if a.get("id") not in stored_ids])
+        return self.save(data)
+
+    def get_meta(self, key: str, default=None):
+        data = self.load()
+        return data.get(key, default) if data else default
+
+    def set_meta(self, key: str, value) -> bool:
+        data = self.load()
+        if not data:
+            return False
+        data[key] = value
+        return self.save(data)
+
+    def apply_patch(self, added: List[Dict], fields: Dict[str, Dict], meta: Dict, removed: Iterable[str] = ()) -> bool:
+        """Delete `removed`, insert the `added` articles whose id is not stored, update `fields` by id,
+        set `meta`; one write."""
+        from .loader import insert_articles, migrate_articles
+        data = self.load() or {"articles": [], "metadata": {}}
+        migrate_articles(data)
+        removed = set(removed)
+        if removed:
+            data["articles"] = [a for a in data.get("articles", []) if a.get("id") not in removed]
+        stored = data.setdefault("articles", [])
+        stored_ids = {article.get("id") for article in stored}
+        insert_articles(stored, [a for a in added if a.get("id") not in stored_ids])
+        if fields:
+            for article in stored:
+                if article.get("id") in fields:
+                    article.update(fields[article.get("id")])
+        data.update(meta)
+        return self.save(data)
+
+
+class SqliteArticleStore:
+    """One row per article in SQLite, indexed by id, published_ts, source and ai_category.
+
+    Each row keeps the full article dict as JSON in `data`, next to the
+    indexed columns. `seq` records insertion order, which breaks ties between
+    equal published_ts the same way insert_articles does. The other top-level
+    keys of the document ("metadata", "ai_categories", ...) live in `meta`.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS articles (
+            id TEXT PRIMARY KEY,
+            published_ts REAL,
+            source TEXT,
+            ai_category TEXT,
+            seq INTEGER NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS articles_published ON articles (published_ts);
+        CREATE INDEX IF NOT EXISTS articles_source ON articles (source);
+        CREATE INDEX IF NOT EXISTS articles_category ON articles (ai_category);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+    ORDER = "ORDER BY published_ts IS NULL, published_ts DESC, seq"
+
+    def __init__(self, path: Path = ARTICLES_DB_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+
+    def __str__(self):
+        return str(self.path)
+
+    @contextmanager
+    def _connection(self):
+        # A short-lived connection per call: Flask request threads and the
+        # fetch thread never share one, and WAL lets readers run during a write
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+            if conn.total_changes:
+                bump_store_version()
+        finally:
+            conn.close()
+
+    def files(self) -> List[Path]:
+        return [self.path, self.path.with_name(self.path.name + "-wal")]
+
+    @staticmethod
+    def _row(article: Dict) -> tuple:
+        return (article.get("id"), article.get("published_ts"), article.get("source"), article.get("ai_category"),
+                json.dumps(article, ensure_ascii=False))
+
+    def _upsert(self, conn, articles: Iterable[Dict], update_only: bool = False, insert_only: bool = False):
+        rows = [self._row(article) for article in articles if article.get("id")]
+        if update_only:
+            conn.executemany("UPDATE articles SET published_ts = ?, source = ?, ai_category = ?, data = ? "
+                             "WHERE id = ? AND data != ?",
+                             [(ts, source, category, data, article_id, data)
+                              for article_id, ts, source, category, data in rows])
+            return
+        start = conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM articles").fetchone()[0]
+        # Only rows whose JSON changed are rewritten; seq is kept from the first insert
+        conflict = "DO NOTHING" if insert_only else (
+            "DO UPDATE SET published_ts = excluded.published_ts, source = excluded.source, "
+            "ai_category = excluded.ai_category, data = excluded.data WHERE data != excluded.data")
+        conn.executemany(
+            "INSERT INTO articles (id, published_ts, source, ai_category, data, seq) VALUES (?, ?, ?, ?, ?, ?) "
+            f"ON CONFLICT (id) {conflict}",
+            [row + (start + index,) for index, row in enumerate(rows)])
+
+    def load(self) -> Optional[Dict]:
+        with self._connection() as conn:
+            articles = [json.loads(data) for (data,) in conn.execute(f"SELECT data FROM articles {self.ORDER}")]
+            meta = {key: json.loads(value) for key, value in conn.execute("SELECT key, value FROM meta")}
+        if not articles and "metadata" not in meta:
+            return None
+        data = {"articles": articles, **meta}
+        data.setdefault("metadata", {"total_articles": len(articles)})
+        return data
+
+    def save(self, data: Dict) -> bool:
+        """Make the store hold exactly `data`: upsert its articles, drop the others, replace the meta keys."""
+        articles = data.get("articles", [])
+        with self._connection() as conn:
+            self._upsert(conn, articles)
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep (id TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM keep")
+            conn.executemany("INSERT OR IGNORE INTO keep (id) VALUES (?)",
+                             [(article.get("id"),) for article in articles if article.get("id")])
+            conn.execute("DELETE FROM articles WHERE id NOT IN (SELECT id FROM keep)")
+            conn.execute("DELETE FROM meta")
+            conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)",
+                             [(key, json.dumps(value, ensure_ascii=False))
+                              for key, value in data.items() if key != "articles"])
+        return True
+
+    def count(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def get_article(self, article_id: str) -> Optional[Dict]:
+        with self._connection() as conn:
+            row = conn.execute("SELECT data FROM articles WHERE id = ?", (article_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_articles(self, articles: List[Dict]) -> bool:
+        """Rewrite only the given rows; ids not stored are ignored."""
+        with self._connection() as conn:
+            self._upsert(conn, articles, update_only=True)
+        return True
+
+    def add_articles(self, articles: List[Dict]) -> bool:
+        """Insert new articles (or update stored ones with the same id)."""
+        with self._connection() as conn:
+            self._upsert(conn, articles)
+        return True
+
+    def get_meta(self, key: str, default=None):
+        with self._connection() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key: str, value) -> bool:
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                         (key, json.dumps(value, ensure_ascii=False)))
+        return True
+
+    def apply_patch(self, added: List[Dict], fields: Dict[str, Dict], meta: Dict, removed: Iterable[str] = ()) -> bool:
+        """Delete `removed`, insert the `added` articles whose id is not stored, update `fields` by id,
+        set `meta`; one transaction."""
+        with self._connection() as conn:
+            conn.executemany("DELETE FROM articles WHERE id = ?", [(article_id,) for article_id in removed])
+            self._upsert(conn, added, insert_only=True)
+            updated = []
+            for article_id, values in fields.items():
+                row = conn.execute("SELECT data FROM articles WHERE id = ?", (article_id,)).fetchone()
+                if row:
+                    updated.append({**json.loads(row[0]), **values})
+            self._upsert(conn, updated, update_only=True)
+            conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                             [(key, json.dumps(value, ensure_ascii=False)) for key, value in meta.items()])
+        return True
+
+
+def replay_patches(data: Dict, records: Iterable[Dict]) -> None:
+    """Apply journal records ({"op": "add" | "set" | "meta" | "remove", ...}) to a document in place, in order.
+
+    Adding a stored id, setting a missing one and removing a missing one do
+    nothing, so replaying a record again leaves the document unchanged.
+    """
+    from .loader import insert_articles
+    articles = data.setdefault("articles", [])
+    by_id = {article.get("id"): article for article in articles}
+    added = []
+    removed = False
+    for record in records:
+        if record.get("op") == "remove":
+            for article_id in record["ids"]:
+                removed = by_id.pop(article_id, None) is not None or removed
+        elif record.get("op") == "add":
+            for article in record["articles"]:
+                if article.get("id") not in by_id:
+                    by_id[article.get("id")] = article
+                    added.append(article)
+        elif record.get("op") == "set":
+            article = by_id.get(record["id"])
+            if article is not None:
+                article.update(record["fields"])
+        elif record.get("op") == "meta":
+            data[record["key"]] = record["value"]
+    if removed:
+        # Keep each article only if it is still the one stored under its id
+        articles[:] = [a for a in articles if by_id.get(a.get("id")) is a]
+        added = [a for a in added if by_id.get(a.get("id")) is a]
+    insert_articles(articles, added)
+
+
+class JournalArticleStore:
+    """articles.json as a compacted snapshot, plus an append-only NDJSON journal of the changes since.
+
+    A write appends one compact record per change (the patches of
+    pipelines.writer), so it costs the size of the change, not of the
+    corpus; load() replays the journal over the snapshot. Once the journal
+    passes `compact_bytes`, a background thread folds it into a new snapshot.
+    The journal is renamed aside first, so writes go on into a fresh one
+    meanwhile. Replaying a record twice changes nothing, so a crash at any
+    point of a compaction loses nothing.
+    """
+
+    def __init__(self, path: Path = ARTICLES_JSON_FILE, journal: Path = ARTICLES_JOURNAL_FILE,
+                 compact_bytes: int = ARTICLES_JOURNAL_COMPACT_BYTES):
+        self.snapshot = JsonArticleStore(path)
+        self.path = self.snapshot.path
+        self.journal = Path(journal)
+        self.compacting = self.journal.with_name(f"{self.journal.stem}.compacting{self.journal.suffix}")
+        self.compact_bytes = compact_bytes
+        # _lock guards the file switches (append, rotate, replace); _compact_lock
+        # lets one compaction or full save run at a time
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+
+    def __str__(self):
+        return f"{self.path} + {self.journal.name}"
+
+    def files(self) -> List[Path]:
+        return [self.path, self.compacting, self.journal]
+
+    def _open(self, with_journal: bool = True) -> List:
+        # Opened together, so a compaction cannot swap the files between them;
+        # an open handle keeps reading a file that is renamed or deleted meanwhile
+        paths = (self.path, self.compacting, self.journal) if with_journal else (self.path, self.compacting)
+        handles = []
+        with self._lock:
+            for path in paths:
+                try:
+                    handles.append(open(path, 'r', encoding='utf-8'))
+                except FileNotFoundError:
+                    handles.append(None)
+        return handles
+
+    @staticmethod
+    def _records(f) -> Iterable[Dict]:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-append leaves at most one torn line at the end
+                continue
+
+    def _read(self, with_journal: bool = True) -> Optional[Dict]:
+        from .loader import migrate_articles
+        handles = self._open(with_journal)
+        try:
+            data = json.load(handles[0]) if handles[0] else None
+            records = [record for f in handles[1:] if f for record in self._records(f)]
+        finally:
+            for f in handles:
+                if f:
+                    f.close()
+        if data is None and not records:
+            return None
+        data = data or {"articles": [], "metadata": {}}
+        migrate_articles(data)
+        replay_patches(data, records)
+        return data
+
+    def load(self) -> Optional[Dict]:
+        return self._read()
+
+    def save(self, data: Dict) -> bool:
+        """Replace everything with `data`: a new snapshot and an empty journal."""
+        with self._compact_lock, self._lock:
+            self.snapshot.save(data)
+            self.compacting.unlink(missing_ok=True)
+            self.journal.unlink(missing_ok=True)
+        return True
+
+    def apply_patch(self, added: List[Dict], fields: Dict[str, Dict], meta: Dict, removed: Iterable[str] = ()) -> bool:
+        """Append the changes to the journal (one fsync); same effect as the other stores' apply_patch."""
+        removed = list(removed)
+        records = [{"op": "remove", "ids": removed}] if removed else []
+        records += [{"op": "add", "articles": added}] if added else []
+        records += [{"op": "set", "id": article_id, "fields": values} for article_id, values in fields.items()]
+        records += [{"op": "meta", "key": key, "value": value} for key, value in meta.items()]
+        if not records:
+            return True
+        lines = "".join(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in records)
+        with self._lock:
+            created = not self.journal.exists()
+            self.journal.parent.mkdir(exist_ok=True)
+            with open(self.journal, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            if created:
+                fsync_directory(self.journal.parent)
+            size = self.journal.stat().st_size
+        bump_store_version()
+        if size >= self.compact_bytes and not self._compact_lock.locked():
+            threading.Thread(target=self.compact, name="journal-compaction", daemon=True).start()
+        return True
+
+    def compact(self) -> bool:
+        """Fold the journal into a new snapshot; False if another compaction is running or it failed."""
+        if not self._compact_lock.acquire(blocking=False):
+            return False
+        try:
+            started = time.perf_counter()
+            with self._lock:
+                # A compacting journal left by a crash is folded first; the current one waits its turn
+                if self.journal.exists() and not self.compacting.exists():
+                    os.replace(self.journal, self.compacting)
+            if not self.compacting.exists():
+                return True
+            size = self.compacting.stat().st_size
+            self.snapshot.save(self._read(with_journal=False))
+            with self._lock:
+                self.compacting.unlink()
+            print(f"Compacted {size / 1024:.0f} KB of journal into {self.path} in {time.perf_counter() - started:.2f}s")
+            return True
+        except Exception as e:
+            print(f"Error compacting {self.journal}: {e}")
+            return False
+        finally:
+            self._compact_lock.release()
+
+    def count(self) -> int:
+        data = self.load()
+        return len(data.get("articles", [])) if data else 0
+
+    def get_article(self, article_id: str) -> Optional[Dict]:
+        data = self.load()
+        return next((a for a in data.get("articles", []) if a.get("id") == article_id), None) if data else None
+
+    def update_articles(self, articles: List[Dict]) -> bool:
+        """Set every field of the stored articles with the same ids; ids not stored are ignored."""
+        return self.apply_patch([], {a.get("id"): a for a in articles if a.get("id")}, {})
+
+    def add_articles(self, articles: List[Dict]) -> bool:
+        """Insert new articles; stored ones with the same id get their fields set."""
+        return self.apply_patch(articles, {a.get("id"): a for a in articles if a.get("id")}, {})
+
+    def get_meta(self, key: str, default=None):
+        data = self.load()
+        return data.get(key, default) if data else default
+
+    def set_meta(self, key: str, value) -> bool:
+        return self.apply_patch([], {}, {key: value})
+
+
+def import_json_articles(store: SqliteArticleStore, json_path: Path = ARTICLES_JSON_FILE) -> int:
+    """One-shot import of an articles.json document into `store`; returns the number of articles.
+
+    The JSON file is left in place as a backup.
+    """
+    data = JsonArticleStore(json_path).load()
+    if not data:
+        return 0
+    from .loader import migrate_articles
+    migrate_articles(data)
+    store.save(data)
+    print(f"Imported {len(data.get('articles', []))} articles from {json_path} into {store}")
+    return len(data.get("articles", []))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_article_store():
+    """The configured article store (ARTICLE_STORE), created on first use.
+
+    The first time the SQLite store is opened empty next to an existing
+    articles.json, that file is imported.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            if ARTICLE_STORE == "sqlite":
+                fresh = not ARTICLES_DB_FILE.exists()
+                store = SqliteArticleStore(ARTICLES_DB_FILE)
+                if fresh and ARTICLES_JSON_FILE.exists():
+                    import_json_articles(store, ARTICLES_JSON_FILE)
+            elif ARTICLE_STORE == "journal":
+                store = JournalArticleStore(ARTICLES_JSON_FILE, ARTICLES_JOURNAL_FILE)
+            else:
+                store = JsonArticleStore(ARTICLES_JSON_FILE)
+            _store = store
+        return _store
+
+
+if __name__ == "__main__":
+    # python -m pipelines.store import [path/to/articles.json]
+    if len(sys.argv) < 2 or sys.argv[1] != "import":
+        print("usage: python -m pipelines.store import [articles.json]")
+        sys.exit(2)
+    source = Path(sys.argv[2]) if len(sys.argv) > 2 else ARTICLES_JSON_FILE
+    imported = import_json_articles(SqliteArticleStore(ARTICLES_DB_FILE), source)
+    sys.exit(0 if imported else 1)
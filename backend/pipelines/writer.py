@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Tuple
+from .config import WRITER_BATCH_DELAY, WRITER_MAX_BATCH
+from .store import get_article_store
+
+
+# Every change to the stored articles goes through one ArticleWriter thread
+# as a list of patches:
+#
+#   {"op": "add", "articles": [...]}           insert articles whose id is not stored
+#   {"op": "set", "id": id, "fields": {...}}   update fields of one stored article
+#   {"op": "meta", "key": key, "value": value} replace a top-level key ("metadata", ...)
+#   {"op": "remove", "ids": [...]}             delete articles (see pipelines.retention)
+#
+# Patches only touch what they name, so a fetch adding articles and a request
+# summarizing one no longer overwrite each other's work. Patches queued close
+# together are merged and committed with one store.apply_patch() call.
+
+OPS = ("add", "set", "meta", "remove")
+
+
+def coalesce(patches: Iterable[Dict]) -> Tuple[List[Dict], Dict[str, Dict], Dict, List[str]]:
+    """Merge patches into (added articles, fields by id, meta, removed ids).
+
+    Stores apply them as removals, then additions, then fields and meta, which
+    gives the same result as the patches in order: removing an id also drops
+    what earlier patches added or set for it. The first added article with an
+    id wins.
+    """
+    added = {}
+    fields = {}
+    meta = {}
+    removed = set()
+    for patch in patches:
+        if patch["op"] == "add":
+            for article in patch["articles"]:
+                added.setdefault(article.get("id"), article)
+        elif patch["op"] == "set":
+            fields.setdefault(patch["id"], {}).update(patch["fields"])
+        elif patch["op"] == "remove":
+            for article_id in patch["ids"]:
+                added.pop(article_id, None)
+                fields.pop(article_id, None)
+                removed.add(article_id)
+        else:
+            meta[patch["key"]] = patch["value"]
+    added.pop(None, None)
+    return list(added.values()), fields, meta, sorted(removed)
+
+
+class ArticleWriter:
+    """The single writer of the article store.
+
+    submit() returns a Future that resolves to True once the patches are
+    durably stored, or raises the error that stopped the write.
+    """
+
+    def __init__(self, store=None, batch_delay: float = WRITER_BATCH_DELAY, max_batch: int = WRITER_MAX_BATCH):
+        self.store = store
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, patches: List[Dict]) -> Future:
+        for patch in patches:
+            if patch.get("op") not in OPS:
+                raise ValueError(f"Unknown patch op: {patch.get('op')}")
+        future = Future()
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="article-writer", daemon=True)
+                self._thread.start()
+        self._queue.put((patches, future))
+        return future
+
+    def add_articles(self, articles: List[Dict]) -> Future:
+        return self.submit([{"op": "add", "articles": list(articles)}])
+
+    def set_fields(self, article_id: str, fields: Dict) -> Future:
+        return self.submit([{"op": "set", "id": article_id, "fields": dict(fields)}])
+
+    def set_meta(self, key: str, value) -> Future:
+        return self.submit([{"op": "meta", "key": key, "value": value}])
+
+    def remove_articles(self, article_ids: List[str]) -> Future:
+        return self.submit([{"op": "remove", "ids": list(article_ids)}])
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Give patches arriving close together a chance to share the write
+            batch_end = time.monotonic() + self.batch_delay
+            while len(batch) < self.max_batch:
+                remaining = batch_end - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[List[Dict], Future]]):
+        added, fields, meta, removed = coalesce(patch for patches, _ in batch for patch in patches)
+        try:
+            if added or fields or meta or removed:
+                store = self.store or get_article_store()
+                store.apply_patch(added, fields, meta, removed)
+                print(f"Committed {len(batch)} changes to {store} "
+                      f"({len(added)} added, {len(fields)} updated, {len(removed)} removed)")
+        except Exception as e:
+            print(f"Error writing articles: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for _, future in batch:
+            future.set_result(True)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_article_writer() -> ArticleWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ArticleWriter()
+        return _writer
@@ -1,5 +1,6 @@
 from .articles import articles_bp
 from .fetch import fetch_bp
 from .ai import ai_bp
+from .sources import sources_bp
 
-__all__ = ['articles_bp', 'fetch_bp', 'ai_bp']
+__all__ = ['articles_bp', 'fetch_bp', 'ai_bp', 'sources_bp']
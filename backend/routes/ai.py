@@ -1,10 +1,41 @@
 from flask import Blueprint, request, jsonify
-from pipelines.loader import load_articles
-from pipelines.operations import save_articles
+from pipelines.loader import load_articles, load_pending_articles
+from pipelines.store import get_article_store
+from pipelines.writer import get_article_writer
 from services.ai_service import categorize_articles, summarize_article
 
 ai_bp = Blueprint('ai', __name__)
 
+SUMMARY_FIELDS = ('ai_summary', 'ai_key_points', 'ai_tags')
+
+
+def pending_additions(articles):
+    """An "add" patch for those of `articles` still only in the pending file, if any.
+
+    The rest are only updated with "set": adding them would bring back
+    articles that retention or archiving removed while the AI call ran.
+    """
+    pending_ids = {a.get('id') for a in load_pending_articles()}
+    added = [a for a in articles if a.get('id') in pending_ids]
+    return [{'op': 'add', 'articles': added}] if added else []
+
+
+def commit_categories(articles, before, categories):
+    """Store the categories that changed and the category list; waits for the write."""
+    changed = [a for a in articles if a.get('ai_category') != before.get(a.get('id'))]
+    patches = pending_additions(changed)
+    patches += [{'op': 'set', 'id': a.get('id'), 'fields': {'ai_category': a.get('ai_category')}} for a in changed]
+    patches.append({'op': 'meta', 'key': 'ai_categories', 'value': categories})
+    get_article_writer().submit(patches).result()
+
+
+def commit_summaries(articles):
+    """Store the summary fields of the given articles; waits for the write."""
+    patches = pending_additions(articles)
+    patches += [{'op': 'set', 'id': a.get('id'), 'fields': {key: a[key] for key in SUMMARY_FIELDS if key in a}}
+                for a in articles]
+    get_article_writer().submit(patches).result()
+
 
 @ai_bp.route('/categorize', methods=['POST'])
 def categorize():
@@ -18,15 +49,13 @@ def categorize():
             }), 404
         
         articles = data['articles']
+        before = {a.get('id'): a.get('ai_category') for a in articles}
         
         # Try AI categorization first, fall back to rule-based if it fails
         print(f"Categorizing {len(articles)} articles...")
         categorized_articles, categories = categorize_articles(articles, quick_mode=True)
         
-        data['articles'] = categorized_articles
-        data['ai_categories'] = categories
-        
-        save_articles(data)
+        commit_categories(categorized_articles, before, categories)
         
         # Count pending articles for background processing
         pending_count = sum(1 for a in articles if a.get('ai_category') == 'Pending')
@@ -64,15 +93,13 @@ def categorize_fallback():
             }), 404
         
         articles = data['articles']
+        before = {a.get('id'): a.get('ai_category') for a in articles}
         
         print(f"Using fallback categorization for {len(articles)} articles...")
         from services.ai_service import fallback_categorize_articles
         categorized_articles, categories = fallback_categorize_articles(articles)
         
-        data['articles'] = categorized_articles
-        data['ai_categories'] = categories
-        
-        save_articles(data)
+        commit_categories(categorized_articles, before, categories)
         
         return jsonify({
             'success': True,
@@ -104,15 +131,20 @@ def summarize():
                 'message': 'article_id is required'
             }), 400
         
-        data = load_articles()
-        
-        if not data or not data.get('articles'):
-            return jsonify({
-                'success': False,
-                'message': 'No articles found'
-            }), 404
+        # A read-only store lookup; all writes go through the article writer
+        article = get_article_store().get_article(article_id)
         
-        article = next((a for a in data['articles'] if a.get('id') == article_id), None)
+        if not article:
+            # Fetched in a run that has not saved its snapshot yet
+            data = load_articles()
+            
+            if not data or not data.get('articles'):
+                return jsonify({
+                    'success': False,
+                    'message': 'No articles found'
+                }), 404
+            
+            article = next((a for a in data['articles'] if a.get('id') == article_id), None)
         print(f"article = {article}")
         
         if not article:
@@ -136,7 +168,8 @@ def summarize():
         article['ai_key_points'] = summary_data['key_points']
         article['ai_tags'] = summary_data['tags']
         
-        save_articles(data)
+        # Writes this one article, not the whole corpus
+        commit_summaries([article])
         
         return jsonify({
             'success': True,
@@ -170,22 +203,18 @@ def auto_summarize():
         articles = data['articles']
         
         # Filter articles from last 24 hours that don't have ai_summary
-        cutoff_time = datetime.now() - timedelta(hours=24)
+        cutoff_ts = (datetime.now() - timedelta(hours=24)).timestamp()
         recent_articles = []
         
+        # Articles are stored newest first, so stop at the first one past the cutoff
         for article in articles:
-            # Check if article is recent
-            try:
-                from dateutil import parser as date_parser
-                article_date = date_parser.parse(article.get('published', ''))
-                if article_date.tzinfo:
-                    article_date = article_date.replace(tzinfo=None)
-                
-                # Only summarize if recent and not already summarized
-                if article_date >= cutoff_time and 'ai_summary' not in article:
-                    recent_articles.append(article)
-            except:
-                continue
+            published_ts = article.get('published_ts')
+            if published_ts is None or published_ts < cutoff_ts:
+                break
+            
+            # Only summarize if not already summarized
+            if 'ai_summary' not in article:
+                recent_articles.append(article)
         
         if not recent_articles:
             return jsonify({
@@ -197,14 +226,7 @@ def auto_summarize():
         print(f"Auto-summarizing {len(recent_articles)} recent articles...")
         summarized = batch_summarize_articles(recent_articles, limit=len(recent_articles))
         
-        # Update articles in data
-        article_ids = {a['id'] for a in summarized}
-        for i, article in enumerate(data['articles']):
-            if article['id'] in article_ids:
-                summarized_article = next(a for a in summarized if a['id'] == article['id'])
-                data['articles'][i] = summarized_article
-        
-        save_articles(data)
+        commit_summaries(summarized)
         
         return jsonify({
             'success': True,
@@ -1,37 +1,238 @@
-from flask import Blueprint, request, jsonify
-from pipelines.loader import load_articles
+from bisect import bisect_left
+import json
+import math
+from datetime import datetime, timezone
+from flask import Blueprint, Response, request, jsonify
+from pipelines.snapshot import get_snapshot, page_articles, article_sort_key, range_bounds
+from pipelines.facets import FACETS, matches_facets
+from pipelines.retention import run_retention
+from pipelines.archive import articles_in_range, segments_overlapping, tier_articles
+from pipelines.search import search_articles
+from pipelines.config import ARCHIVE_HORIZON_DAYS, ARTICLES_DEFAULT_PAGE_SIZE, ARTICLES_MAX_PAGE_SIZE, FACETS_MAX_VALUES
+from .http_cache import cached_get, request_snapshot, skip_cache
 
 articles_bp = Blueprint('articles', __name__)
 
+# Named field sets for fields=; "full" is every field. Article lists default
+# to "list", what a list view shows; GET /articles/<id> has the rest
+FIELD_SETS = {
+    'list': ('id', 'title', 'source', 'published', 'image_url', 'ai_category'),
+}
+
+
+def parse_time(value):
+    """A unix timestamp or an ISO date/datetime query parameter as a timestamp; None if absent.
+
+    Without an offset the date is UTC, as stored published dates are; ValueError if not finite.
+    """
+    if not value:
+        return None
+    try:
+        timestamp = float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        timestamp = moment.timestamp()
+    if not math.isfinite(timestamp):
+        raise ValueError(f"Not a finite time: {value}")
+    return timestamp
+
+
+def parse_body_number(data, key, integer=False):
+    """data[key] (a number or a numeric string) as a finite number >= 0; None if absent.
+
+    With `integer` it must be a whole number. ValueError otherwise.
+    """
+    value = data.get(key)
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{key} must be a number")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} must be a number")
+    if not math.isfinite(number) or number < 0 or (integer and not number.is_integer()):
+        raise ValueError(f"{key} must be a finite{' whole' if integer else ''} number >= 0")
+    return int(number) if integer else number
+
+
+def parse_fields(default='list'):
+    """The fields= parameter (field names and FIELD_SETS names, comma-separated) as a tuple; None for every field."""
+    names = [name.strip() for name in request.args.get('fields', '').split(',') if name.strip()] or [default]
+    if 'full' in names:
+        return None
+    fields = []
+    for name in names:
+        fields.extend(FIELD_SETS.get(name, (name,)))
+    return tuple(dict.fromkeys(fields))
+
+
+def articles_json(snapshot, articles, fields, **rest):
+    """{"articles": [...], **rest} as JSON, each article from its cached encoding (see encode_article)."""
+    encoded = ",".join(snapshot.encode_article(article, fields) for article in articles)
+    rest = json.dumps(rest, ensure_ascii=False, separators=(",", ":"))
+    return Response('{"articles":[' + encoded + ']' + (',' + rest[1:] if rest != '{}' else '}'),
+                    mimetype='application/json')
+
+
+def parse_facet_filters():
+    """Facet filters of the request as ({facet: [values]}, match).
+
+    Each facet parameter (ai_category, source, tag, day) may be repeated or
+    comma-separated; an article matches any of a facet's values, and all the
+    facets given, or any of them with match=any.
+    """
+    filters = {}
+    for facet in FACETS:
+        values = [value.strip() for raw in request.args.getlist(facet) for value in raw.split(',') if value.strip()]
+        if values:
+            filters[facet] = [value.lower() for value in values] if facet == 'tag' else values
+    match = request.args.get('match', 'all')
+    if match not in ('all', 'any'):
+        raise ValueError("match must be 'all' or 'any'")
+    return filters, match
+
 
 @articles_bp.route('/articles', methods=['GET'])
+@cached_get
 def get_articles():
     try:
-        # Load articles from file
-        data = load_articles()
+        snapshot = request_snapshot()
         
-        if not data:
+        try:
+            since = parse_time(request.args.get('since'))
+            until = parse_time(request.args.get('until'))
+        except ValueError:
+            return jsonify({"error": "since and until must be timestamps or ISO dates"}), 400
+        try:
+            filters, match = parse_facet_filters()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        ranged = since is not None or until is not None
+        
+        if snapshot.empty and not ranged:
             return jsonify({
                 "articles": [],
                 "message": "No articles found. Try fetching first using POST /api/fetch"
             }), 404
         
-        articles = data.get("articles", [])
+        articles = snapshot.articles
         
         # Apply filters
         category = request.args.get('category')
-        limit = request.args.get('limit', type=int)
+        limit = max(1, min(request.args.get('limit', type=int) or ARTICLES_DEFAULT_PAGE_SIZE, ARTICLES_MAX_PAGE_SIZE))
+        
+        fields = parse_fields()
+        
+        query = request.args.get('q', '').strip()
+        if query:
+            return search_response(snapshot, query, category, filters, match, since, until, limit,
+                                   request.args.get('cursor'), fields)
+        
+        if ranged and segments_overlapping(since, until):
+            # Archived articles come from the segments overlapping the range only
+            articles = articles_in_range(articles, since, until)
+            if category:
+                articles = [a for a in articles if category.lower() in a.get('source', '').lower()]
+            if filters:
+                articles = [a for a in articles if matches_facets(a, filters, match)]
+            articles.sort(key=article_sort_key)
+        elif category or filters:
+            articles = snapshot.filter_articles(category, filters, match)
         
-        if category:
-            articles = [a for a in articles if category.lower() in a.get('source', '').lower()]
+        # Pages follow (published, id) order; next_cursor continues after the last article
+        try:
+            page, total, next_cursor = page_articles(articles, limit, since, until, request.args.get('cursor'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        if limit:
-            articles = articles[:limit]
+        return articles_json(snapshot, page, fields,
+                             count=len(page),
+                             total=total,
+                             next_cursor=next_cursor,
+                             metadata=snapshot.metadata)
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@articles_bp.route('/articles/<path:article_id>', methods=['GET'])
+@cached_get
+def get_article(article_id):
+    """One stored article with every field (or fields=); ids are URLs, so clients percent-encode them."""
+    try:
+        snapshot = request_snapshot()
+        article = snapshot.by_id.get(article_id)
+        
+        if article is None:
+            return jsonify({"error": f"Article not found: {article_id}"}), 404
+        
+        fields = parse_fields(default='full')
+        return Response('{"article":' + snapshot.encode_article(article, fields) + '}', mimetype='application/json')
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def search_response(snapshot, query, category, filters, match, since, until, limit, cursor, fields):
+    """Stored articles matching `query`, best first; next_cursor is the offset of the next page."""
+    try:
+        offset = int(cursor) if cursor else 0
+        if offset < 0:
+            raise ValueError(cursor)
+    except ValueError:
+        return jsonify({"error": f"Invalid cursor: {cursor}"}), 400
+    
+    keep = None
+    if category or filters or since is not None or until is not None:
+        # The articles passing the filters, from the indexes; the range is a slice of them
+        candidates = snapshot.filter_articles(category, filters, match)
+        start, end = range_bounds(candidates, since, until)
+        keep = {article.get('id') for article in candidates[start:end]}.__contains__
+    
+    total, hits, synced = search_articles(snapshot, query, offset + limit, keep)
+    if not synced:
+        # The index is still catching up with the snapshot: the same query may soon find more
+        skip_cache()
+    page = [snapshot.by_id[article_id] for _, article_id in hits[offset:]]
+    
+    return articles_json(snapshot, page, fields,
+                         count=len(page),
+                         total=total,
+                         next_cursor=str(offset + limit) if offset + limit < total else None,
+                         metadata=snapshot.metadata)
+
+
+@articles_bp.route('/facets', methods=['GET'])
+@cached_get
+def get_facets():
+    """Article counts per ai_category, source, tag and day among the stored articles passing the filters."""
+    try:
+        snapshot = request_snapshot()
+        
+        try:
+            since = parse_time(request.args.get('since'))
+            until = parse_time(request.args.get('until'))
+            filters, match = parse_facet_filters()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        category = request.args.get('category')
+        top = max(1, request.args.get('limit', type=int) or FACETS_MAX_VALUES)
+        
+        # Positions are in newest-first order, so the date range is one slice of them
+        start, end = range_bounds(snapshot.articles, since, until)
+        selected = snapshot.select_positions(category, filters, match)
+        facets = snapshot.facet_index().counts(selected, start, end, top)
+        if selected is None:
+            total = end - start
+        else:
+            total = bisect_left(selected, end) - bisect_left(selected, start)
         
         return jsonify({
-            "articles": articles,
-            "count": len(articles),
-            "metadata": data.get("metadata", {})
+            "facets": facets,
+            "total": total
         })
         
     except Exception as e:
@@ -39,52 +240,92 @@ def get_articles():
 
 
 @articles_bp.route('/stats', methods=['GET'])
+@cached_get
 def get_stats():
     try:
-        data = load_articles()
+        snapshot = request_snapshot()
         
-        if not data:
+        if snapshot.empty:
             return jsonify({
                 "message": "No articles found"
             }), 404
         
-        articles = data.get("articles", [])
-        
-        # Calculate stats
-        sources = {}
-        for article in articles:
-            source = article.get("source", "Unknown")
-            sources[source] = sources.get(source, 0) + 1
-        
+        # Source counts are computed once per snapshot
         return jsonify({
-            "total_articles": len(articles),
-            "total_sources": len(sources),
-            "top_sources": sorted(sources.items(), key=lambda x: x[1], reverse=True)[:10],
-            "metadata": data.get("metadata", {})
+            "total_articles": snapshot.count,
+            "total_sources": snapshot.total_sources,
+            "top_sources": snapshot.top_sources,
+            "metadata": snapshot.metadata
         })
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @articles_bp.route('/articles/count', methods=['GET'])
+@cached_get
 def get_article_count():
     try:
-        data = load_articles()
+        snapshot = request_snapshot()
         
-        if not data:
+        if snapshot.empty:
             return jsonify({
                 "count": 0,
                 "last_updated": None
             })
         
-        articles = data.get("articles", [])
-        metadata = data.get("metadata", {})
+        metadata = snapshot.metadata
         
         return jsonify({
-            "count": len(articles),
+            "count": snapshot.count,
             "last_updated": metadata.get("fetched_at"),
             "new_articles": metadata.get("new_articles", 0)
         })
         
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+@articles_bp.route('/articles/cleanup', methods=['POST'])
+def cleanup_articles():
+    """Evict articles by age and count now; the body may override maxArticles / cleanupDays."""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            # 0 means no limit, as in the settings
+            max_articles = parse_body_number(data, 'max_articles', integer=True)
+            cleanup_days = parse_body_number(data, 'cleanup_days')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        report = run_retention(max_articles=max_articles, cleanup_days=cleanup_days,
+                               dry_run=bool(data.get('dry_run', False)))
+        
+        return jsonify({
+            "success": True,
+            "retention": report
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@articles_bp.route('/articles/archive', methods=['POST'])
+def archive_old_articles():
+    """Move articles older than the archive horizon (or body.horizon_days) to the archive now."""
+    try:
+        data = request.get_json(silent=True) or {}
+        try:
+            horizon_days = parse_body_number(data, 'horizon_days')
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        snapshot = get_snapshot()
+        _, report = tier_articles(list(snapshot.articles),
+                                  horizon_days=ARCHIVE_HORIZON_DAYS if horizon_days is None else horizon_days,
+                                  dry_run=bool(data.get('dry_run', False)))
+        
+        return jsonify({
+            "success": True,
+            "archive": report
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,57 +1,108 @@
 from flask import Blueprint, request, jsonify
+import math
 import threading
 from pipelines.fetcher import fetch_all_articles
-from pipelines.operations import save_articles
+from pipelines.loader import load_articles, load_pending_articles
+from pipelines.operations import clear_pending_articles
+from pipelines.writer import get_article_writer
+from pipelines.retention import run_retention
+from pipelines.archive import tier_articles
+from pipelines.user_data import load_user_settings
+from pipelines.config import (FETCH_MAX_WORKERS, FETCH_MAX_WORKERS_LIMIT, FETCH_PIPELINE, FETCH_RUN_DEADLINE,
+                              ARCHIVE_ENABLED)
+from pipelines.http_client import abort_downloads
 
 fetch_bp = Blueprint('fetch', __name__)
 
 fetch_status = {"running": False, "last_result": None, "cancelled": False}
 fetch_thread = None
+# Held while a request checks that no run is going on and starts one
+fetch_start_lock = threading.Lock()
 
 
-def fetch_in_background(max_sources, days=1):
+def commit_fetch_result(result) -> bool:
+    """Store the run's new articles and metadata, then drop the pending file that held them."""
+    try:
+        # The file may also hold articles of an earlier run that crashed before
+        # committing: loaded with the stored ones, they are not in added_articles
+        pending = load_pending_articles()
+        get_article_writer().submit([
+            {"op": "add", "articles": pending + result["added_articles"]},
+            {"op": "meta", "key": "metadata", "value": result["metadata"]},
+        ]).result()
+    except Exception as e:
+        print(f"Error saving fetched articles: {e}", flush=True)
+        return False
+    return clear_pending_articles()
+
+
+def cleanup_after_fetch(result):
+    """Archive old articles, then apply the retention settings if autoCleanup is on.
+
+    Call after commit_fetch_result(): the writer has then stored everything
+    queued before, so the corpus is re-read with the summaries and categories
+    set during the fetch, which result["articles"] (read when it started) lacks.
+    """
+    try:
+        data = load_articles()
+        articles = data.get('articles', []) if data else []
+        if ARCHIVE_ENABLED:
+            articles, result["archive"] = tier_articles(articles)
+        if load_user_settings().get("autoCleanup", True):
+            result["retention"] = run_retention(articles)
+    except Exception as e:
+        print(f"Cleanup after fetch failed: {e}", flush=True)
+
+
+def fetch_in_background(max_sources, days=1, max_workers=FETCH_MAX_WORKERS, pipeline=FETCH_PIPELINE,
+                        deadline=FETCH_RUN_DEADLINE, force=False):
     global fetch_status, fetch_thread
 
     try:
-        fetch_status["running"] = True
-        fetch_status["cancelled"] = False
         print(f"Background fetch started (max_sources: {max_sources or 'all'}, days: {days})", flush=True)
         
         # Check for cancellation before starting
         if fetch_status["cancelled"]:
             print("Fetch cancelled before starting", flush=True)
-            fetch_status["running"] = False
             return
         
-        result = fetch_all_articles(max_sources=max_sources, days=days, check_cancelled=lambda: fetch_status["cancelled"])
-        
-        # Check for cancellation after fetch
-        if fetch_status["cancelled"]:
-            print("Fetch cancelled after completion", flush=True)
-            fetch_status["running"] = False
-            fetch_status["last_result"] = {"cancelled": True, "message": "Fetch cancelled by user"}
+        result = fetch_all_articles(max_sources=max_sources, days=days, check_cancelled=lambda: fetch_status["cancelled"],
+                                    max_workers=max_workers, pipeline=pipeline, deadline=deadline,
+                                    adaptive_schedule=not force)
+        
+        # A cancelled or timed-out run still returns what it gathered; keep it
+        if result['metadata'].get('partial'):
+            if commit_fetch_result(result):
+                cleanup_after_fetch(result)
+            print(f"Partial fetch saved ({result['metadata']['stop_reason']}): "
+                  f"{result['metadata']['new_articles']} new articles", flush=True)
+            if fetch_status["cancelled"]:
+                fetch_status["last_result"] = {"cancelled": True, "message": "Fetch cancelled by user",
+                                               "metadata": result['metadata']}
+            else:
+                fetch_status["last_result"] = result
             return
         
-        save_articles(result)
+        if commit_fetch_result(result):
+            cleanup_after_fetch(result)
         
         fetch_status["last_result"] = result
         
         print("Background fetch completed successfully", flush=True)
         print(f"Total articles: {result['metadata']['total_articles']}", flush=True)
         print(f"New articles: {result['metadata']['new_articles']}", flush=True)
-        
-        # Set running to False LAST to ensure everything is saved
-        fetch_status["running"] = False
-        print(f"[FETCH COMPLETE] Status updated: running=False, result set", flush=True)
+        print("[FETCH COMPLETE] Result set", flush=True)
         
     except Exception as e:
         print(f"Background fetch failed: {e}", flush=True)
         import traceback
         traceback.print_exc()
-        fetch_status["running"] = False
         fetch_status["last_result"] = {"error": str(e)}
     finally:
+        # Set running to False LAST, once everything is saved and cleaned up:
+        # a new run started earlier would share the pending file with this one
         fetch_thread = None
+        fetch_status["running"] = False
 
 
 @fetch_bp.route('/fetch', methods=['POST'])
@@ -59,21 +110,46 @@ def fetch_news():
     global fetch_thread
     
     try:
-        if fetch_status["running"]:
-            return jsonify({
-                "success": False,
-                "message": "Fetch already in progress"
-            }), 409
-        
         data = request.get_json() or {}
         max_sources = data.get('max_sources')
         days = data.get('days', 1)  # Default to 1 day if not specified
+        pipeline = data.get('pipeline', FETCH_PIPELINE)
+        force = bool(data.get('force', False))  # Poll every source, ignoring the schedule
+        
+        try:
+            max_workers = min(max(1, int(data.get('max_workers', FETCH_MAX_WORKERS))), FETCH_MAX_WORKERS_LIMIT)
+            deadline = data.get('deadline', FETCH_RUN_DEADLINE)  # Seconds for the whole run, null for no limit
+            if deadline is not None:
+                deadline = float(deadline)
+                if not math.isfinite(deadline) or deadline <= 0:
+                    raise ValueError(deadline)
+        except (TypeError, ValueError):
+            return jsonify({
+                "success": False,
+                "message": "max_workers must be an integer and deadline a positive number of seconds"
+            }), 400
         
-        print(f"Starting fetch request (max_sources: {max_sources or 'all'}, days: {days})")
+        if pipeline not in ("threads", "processes"):
+            return jsonify({
+                "success": False,
+                "message": "pipeline must be 'threads' or 'processes'"
+            }), 400
         
-        fetch_thread = threading.Thread(target=fetch_in_background, args=(max_sources, days))
-        fetch_thread.daemon = True
-        fetch_thread.start()
+        with fetch_start_lock:
+            # A cancelled run keeps running until it has saved what it gathered
+            if fetch_status["running"] or (fetch_thread is not None and fetch_thread.is_alive()):
+                return jsonify({
+                    "success": False,
+                    "message": "Fetch already in progress"
+                }), 409
+            
+            print(f"Starting fetch request (max_sources: {max_sources or 'all'}, days: {days}, workers: {max_workers}, pipeline: {pipeline})")
+            
+            fetch_status["running"] = True
+            fetch_status["cancelled"] = False
+            fetch_thread = threading.Thread(target=fetch_in_background, args=(max_sources, days, max_workers, pipeline, deadline, force))
+            fetch_thread.daemon = True
+            fetch_thread.start()
         
         return jsonify({
             "success": True,
@@ -94,6 +170,8 @@ def fetch_status_check():
     print(f"[STATUS CHECK] running={fetch_status['running']}, has_result={fetch_status['last_result'] is not None}", flush=True)
     return jsonify({
         "running": fetch_status["running"],
+        # Cancelled, still saving its partial results
+        "cancelling": fetch_status["running"] and fetch_status["cancelled"],
         "last_result": fetch_status["last_result"]
     })
 
@@ -107,19 +185,19 @@ def cancel_fetch():
                 "message": "No fetch in progress"
             }), 400
         
-        # Set cancellation flag
+        # Set cancellation flag; running stays True until the fetch thread
+        # has saved its partial results
         fetch_status["cancelled"] = True
-        fetch_status["running"] = False
         fetch_status["last_result"] = {"cancelled": True, "message": "Fetch cancelled by user"}
         
-        print("Fetch cancellation requested by user", flush=True)
-        
-        # Note: The thread will check the cancelled flag and stop gracefully
-        # We don't forcefully terminate the thread as it's not safe
+        # Interrupt downloads in progress; the fetch thread then stops and
+        # saves what it gathered so far
+        aborted = abort_downloads()
+        print(f"Fetch cancellation requested by user ({aborted} downloads aborted)", flush=True)
         
         return jsonify({
             "success": True,
-            "message": "Fetch cancellation requested - operation will stop gracefully"
+            "message": "Fetch cancellation requested - partial results will be saved"
         })
         
     except Exception as e:
@@ -0,0 +1,113 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, g, make_response, request
+from pipelines.config import HTTP_CACHE_CONTROL, HTTP_COMPRESS_MIN_BYTES, HTTP_CACHE_ENTRIES
+from pipelines.snapshot import get_snapshot
+
+try:
+    # Optional: brotli-encoded responses when the package is installed
+    import brotli
+    ENCODINGS = ("br", "gzip")
+except ImportError:
+    brotli = None
+    ENCODINGS = ("gzip",)
+
+
+# HTTP caching for the GET endpoints that read the article snapshot. Their
+# responses depend only on the snapshot and the query, so the ETag is the
+# snapshot tag plus a digest of the path and query (and the content encoding,
+# as each encoding is a different body). A request whose If-None-Match names
+# the current ETag gets a 304 without running the view; otherwise the body is
+# taken from a cache of encoded bodies, so each response is rendered and
+# compressed once per snapshot.
+
+_bodies: "OrderedDict[tuple, dict]" = OrderedDict()
+_bodies_lock = threading.Lock()
+
+
+def request_snapshot():
+    """The snapshot the current request is answered from, the same for the whole request."""
+    if "snapshot" not in g:
+        g.snapshot = get_snapshot()
+    return g.snapshot
+
+
+def skip_cache():
+    """Send the current response uncached and without an ETag: it may change while the snapshot does not."""
+    g.skip_cache = True
+
+
+def _encode(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, 6)
+
+
+def _cached_bodies(key) -> dict:
+    with _bodies_lock:
+        bodies = _bodies.get(key)
+        if bodies is not None:
+            _bodies.move_to_end(key)
+        return bodies
+
+
+def _store_bodies(key, bodies: dict):
+    with _bodies_lock:
+        _bodies[key] = bodies
+        while len(_bodies) > HTTP_CACHE_ENTRIES:
+            _bodies.popitem(last=False)
+
+
+def _with_cache_headers(response: Response, etag: str) -> Response:
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = HTTP_CACHE_CONTROL
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def cached_get(view):
+    """Serve a GET view with ETag / If-None-Match, Cache-Control and gzip/brotli encoding.
+
+    The view must read the articles through request_snapshot(). Only 200
+    responses are cached; anything else, or a response the view passed to
+    skip_cache(), is returned as the view made it.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        snapshot = request_snapshot()
+        query = (request.path, tuple(sorted(request.args.items(multi=True))))
+        base_tag = f"{snapshot.tag}-{hashlib.sha1(repr(query).encode('utf-8')).hexdigest()[:12]}"
+        encoding = request.accept_encodings.best_match(ENCODINGS) or "identity"
+
+        # Every encoding of a body carries the same content, so any of its ETags will do
+        for etag in (base_tag, f"{base_tag}-{encoding}"):
+            if request.if_none_match.contains_weak(etag):
+                return _with_cache_headers(Response(status=304), etag)
+
+        key = (snapshot.tag,) + query
+        bodies = _cached_bodies(key)
+        if bodies is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if g.get("skip_cache"):
+                response.headers["Cache-Control"] = "no-store"
+                return response
+            bodies = {"identity": response.get_data(), "mimetype": response.mimetype}
+            _store_bodies(key, bodies)
+
+        body = bodies["identity"]
+        if encoding == "identity" or len(body) < HTTP_COMPRESS_MIN_BYTES:
+            return _with_cache_headers(Response(body, mimetype=bodies["mimetype"]), base_tag)
+        encoded = bodies.get(encoding)
+        if encoded is None:
+            # Encoded once per cached body; a concurrent request may do the same work, harmlessly
+            encoded = bodies[encoding] = _encode(body, encoding)
+        response = Response(encoded, mimetype=bodies["mimetype"])
+        response.headers["Content-Encoding"] = encoding
+        return _with_cache_headers(response, f"{base_tag}-{encoding}")
+
+    return wrapper
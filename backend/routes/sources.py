@@ -0,0 +1,26 @@
+from flask import Blueprint, request, jsonify
+from pipelines.source_health import source_health_report
+
+sources_bp = Blueprint('sources', __name__)
+
+
+@sources_bp.route('/sources/health', methods=['GET'])
+def get_sources_health():
+    try:
+        sort = request.args.get('sort', 'p95')
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            limit = max(1, limit)
+        
+        if sort not in ("p95", "p50", "failures", "bytes"):
+            return jsonify({"error": "sort must be one of p95, p50, failures, bytes"}), 400
+        
+        sources = source_health_report(sort=sort, limit=limit)
+        
+        return jsonify({
+            "sources": sources,
+            "count": len(sources)
+        })
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,98 @@
+"""Benchmark of clean_html against the previous unescape + two re.sub version.
+
+Summaries and contents come from the feeds in testing/feeds/, plus the same
+bodies repeated into long articles like the ones some feeds put in
+<content:encoded>. Also checks that the limited, chunked path returns exactly
+clean_html(text)[:limit] for many chunk sizes, and lists where the output
+differs from the old function (escaped markup is now kept as text).
+
+    cd backend && python testing/bench_clean_html.py [--repeat 20]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from html import unescape
+
+import feedparser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipelines.parser import clean_html
+
+FEEDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feeds")
+
+
+def clean_html_previous(text: str) -> str:
+    if not text:
+        return ""
+    text = unescape(text)
+    text = re.sub(r'<[^>]+>', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def load_bodies():
+    bodies = []
+    for name in sorted(os.listdir(FEEDS_DIR)):
+        with open(os.path.join(FEEDS_DIR, name), "rb") as f:
+            feed = feedparser.parse(f.read())
+        for entry in feed.entries:
+            bodies.append(entry.get("summary", entry.get("description", "")))
+            if entry.get("content"):
+                bodies.append(entry.content[0].get("value", ""))
+    return [body for body in bodies if body]
+
+
+def check_limits(bodies):
+    failures = 0
+    for body in bodies:
+        for limit in (0, 1, 7, 100, 500, 1000):
+            expected = clean_html(body)[:limit]
+            for chunk_size in (1, 2, 3, 5, 16, 64, 1000):
+                if clean_html(body, limit, chunk_size=chunk_size) != expected:
+                    failures += 1
+                    print(f"✗ limit {limit}, chunk {chunk_size}: {body[:60]!r}")
+    return failures
+
+
+def timed(function, bodies, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for body, limit in bodies:
+            function(body, limit)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    bodies = load_bodies()
+    long_bodies = [body * max(1, 200_000 // len(body)) for body in bodies if len(body) > 200]
+    print(f"{len(bodies)} feed bodies, {len(long_bodies)} long bodies "
+          f"(~{sum(map(len, long_bodies)) // len(long_bodies) // 1024} KB each)")
+
+    failures = check_limits(bodies + long_bodies[:5] + ["a &amp b " * 3000, "<p>" * 5000 + "x", "x <y" * 4000])
+    print(f"limited path: {'identical to clean_html(text)[:limit]' if not failures else f'{failures} mismatches'}")
+
+    changed = [body for body in bodies if clean_html(body) != clean_html_previous(body)]
+    print(f"{len(changed)} of {len(bodies)} bodies read differently from the previous version")
+    for body in changed[:5]:
+        before, now = clean_html_previous(body), clean_html(body)
+        start = max(0, next((i for i, (a, b) in enumerate(zip(before, now)) if a != b), len(before)) - 30)
+        print(f"  before: {before[start:start + 70]!r}\n  now:    {now[start:start + 70]!r}")
+
+    print(f"\nms per pass, {args.repeat} passes (summary limit 500, content limit 1000)")
+    for label, cases in (("feed bodies", [(body, 500) for body in bodies]),
+                         ("long bodies", [(body, 1000) for body in long_bodies])):
+        before = timed(lambda body, limit: clean_html_previous(body)[:limit], cases, args.repeat)
+        after = timed(clean_html, cases, args.repeat)
+        print(f"{label}: previous {before:.2f} ms, now {after:.2f} ms ({before / after:.1f}x)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
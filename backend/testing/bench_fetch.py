@@ -0,0 +1,183 @@
+"""End-to-end benchmark of fetch_all_articles against the local replay server.
+
+Starts testing/replay_server.py on a recording (from record_feeds.py, or a
+synthetic one built from testing/feeds/ with --synthetic N) and runs the full
+fetch pipeline against it, with the sources, stored articles and feed state
+kept in memory so nothing under fetched_data/ is touched. The first run is
+cold; later runs reuse the feed state and articles, so they exercise
+conditional GET and the duplicate checks. Each run reports wall time,
+articles/sec, CPU time, peak RSS and the time summed per fetch stage.
+
+    cd backend && python testing/bench_fetch.py --synthetic 110 --latency 80 --jitter 40 \\
+        [--recording testing/recordings] [--pipeline threads] [--workers 8] [--runs 2]
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+TESTING_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTING_DIR))
+
+import pipelines.fetcher as fetcher
+from replay_server import load_recording, host_indexes, replay_url
+
+STAGES = ("dns_ms", "connect_ms", "download_ms", "parse_ms", "normalize_ms")
+CONTENT_TYPES = {".rss": "application/rss+xml", ".atom": "application/atom+xml", ".rdf": "application/rdf+xml"}
+
+
+def synthetic_recording(directory, count):
+    """A recording of `count` sources cycling over the feeds in testing/feeds/, about 10% sharing a host."""
+    feeds_dir = os.path.join(TESTING_DIR, "feeds")
+    names = sorted(os.listdir(feeds_dir))
+    os.makedirs(os.path.join(directory, "bodies"), exist_ok=True)
+    sources = []
+    for index in range(count):
+        name = names[index % len(names)]
+        body = os.path.join("bodies", f"{index:04d}")
+        shutil.copyfile(os.path.join(feeds_dir, name), os.path.join(directory, body))
+        sources.append({
+            "url": f"https://site{index * 9 // 10}.example.com/{name}",
+            "status": 200,
+            "headers": {"content-type": CONTENT_TYPES.get(os.path.splitext(name)[1], "application/xml")},
+            "body": body,
+            "error": None,
+        })
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"recorded_at": None, "sources": sources}, f)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"replay server did not start on port {port}")
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence stdout at the file descriptor level, so parse worker processes are quiet too."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    with open(os.devnull, "w") as devnull:
+        os.dup2(devnull.fileno(), 1)
+        try:
+            with contextlib.redirect_stdout(devnull):
+                yield
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved, 1)
+            os.close(saved)
+
+
+def run_fetch(urls, state, args):
+    """One fetch_all_articles run; returns (result, health records, wall seconds, cpu seconds)."""
+    captured = {}
+    fetcher.load_sources = lambda: urls
+    fetcher.load_articles = lambda: {"articles": list(state["articles"])} if state["articles"] else None
+    fetcher.load_feed_state = lambda: state["feed_state"]
+    fetcher.save_feed_state = lambda feed_state: True
+    fetcher.record_source_runs = lambda records: captured.update(records) or True
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    with quiet():
+        result = fetcher.fetch_all_articles(days=args.days, max_workers=args.workers, pipeline=args.pipeline,
+                                            deadline=None, stream_commit=False, adaptive_schedule=False)
+    wall = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+    state["articles"] = result["articles"]
+    return result, captured, wall, cpu
+
+
+def report(run, result, records, wall, cpu):
+    metadata = result["metadata"]
+    parsed = sum(record.get("articles") or 0 for record in records.values())
+    statuses = {}
+    for record in records.values():
+        statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+    peak_self = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    peak_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+    print(f"run {run}: {wall:.2f} s wall, {cpu:.2f} s CPU (this process), "
+          f"{parsed / wall:.0f} articles/s parsed, {metadata['new_articles']} new")
+    print(f"  sources: {statuses}, {metadata['bytes_wire'] / 1024:.0f} KB on the wire")
+    print(f"  peak RSS: {peak_self:.0f} MB this process, {peak_children:.0f} MB largest finished child")
+    totals = {stage: sum(record.get(stage) or 0 for record in records.values()) for stage in STAGES}
+    print("  time summed over sources: " + ", ".join(f"{stage[:-3]} {total / 1000:.2f} s"
+                                                      for stage, total in totals.items()))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--recording", help="directory written by record_feeds.py")
+    arg_parser.add_argument("--synthetic", type=int, default=110, help="sources in a synthetic recording")
+    arg_parser.add_argument("--pipeline", choices=("threads", "processes"), default="threads")
+    arg_parser.add_argument("--workers", type=int, default=8)
+    arg_parser.add_argument("--runs", type=int, default=2, help="first run cold, the rest warm")
+    arg_parser.add_argument("--days", type=int, default=3650, help="date window passed to the fetch")
+    arg_parser.add_argument("--one-address", action="store_true",
+                            help="serve every source from 127.0.0.1 (where 127.x.y.z is not routed)")
+    server_options = ("--latency", "--jitter", "--error-rate", "--not-modified", "--validators")
+    arg_parser.add_argument("--latency", default="50")
+    arg_parser.add_argument("--jitter", default="20")
+    arg_parser.add_argument("--error-rate", default="0")
+    arg_parser.add_argument("--not-modified", default="honor")
+    arg_parser.add_argument("--validators", default="synthetic")
+    arg_parser.add_argument("--gzip", action="store_true")
+    args = arg_parser.parse_args()
+
+    temporary = None
+    recording = args.recording
+    if not recording:
+        temporary = tempfile.mkdtemp(prefix="feed-recording-")
+        synthetic_recording(temporary, args.synthetic)
+        recording = temporary
+
+    manifest = load_recording(recording)
+    port = free_port()
+    command = [sys.executable, os.path.join(TESTING_DIR, "replay_server.py"), recording, "--port", str(port)]
+    for option in server_options:
+        command += [option, str(getattr(args, option[2:].replace("-", "_")))]
+    if args.gzip:
+        command.append("--gzip")
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        source_urls = [source["url"] for source in manifest["sources"]]
+        urls = [replay_url(index, host_index, port, args.one_address)
+                for index, host_index in enumerate(host_indexes(source_urls))]
+        print(f"{len(urls)} sources on {len(set(host_indexes(source_urls)))} hosts, {args.pipeline} pipeline, "
+              f"{args.workers} workers, latency {args.latency}±{args.jitter} ms, error rate {args.error_rate}\n")
+
+        state = {"articles": [], "feed_state": {"feeds": {}}}
+        for run in range(1, args.runs + 1):
+            report(run, *run_fetch(urls, state, args))
+    finally:
+        server.terminate()
+        server.wait()
+        if temporary:
+            shutil.rmtree(temporary, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
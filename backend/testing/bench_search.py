@@ -0,0 +1,121 @@
+"""Benchmark full-text search on a synthetic corpus: index build, incremental sync and query latency.
+
+Articles get titles and bodies drawn from a Zipf-distributed vocabulary, so
+common words match most of the corpus and rare ones a handful of articles.
+Times the first sync (full build), a sync after a simulated fetch adds
+articles, queries made while a background sync runs, the scan that answers
+queries before the first build is done, and single-word, two-word and prefix
+queries, reporting p50/p99.
+
+    cd backend && python testing/bench_search.py [--size 100000] [--added 100] [--queries 200]
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipelines.search import SearchIndex, scan_articles
+from pipelines.snapshot import ArticleSnapshot
+
+VOCABULARY_SIZE = 50000
+
+
+def make_vocabulary(rng):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < VOCABULARY_SIZE:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(4, 10))))
+    return sorted(words)
+
+
+def make_article(index, vocabulary, cum_weights, rng, start_ts=1767500000.0):
+    def text(count):
+        return " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=count))
+    return {"id": f"https://example.com/{index}", "title": text(8), "summary": text(40), "content": text(120),
+            "tags": rng.choices(vocabulary[:200], k=3), "source": "Example", "published_ts": start_ts - index * 60}
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--size", type=int, default=100000)
+    arg_parser.add_argument("--added", type=int, default=100, help="articles added by the simulated fetch")
+    arg_parser.add_argument("--queries", type=int, default=200, help="queries per kind")
+    arg_parser.add_argument("--limit", type=int, default=50, help="results ranked per query")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    articles = [make_article(i, vocabulary, cum_weights, rng) for i in range(args.size)]
+
+    index = SearchIndex()
+    snapshot = ArticleSnapshot({"articles": articles}, 1, ())
+    build, _ = timed(index.sync, snapshot)
+    print(f"build    {args.size} articles, {len(index.postings)} terms: {build:.0f} ms")
+
+    added = [make_article(args.size + i, vocabulary, cum_weights, rng) for i in range(args.added)]
+    changed = dict(articles[0], ai_summary="zzzsummarized")
+    snapshot = ArticleSnapshot({"articles": added + [changed] + articles[1:]}, 2, ())
+    sync, _ = timed(index.sync, snapshot)
+    print(f"sync     {args.added} added, 1 summarized: {sync:.1f} ms")
+    assert len(index) == args.size + args.added, "sync lost articles"
+    assert index.search("zzzsummarized")[1][0][1] == changed["id"], "summarized article not reindexed"
+
+    kinds = {
+        "common": lambda: rng.choice(vocabulary[:20]),
+        "rare": lambda: rng.choice(vocabulary[5000:]),
+        "two words": lambda: f"{rng.choice(vocabulary[:500])} {rng.choice(vocabulary[:5000])}",
+        "prefix": lambda: rng.choice(vocabulary[:2000])[:3],
+    }
+
+    # Queries for a newer snapshot while the index catches up with it in the background
+    fetched = [make_article(2 * args.size + i, vocabulary, cum_weights, rng) for i in range(args.added * 10)]
+    snapshot = ArticleSnapshot({"articles": fetched + list(snapshot.articles[args.added:])}, 3, ())
+    index.sync_in_background(snapshot)
+    latencies = []
+    make_queries = list(kinds.values())
+    while not index.synced_with(snapshot):
+        latency, (_, hits) = timed(index.search, rng.choice(make_queries)(), args.limit, None, snapshot)
+        latencies.append(latency)
+        assert all(article_id in snapshot.by_id for _, article_id in hits), "hit outside the snapshot"
+    if latencies:
+        p50, p99 = percentiles(latencies)
+        print(f"during a sync of {len(fetched)} added, {args.added} removed: "
+              f"{len(latencies)} queries, p50 {p50:.2f} p99 {p99:.2f} ms")
+
+    latencies = [timed(scan_articles, snapshot, rng.choice(make_queries)(), args.limit)[0] for _ in range(10)]
+    p50, p99 = percentiles(latencies)
+    print(f"scan     before the first build: p50 {p50:.0f} max {p99:.0f} ms")
+
+    print(f"{'query':<10} {'p50':>8} {'p99':>8} {'matches':>9}   (ms)")
+    for kind, make_query in kinds.items():
+        latencies = []
+        matches = []
+        for _ in range(args.queries):
+            latency, (total, _) = timed(index.search, make_query(), args.limit)
+            latencies.append(latency)
+            matches.append(total)
+        p50, p99 = percentiles(latencies)
+        print(f"{kind:<10} {p50:8.2f} {p99:8.2f} {statistics.median(matches):9.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Benchmark the article stores on synthetic corpora: write cost per change and load time.
+
+For each corpus size and store (json = full rewrite, journal = append-only
+journal, sqlite), times single-article updates (as /api/summarize makes), a
+fetch adding new articles, a load with those changes pending and, for the
+journal, folding them into a new snapshot. Everything runs in a temporary
+directory.
+
+    cd backend && python testing/bench_store.py [--sizes 10000 100000] [--updates 5] [--added 100]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipelines.config import ARTICLES_JSON_FILE
+from pipelines.store import JsonArticleStore, JournalArticleStore, SqliteArticleStore
+
+STORES = ("json", "journal", "sqlite")
+
+
+def template_articles():
+    """Articles from fetched_data/articles.json to copy from, or one made-up article."""
+    try:
+        with open(ARTICLES_JSON_FILE, encoding="utf-8") as f:
+            articles = json.load(f).get("articles", [])
+    except (OSError, ValueError):
+        articles = []
+    return articles or [{"title": "Example article", "link": "https://example.com/a", "summary": "x" * 400,
+                         "content": "y" * 900, "author": "", "tags": [], "image_url": "", "source": "Example",
+                         "feed_url": "https://example.com/feed", "published": "", "published_iso": None}]
+
+
+def synthetic_corpus(size, templates, start_ts=1767500000.0):
+    articles = []
+    for index in range(size):
+        article = dict(templates[index % len(templates)])
+        article["id"] = f"https://example.com/{index}"
+        article["published_ts"] = start_ts - index * 60
+        articles.append(article)
+    return {"articles": articles, "metadata": {"total_articles": size}}
+
+
+def open_store(kind, directory):
+    if kind == "json":
+        return JsonArticleStore(directory / "articles.json")
+    if kind == "journal":
+        # Compaction is timed separately below
+        return JournalArticleStore(directory / "articles.json", directory / "articles.journal.ndjson",
+                                   compact_bytes=float("inf"))
+    return SqliteArticleStore(directory / "articles.db")
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def bench(kind, corpus, args):
+    directory = Path(tempfile.mkdtemp(prefix=f"bench-store-{kind}-"))
+    try:
+        store = open_store(kind, directory)
+        timed(store.save, corpus)
+        articles = corpus["articles"]
+        step = max(1, len(articles) // args.updates)
+
+        updates = [timed(store.apply_patch, [], {articles[i * step]["id"]: {"ai_summary": "s" * 300}}, {})
+                   for i in range(args.updates)]
+        newest = articles[0]["published_ts"]
+        added = [dict(articles[i], id=f"https://example.com/new/{i}", published_ts=newest + i + 1)
+                 for i in range(args.added)]
+        fetch = timed(store.apply_patch, added, {}, {"metadata": {"total_articles": len(articles) + args.added}})
+        load = timed(store.load)
+
+        row = {"update": statistics.median(updates), "fetch": fetch, "load": load, "compact": None}
+        if kind == "journal":
+            row["compact"] = timed(store.compact)
+        loaded = store.load()
+        assert len(loaded["articles"]) == len(articles) + args.added, "lost articles"
+        assert loaded["articles"][0]["id"] == added[-1]["id"], "wrong order"
+        updated = next(a for a in loaded["articles"] if a["id"] == articles[step]["id"])
+        assert updated.get("ai_summary"), "lost an update"
+        return row
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    arg_parser.add_argument("--stores", nargs="+", choices=STORES, default=list(STORES))
+    arg_parser.add_argument("--updates", type=int, default=5, help="single-article updates to time")
+    arg_parser.add_argument("--added", type=int, default=100, help="articles added by the simulated fetch")
+    args = arg_parser.parse_args()
+
+    templates = template_articles()
+    print(f"{'articles':>8}  {'store':<8} {'update':>10} {'fetch':>10} {'load':>10} {'compact':>10}   (ms)")
+    for size in args.sizes:
+        corpus = synthetic_corpus(size, templates)
+        for kind in args.stores:
+            row = bench(kind, corpus, args)
+            compact = f"{row['compact']:10.1f}" if row["compact"] is not None else f"{'-':>10}"
+            print(f"{size:>8}  {kind:<8} {row['update']:10.1f} {row['fetch']:10.1f} {row['load']:10.1f} {compact}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Check that articles left in the pending file by a crashed fetch reach the store.
+
+Simulates a fetch that appended a source's articles to the pending file and
+died before committing, then a restart and a new fetch whose commit must
+store both the recovered and the new articles before the pending file is
+dropped. The feed download is replaced by a canned result and everything
+runs in a temporary directory, so nothing under fetched_data/ is touched.
+
+    cd backend && python testing/check_pending_recovery.py [--store sqlite|journal|json]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipelines.fetcher as fetcher
+import pipelines.loader as loader
+import pipelines.operations as operations
+import pipelines.store as store_module
+import pipelines.writer as writer_module
+from pipelines.store import JsonArticleStore, JournalArticleStore, SqliteArticleStore
+from routes.fetch import commit_fetch_result
+
+FEED_URL = "https://example.com/feed"
+
+
+def article(name, published_ts):
+    return {"id": f"https://example.com/{name}", "title": name, "link": f"https://example.com/{name}",
+            "summary": "", "content": "", "source": "Example", "feed_url": FEED_URL,
+            "published": "", "published_ts": published_ts, "published_iso": None}
+
+
+def open_store(kind, directory):
+    if kind == "json":
+        return JsonArticleStore(directory / "articles.json")
+    if kind == "journal":
+        return JournalArticleStore(directory / "articles.json", directory / "articles.journal.ndjson")
+    return SqliteArticleStore(directory / "articles.db")
+
+
+def use_directory(kind, directory):
+    """Point the store, the pending file and a fresh writer at `directory`."""
+    pending = directory / "articles.pending.ndjson"
+    loader.PENDING_ARTICLES_FILE = pending
+    operations.PENDING_ARTICLES_FILE = pending
+    operations.FETCHED_DATA_DIR = directory
+    store_module._store = open_store(kind, directory)
+    writer_module._writer = None
+    return pending
+
+
+def fetch_returning(articles):
+    """Run fetch_all_articles with one source whose feed returns `articles`."""
+    fetcher.load_sources = lambda: [FEED_URL]
+    fetcher.load_feed_state = lambda: {"feeds": {}}
+    fetcher.save_feed_state = lambda feed_state: True
+    fetcher.record_source_runs = lambda records: True
+    fetcher.iter_feed_results = lambda sources, *args, **kwargs: iter(
+        [(FEED_URL, list(articles), {"status": "ok", "validators": {}, "watermark": None})])
+    return fetcher.fetch_all_articles(days=1, max_workers=1, adaptive_schedule=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store", choices=("sqlite", "journal", "json"), default="sqlite")
+    args = parser.parse_args()
+
+    now = time.time()
+    stored, recovered, fresh = article("stored", now - 300), article("recovered", now - 200), article("fresh", now - 100)
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        directory = Path(tmp)
+        pending = use_directory(args.store, directory)
+        store_module._store.save({"articles": [stored], "metadata": {"total_articles": 1}})
+
+        # A run appends a source's new articles, then the process dies before committing
+        operations.append_pending_articles([recovered])
+
+        # Restart: new store handle and writer, then a fetch that finds one more article
+        use_directory(args.store, directory)
+        result = fetch_returning([fresh])
+        committed = commit_fetch_result(result)
+
+        data = open_store(args.store, directory).load() or {"articles": []}
+        ids = {a.get("id") for a in data.get("articles", [])}
+        pending_left = pending.exists()
+
+    checks = [
+        ("commit succeeded", committed),
+        ("stored article kept", stored["id"] in ids),
+        ("recovered article stored", recovered["id"] in ids),
+        ("new article stored", fresh["id"] in ids),
+        ("pending file dropped", not pending_left),
+    ]
+    for name, ok in checks:
+        print(f"{'✓' if ok else '✗'} {name}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
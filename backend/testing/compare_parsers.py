@@ -0,0 +1,195 @@
+"""Differential check and speed comparison of the fast feed parser against feedparser.
+
+Every feed in testing/feeds/ is run through parse_feed_body twice, with and
+without the fast path, and the article dicts (minus fetched_at) and parse
+stats must match. Feeds the fast parser declines fall back to feedparser and
+are listed as such. --fuzz N adds N random feeds mixed from the corpus items.
+
+    cd backend && python testing/compare_parsers.py [--fuzz 500] [--repeat 20]
+"""
+import argparse
+import contextlib
+import copy
+import html
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipelines.parser import parse_feed_body
+
+FEEDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feeds")
+
+CONTENT_TYPES = {
+    ".rss": "application/rss+xml; charset=UTF-8",
+    ".atom": "application/atom+xml",
+    ".rdf": "application/rdf+xml",
+}
+
+
+def make_download(name, body, content_type=None):
+    extension = os.path.splitext(name)[1]
+    return {
+        "body": body,
+        "headers": {
+            "content-location": f"https://{os.path.splitext(name)[0]}.example.com/feed",
+            "content-type": content_type or CONTENT_TYPES.get(extension, "application/xml"),
+            "content-language": "",
+        },
+        "validators": {"etag": None, "last_modified": None, "content_hash": "x"},
+    }
+
+
+def quiet():
+    """Silence the per-feed progress prints of parse_feed_body."""
+    return contextlib.redirect_stdout(open(os.devnull, "w"))
+
+
+def run(name, download, fast):
+    stats = {}
+    with quiet():
+        articles = parse_feed_body(f"https://{name}/feed", copy.deepcopy(download), stats=stats, fast_parser=fast)
+    for article in articles:
+        article.pop("fetched_at")
+    # Which parser ran and how long each step took differ by design
+    stats = {key: value for key, value in stats.items() if key != "parser" and not key.endswith("_ms")}
+    return articles, stats
+
+
+def compare(name, download):
+    """Returns (matched, used_fast_path)."""
+    stats = {}
+    with quiet():
+        parse_feed_body(f"https://{name}/feed", copy.deepcopy(download), stats=stats, fast_parser=True)
+    used_fast = stats.get("parser") == "fast"
+
+    expected = run(name, download, fast=False)
+    actual = run(name, download, fast=True)
+    if expected == actual:
+        return True, used_fast
+
+    print(f"✗ {name}: fast parser output differs")
+    expected_articles, actual_articles = expected[0], actual[0]
+    if len(expected_articles) != len(actual_articles):
+        print(f"  {len(expected_articles)} articles from feedparser, {len(actual_articles)} from the fast parser")
+    for want, got in zip(expected_articles, actual_articles):
+        for key in want:
+            if want[key] != got.get(key):
+                print(f"  {key}: {want[key]!r}\n  {' ' * len(key)}  {got.get(key)!r}")
+    if expected[1] != actual[1]:
+        print(f"  stats: {expected[1]} != {actual[1]}")
+    return False, used_fast
+
+
+# Text the fuzzer splices into titles and descriptions: entities, markup the
+# sanitizer rewrites or drops, mis-encoded UTF-8, windows-1252 leftovers, ...
+FUZZ_SNIPPETS = [
+    "AT&T", "&nbsp;", "&hellip;", "&copy 2026", "&copyright", "&foo;", "&apos;", "&apos x", "&lt-", "&amp;amp;",
+    "&#8217;", "&#128;", "&#x27;", "&#39;", "&#123 ", "&#0;", "&lt;b&gt;", "<b>bold</b>", "<br/>", "<p/>",
+    "<a href='x>y'>link</a>", "<img src=\"a.png\" alt=\"it's\">", "<a/b>", "</p class=x>", "<o:p>", "a < b",
+    "1 > 0", "<!-- note -->", "<!-- a > b -->", "<script>track()</script>", "<style>p{}</style>", "<svg><title>t</title></svg>",
+    "caf\u00c3\u00a9", "\u0093quoted\u0094", "\u00e9t\u00e9", "  spaced  out  ", "tab\there", "line\nbreak",
+    "<![CDATA[x", "<p>para</p>", "<unknown-tag>x</unknown-tag>", "&#x1F600;", "http://example.com/?a=1&b=2",
+]
+
+
+def fuzz_text(rng):
+    return "".join(rng.choice(FUZZ_SNIPPETS) + rng.choice(["", " ", "word"]) for _ in range(rng.randint(1, 4)))
+
+
+def mutate_item(rng, item):
+    if rng.random() < 0.4:
+        item = re.sub(r"<title>.*?</title>", lambda m: f"<title>{html.escape(fuzz_text(rng), quote=False)}</title>",
+                      item, count=1, flags=re.S)
+    if rng.random() < 0.4:
+        text = fuzz_text(rng).replace("]]>", "")
+        item = re.sub(r"<description>.*?</description>", lambda m: f"<description><![CDATA[{text}]]></description>",
+                      item, count=1, flags=re.S)
+    if rng.random() < 0.2:
+        # drop one simple element
+        item = re.sub(r"<(\w[\w:]*)[^>]*>[^<]*</\1>", "", item, count=1)
+    return item
+
+
+def fuzz_feeds(corpus, count, seed):
+    """Random RSS/Atom documents stitched together from the corpus' items and entries."""
+    rng = random.Random(seed)
+    pieces = {"rss": [], "atom": []}
+    for name, body in corpus.items():
+        text = body.decode("utf-8", "replace")
+        if name.endswith(".rss") and "<channel>" in text:
+            pieces["rss"] += re.findall(r"<item>.*?</item>", text, re.S)
+        elif name.endswith(".atom"):
+            pieces["atom"] += re.findall(r"<entry>.*?</entry>", text, re.S)
+    namespaces = ('xmlns:content="http://purl.org/rss/1.0/modules/content/" '
+                  'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:media="http://search.yahoo.com/mrss/" '
+                  'xmlns:wfw="http://wellformedweb.org/CommentAPI/" xmlns:slash="http://purl.org/rss/1.0/modules/slash/" '
+                  'xmlns:atom="http://www.w3.org/2005/Atom" xmlns:thr="http://purl.org/syndication/thread/1.0" '
+                  'xmlns:gd="http://schemas.google.com/g/2005"')
+    for index in range(count):
+        if rng.random() < 0.5:
+            items = [mutate_item(rng, item) for item in rng.choices(pieces["rss"], k=rng.randint(1, 6))]
+            body = (f'<?xml version="1.0" encoding="UTF-8"?><rss version="2.0" {namespaces}><channel>'
+                    f'<title>Fuzz {index}</title>{"".join(items)}</channel></rss>')
+            yield f"fuzz{index}.rss", body.encode("utf-8")
+        else:
+            entries = [re.sub(r"<title>[^<]*</title>", lambda m: f"<title>{html.escape(fuzz_text(rng), quote=False)}</title>", entry)
+                       if rng.random() < 0.4 else entry
+                       for entry in rng.choices(pieces["atom"], k=rng.randint(1, 6))]
+            body = (f'<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom" '
+                    f'xmlns:media="http://search.yahoo.com/mrss/" xmlns:thr="http://purl.org/syndication/thread/1.0" '
+                    f'xmlns:gd="http://schemas.google.com/g/2005"><title>Fuzz {index}</title>{"".join(entries)}</feed>')
+            yield f"fuzz{index}.atom", body.encode("utf-8")
+
+
+def benchmark(downloads, repeat, label):
+    timings = {}
+    for fast in (False, True):
+        started = time.perf_counter()
+        with quiet():
+            for _ in range(repeat):
+                for name, download in downloads:
+                    parse_feed_body(f"https://{name}/feed", download, stats={}, fast_parser=fast)
+        timings[fast] = (time.perf_counter() - started) / repeat
+    print(f"{label}: feedparser {timings[False] * 1000:.1f} ms, fast parser {timings[True] * 1000:.1f} ms "
+          f"({timings[False] / timings[True]:.1f}x)")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--fuzz", type=int, default=0, help="number of random feeds to add")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    arg_parser.add_argument("--repeat", type=int, default=20, help="benchmark passes over the corpus")
+    args = arg_parser.parse_args()
+
+    corpus = {}
+    for name in sorted(os.listdir(FEEDS_DIR)):
+        with open(os.path.join(FEEDS_DIR, name), "rb") as f:
+            corpus[name] = f.read()
+
+    cases = [(name, make_download(name, body)) for name, body in corpus.items()]
+    # Served as HTML, feedparser flags the document; both paths must give up the same way
+    cases.append(("wordpress-as-html", make_download("wordpress.rss", corpus["wordpress.rss"], "text/html")))
+    cases += [(name, make_download(name, body)) for name, body in fuzz_feeds(corpus, args.fuzz, args.seed)]
+    results = [(name, *compare(name, download)) for name, download in cases]
+
+    for name, matched, used_fast in results:
+        if matched and not name.startswith("fuzz"):
+            print(f"✓ {name} ({'fast path' if used_fast else 'feedparser fallback'})")
+    failures = [name for name, matched, _ in results if not matched]
+    fast_count = sum(1 for _, _, used_fast in results if used_fast)
+    print(f"\n{len(results) - len(failures)}/{len(results)} feeds identical, {fast_count} took the fast path")
+
+    print(f"\nparse_feed_body per pass, {args.repeat} passes")
+    corpus_cases = [(name, make_download(name, body)) for name, body in sorted(corpus.items())]
+    benchmark(corpus_cases, args.repeat, "whole corpus     ")
+    fast_names = {name for name, _, used_fast in results if used_fast}
+    benchmark([case for case in corpus_cases if case[0] in fast_names], args.repeat, "fast-path feeds  ")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Record the raw response of every source in sources.txt for replay_server.py.
+
+Writes <out>/manifest.json and one body file per source. Bodies are stored
+decoded (after gzip/br), with status, content headers and validators; sources
+that could not be reached are recorded as connection errors, so a replay
+fails the same way.
+
+    cd backend && python testing/record_feeds.py [--out testing/recordings] [--workers 8]
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipelines.loader import load_sources
+from pipelines.http_client import get_session
+from pipelines.config import FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT
+
+RECORDED_HEADERS = ("content-type", "etag", "last-modified", "content-language")
+
+
+def record(index, feed_url, out):
+    source = {"url": feed_url, "status": None, "headers": {}, "body": None, "error": None}
+    try:
+        with get_session().get(feed_url, timeout=(FETCH_CONNECT_TIMEOUT, FETCH_READ_TIMEOUT), stream=True) as response:
+            body = response.raw.read(decode_content=True)
+            source["status"] = response.status_code
+            source["headers"] = {key: response.headers[key] for key in RECORDED_HEADERS if key in response.headers}
+    except Exception as e:
+        source["error"] = type(e).__name__
+        print(f"✗ {feed_url}: {e}")
+        return source
+    name = os.path.join("bodies", f"{index:04d}")
+    with open(os.path.join(out, name), "wb") as f:
+        f.write(body)
+    source["body"] = name
+    print(f"{'✓' if source['status'] == 200 else '!'} {source['status']} {len(body):>8} bytes  {feed_url}")
+    return source
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings"))
+    arg_parser.add_argument("--workers", type=int, default=8)
+    args = arg_parser.parse_args()
+
+    sources = load_sources()
+    os.makedirs(os.path.join(args.out, "bodies"), exist_ok=True)
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        recorded = list(executor.map(lambda item: record(item[0], item[1], args.out), enumerate(sources)))
+
+    with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"recorded_at": datetime.now().isoformat(), "sources": recorded}, f, indent=2)
+    ok = sum(1 for source in recorded if source["status"] == 200)
+    print(f"\nRecorded {len(recorded)} sources into {args.out} ({ok} answered 200)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
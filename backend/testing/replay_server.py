@@ -0,0 +1,150 @@
+"""Local HTTP server replaying feed responses captured by testing/record_feeds.py.
+
+Each recorded source is served at replay_url(index, host_index, port): sources
+on different hosts get different loopback addresses (127.0.x.y, Linux) so the
+fetch scheduler's per-host limits behave as against the live sites. Latency,
+jitter, an error rate and conditional GET (304) behaviour are configurable.
+
+    cd backend && python testing/replay_server.py testing/recordings --port 8800 \\
+        --latency 80 --jitter 40 --error-rate 0.02 --not-modified honor
+"""
+import argparse
+import gzip
+import hashlib
+import http.server
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+REPLAYED_HEADERS = ("content-type", "etag", "last-modified", "content-language")
+
+
+def load_recording(directory):
+    """The manifest of a recording directory, with each body read into memory."""
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    for source in manifest["sources"]:
+        source["data"] = b""
+        if source.get("body"):
+            with open(os.path.join(directory, source["body"]), "rb") as f:
+                source["data"] = f.read()
+    return manifest
+
+
+def host_indexes(urls):
+    """Index of each URL's host, in order of first appearance."""
+    hosts = {}
+    return [hosts.setdefault((urlsplit(url).hostname or "").lower(), len(hosts)) for url in urls]
+
+
+def replay_url(index, host_index, port, one_address=False):
+    address = "127.0.0.1" if one_address else f"127.{host_index // 254 % 256}.{host_index % 254 + 1}.1"
+    return f"http://{address}:{port}/{index}"
+
+
+def make_handler(manifest, latency, jitter, error_rate, not_modified, validators, compress, seed):
+    sources = manifest["sources"]
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    prepared = []
+    for source in sources:
+        headers = {key: value for key, value in (source.get("headers") or {}).items() if key in REPLAYED_HEADERS}
+        if validators == "none":
+            headers.pop("etag", None)
+            headers.pop("last-modified", None)
+        elif validators == "synthetic" and source["data"]:
+            headers.setdefault("etag", '"%s"' % hashlib.sha1(source["data"]).hexdigest()[:16])
+        gzipped = gzip.compress(source["data"], 6) if compress and source["data"] else None
+        prepared.append((headers, gzipped))
+
+    class ReplayHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            try:
+                index = int(self.path.strip("/").split("/")[0])
+                source = sources[index]
+            except (ValueError, IndexError):
+                self.reply(404, {}, b"")
+                return
+            headers, gzipped = prepared[index]
+
+            with rng_lock:
+                delay = max(0.0, latency + rng.uniform(-jitter, jitter)) / 1000
+                failed = rng.random() < error_rate
+            time.sleep(delay)
+
+            if source.get("error"):
+                # The live site did not answer at all: drop the connection
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+            if failed:
+                self.reply(503, {"content-type": "text/plain"}, b"injected error")
+                return
+            if source.get("status", 200) >= 300:
+                self.reply(source["status"], headers, source["data"])
+                return
+
+            etag, last_modified = headers.get("etag"), headers.get("last-modified")
+            conditional = (etag and self.headers.get("If-None-Match") == etag) or \
+                (last_modified and self.headers.get("If-Modified-Since") == last_modified)
+            if not_modified == "always" or (not_modified == "honor" and conditional):
+                self.reply(304, {key: value for key, value in headers.items() if key in ("etag", "last-modified")}, b"")
+                return
+
+            body = source["data"]
+            if gzipped is not None and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                headers = dict(headers, **{"content-encoding": "gzip"})
+                body = gzipped
+            self.reply(200, headers, body)
+
+        def reply(self, status, headers, body):
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("recording", help="directory written by record_feeds.py")
+    arg_parser.add_argument("--port", type=int, default=8800)
+    arg_parser.add_argument("--latency", type=float, default=0, help="ms before each response")
+    arg_parser.add_argument("--jitter", type=float, default=0, help="+/- ms added to the latency")
+    arg_parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests answered 503")
+    arg_parser.add_argument("--not-modified", choices=("honor", "never", "always"), default="honor",
+                            help="answer conditional requests with 304")
+    arg_parser.add_argument("--validators", choices=("recorded", "synthetic", "none"), default="recorded",
+                            help="ETag / Last-Modified to send; synthetic adds an ETag where none was recorded")
+    arg_parser.add_argument("--gzip", action="store_true", help="gzip bodies for clients that accept it")
+    arg_parser.add_argument("--seed", type=int, default=1)
+    args = arg_parser.parse_args()
+
+    manifest = load_recording(args.recording)
+    handler = make_handler(manifest, args.latency, args.jitter, args.error_rate, args.not_modified,
+                           args.validators, args.gzip, args.seed)
+    server = http.server.ThreadingHTTPServer(("0.0.0.0", args.port), handler)
+    server.daemon_threads = True
+    print(f"Replaying {len(manifest['sources'])} sources on port {args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,22 @@
 import { X, ExternalLink, Sparkles } from 'lucide-react';
 import { useState, useEffect,  useRef } from 'react';
-import { summarizeArticle } from '../services/api';
+import { summarizeArticle, fetchArticle } from '../services/api';
+import { mapArticleToFrontend } from '../utils/dataMapper';
 
 const ArticleModal = ({ article, onClose }) => {
   const [summary, setSummary] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const summarizedRef = useRef(new Set())
+  // Lists carry a few fields only; the full article has the content to fall back on
+  const [detail, setDetail] = useState(null);
+
+  useEffect(() => {
+    setDetail(null);
+    fetchArticle(article.id)
+      .then((full) => setDetail(mapArticleToFrontend(full)))
+      .catch(() => setDetail(null));
+  }, [article.id]);
 
 
   useEffect(() => {
@@ -105,7 +115,7 @@ const ArticleModal = ({ article, onClose }) => {
 
           <div className="panel-inset p-4 border-classic mb-4">
             <h4 className="font-bold text-[#2c2416] mb-2 uppercase text-sm">Original Summary:</h4>
-            <p className="text-[#4a4234] leading-relaxed">{article.excerpt}</p>
+            <p className="text-[#4a4234] leading-relaxed">{(detail || article).excerpt}</p>
           </div>
 
           <div className="flex gap-3">
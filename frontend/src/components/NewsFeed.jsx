@@ -1,8 +1,7 @@
-import { useState } from 'react';
 import NewsCard from './NewsCard';
 
-const NewsFeed = ({ filteredNews, loading, onArticleClick }) => {
-  const [displayCount, setDisplayCount] = useState(20);
+// `remaining` more articles match beyond those shown; onLoadMore asks for the next page
+const NewsFeed = ({ filteredNews, loading, onArticleClick, remaining = 0, onLoadMore, loadingMore = false }) => {
 
   if (loading) {
     return (
@@ -23,24 +22,22 @@ const NewsFeed = ({ filteredNews, loading, onArticleClick }) => {
     );
   }
 
-  const displayedNews = filteredNews.slice(0, displayCount);
-  const hasMore = filteredNews.length > displayCount;
-
   return (
     <>
       <div className="space-y-2 sm:space-y-3 mb-3 sm:mb-4">
-        {displayedNews.map((news) => (
+        {filteredNews.map((news) => (
           <NewsCard key={news.id} news={news} onArticleClick={onArticleClick} />
         ))}
       </div>
 
-      {hasMore && (
+      {remaining > 0 && (
         <div className="text-center pb-4 sm:pb-6">
           <button 
-            onClick={() => setDisplayCount(prev => prev + 20)}
+            onClick={onLoadMore}
+            disabled={loadingMore}
             className="btn-classic px-6 sm:px-8 py-2 sm:py-3 text-sm sm:text-base"
           >
-            Load More Articles ({filteredNews.length - displayCount} remaining)
+            {loadingMore ? 'Loading...' : `Load More Articles (${remaining} remaining)`}
           </button>
         </div>
       )}
@@ -1,9 +1,9 @@
-const StatsBar = ({ filteredNews, categories, timeFilter }) => {
+const StatsBar = ({ filteredNews, total, categories, timeFilter }) => {
   return (
     <div className="grid grid-cols-2 lg:grid-cols-4 gap-2 sm:gap-3 mb-3 sm:mb-4">
       <div className="panel-inset p-3 sm:p-4 border-classic">
         <div className="text-xs sm:text-sm text-[#6b6558] mb-1 uppercase tracking-wide font-bold">Total Articles</div>
-        <div className="text-xl sm:text-2xl lg:text-3xl font-bold text-[#2c2416]">{filteredNews.length}</div>
+        <div className="text-xl sm:text-2xl lg:text-3xl font-bold text-[#2c2416]">{total}</div>
       </div>
       <div className="panel-inset p-3 sm:p-4 border-classic">
         <div className="text-xs sm:text-sm text-[#6b6558] mb-1 uppercase tracking-wide font-bold">Trending</div>
@@ -2,12 +2,15 @@ import { useState, useEffect } from 'react';
 import { BarChart, TrendingUp, Calendar, Users, Globe, Clock } from 'lucide-react';
 import Header from '../components/Header';
 import Sidebar from '../components/Sidebar';
-import { fetchArticles, getStats } from '../services/api';
+import { fetchFacets, getStats } from '../services/api';
+import { timeFilterSince } from '../utils/dateFilters';
 
 const Analytics = () => {
   const [sidebarOpen, setSidebarOpen] = useState(false);
   const [stats, setStats] = useState(null);
-  const [articles, setArticles] = useState([]);
+  const [categoryCounts, setCategoryCounts] = useState([]);
+  // Articles published within the last day, 7 and 30 days
+  const [recentCounts, setRecentCounts] = useState([0, 0, 0]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -31,13 +34,16 @@ const Analytics = () => {
   const loadAnalytics = async () => {
     try {
       setLoading(true);
-      const [statsData, articlesData] = await Promise.all([
+      // Counts come from the server's indexes instead of loading the articles
+      const [statsData, facets, ...recent] = await Promise.all([
         getStats(),
-        fetchArticles()
+        fetchFacets(),
+        ...['today', '7days', '30days'].map(period => fetchFacets({ since: timeFilterSince(period) }))
       ]);
       
       setStats(statsData);
-      setArticles(articlesData.articles || []);
+      setCategoryCounts(facets.facets.ai_category.map(({ value, count }) => [value, count]));
+      setRecentCounts(recent.map(data => data.total));
     } catch (error) {
       console.error('Failed to load analytics:', error);
     } finally {
@@ -45,53 +51,32 @@ const Analytics = () => {
     }
   };
 
+  const totalArticles = stats?.total_articles || 0;
+
   const calculateCategoryStats = () => {
-    const categoryCount = {};
-    articles.forEach(article => {
-      const category = article.ai_category || 'General';
-      categoryCount[category] = (categoryCount[category] || 0) + 1;
-    });
+    const categoryCount = Object.fromEntries(categoryCounts);
+    // Articles not categorized yet have no ai_category
+    const uncategorized = totalArticles - categoryCounts.reduce((sum, [, count]) => sum + count, 0);
+    if (uncategorized > 0) {
+      categoryCount['General'] = (categoryCount['General'] || 0) + uncategorized;
+    }
     return Object.entries(categoryCount)
       .sort(([,a], [,b]) => b - a)
       .slice(0, 6);
   };
 
   const calculateTimeStats = () => {
-    const now = new Date();
-    const timeRanges = {
-      'Last 24h': 0,
-      'Last 7d': 0,
-      'Last 30d': 0,
-      'Older': 0
-    };
-
-    articles.forEach(article => {
-      try {
-        const articleDate = new Date(article.published);
-        const diffHours = (now - articleDate) / (1000 * 60 * 60);
-        
-        if (diffHours <= 24) timeRanges['Last 24h']++;
-        else if (diffHours <= 168) timeRanges['Last 7d']++;
-        else if (diffHours <= 720) timeRanges['Last 30d']++;
-        else timeRanges['Older']++;
-      } catch (e) {
-        timeRanges['Older']++;
-      }
-    });
-
-    return Object.entries(timeRanges);
+    const [lastDay, lastWeek, lastMonth] = recentCounts;
+    // Undated articles count as older, as they did when the dates were compared here
+    return [
+      ['Last 24h', lastDay],
+      ['Last 7d', lastWeek - lastDay],
+      ['Last 30d', lastMonth - lastWeek],
+      ['Older', totalArticles - lastMonth]
+    ];
   };
 
-  const getTopSources = () => {
-    const sourceCount = {};
-    articles.forEach(article => {
-      const source = article.source || 'Unknown';
-      sourceCount[source] = (sourceCount[source] || 0) + 1;
-    });
-    return Object.entries(sourceCount)
-      .sort(([,a], [,b]) => b - a)
-      .slice(0, 10);
-  };
+  const getTopSources = () => stats?.top_sources || [];
 
   if (loading) {
     return (
@@ -153,7 +138,7 @@ const Analytics = () => {
                   <Globe className="w-4 h-4 text-[#4a5f7f]" />
                   <span className="text-xs font-bold text-[#6b6558] uppercase tracking-wide">Total Articles</span>
                 </div>
-                <div className="text-2xl font-bold text-[#2c2416]">{articles.length}</div>
+                <div className="text-2xl font-bold text-[#2c2416]">{totalArticles}</div>
               </div>
               
               <div className="panel-inset p-3 border-classic">
@@ -161,7 +146,7 @@ const Analytics = () => {
                   <Users className="w-4 h-4 text-[#4a5f7f]" />
                   <span className="text-xs font-bold text-[#6b6558] uppercase tracking-wide">Sources</span>
                 </div>
-                <div className="text-2xl font-bold text-[#2c2416]">{topSources.length}</div>
+                <div className="text-2xl font-bold text-[#2c2416]">{stats?.total_sources || 0}</div>
               </div>
               
               <div className="panel-inset p-3 border-classic">
@@ -190,7 +175,7 @@ const Analytics = () => {
                 </h3>
                 <div className="space-y-3">
                   {categoryStats.map(([category, count]) => {
-                    const percentage = ((count / articles.length) * 100).toFixed(1);
+                    const percentage = ((count / totalArticles) * 100).toFixed(1);
                     return (
                       <div key={category} className="flex items-center justify-between">
                         <div className="flex-1">
@@ -219,7 +204,7 @@ const Analytics = () => {
                 </h3>
                 <div className="space-y-3">
                   {timeStats.map(([timeRange, count]) => {
-                    const percentage = articles.length > 0 ? ((count / articles.length) * 100).toFixed(1) : 0;
+                    const percentage = totalArticles > 0 ? ((count / totalArticles) * 100).toFixed(1) : 0;
                     return (
                       <div key={timeRange} className="flex items-center justify-between">
                         <div className="flex-1">
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 
 import Sidebar from '../components/Sidebar';
 import Header from '../components/Header';
@@ -8,12 +8,15 @@ import CategoryFilter from '../components/CategoryFilter';
 import NewsFeed from '../components/NewsFeed';
 import ArticleModal from '../components/ArticleModal';
 
-import { fetchArticles, triggerFetch, categorizeArticles, categorizeArticlesFallback, checkFetchStatus, cancelFetch } from '../services/api';
-import { mapArticleToFrontend, extractCategories } from '../utils/dataMapper';
-import { filterByTime } from '../utils/dateFilters';
+import { fetchArticles, fetchFacets, getUserSettings, triggerFetch, categorizeArticles, categorizeArticlesFallback, checkFetchStatus, cancelFetch } from '../services/api';
+import { mapArticleToFrontend, ARTICLE_CARD_FIELDS } from '../utils/dataMapper';
+import { timeFilterSince } from '../utils/dateFilters';
 import { notificationManager } from '../utils/notifications';
 import { backgroundFetcher } from '../utils/backgroundFetcher';
 
+// Articles per page until the Articles Per Page setting is loaded or if it is unset
+const DEFAULT_PAGE_SIZE = 20;
+
 const Dashboard = () => {
   const [articles, setArticles] = useState([]);
   const [categories, setCategories] = useState(['all']);
@@ -26,6 +29,15 @@ const Dashboard = () => {
   const [selectedArticle, setSelectedArticle] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
   const [fetchAbortController, setFetchAbortController] = useState(null);
+  const [pageSize, setPageSize] = useState(null);
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // The feed's filters as of the last render, for loads started by callbacks created before they changed
+  const feedSettings = useRef({});
+  feedSettings.current = { pageSize, timeFilter, activeFilter, searchTerm };
+  // The filters of the first page shown; the next pages are asked for with the same ones
+  const pageFilters = useRef(null);
 
   useEffect(() => {
     const handleResize = () => {
@@ -42,7 +54,20 @@ const Dashboard = () => {
   }, []);
 
   useEffect(() => {
-    loadExistingArticles();
+    // The feed is paged at the Articles Per Page setting
+    getUserSettings()
+      .then(settings => setPageSize(settings.articlesPerPage || DEFAULT_PAGE_SIZE))
+      .catch(() => setPageSize(DEFAULT_PAGE_SIZE));
+  }, []);
+
+  useEffect(() => {
+    if (!pageSize) return;
+    // The server filters and pages the feed; typing a search reloads once the user pauses
+    const timer = setTimeout(loadExistingArticles, searchTerm ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [pageSize, timeFilter, activeFilter, searchTerm]);
+
+  useEffect(() => {
     checkInitialFetchStatus(); // Check if fetch is already running
     initializeNotifications();
     startBackgroundFetcher();
@@ -123,17 +148,55 @@ const Dashboard = () => {
     setTimeout(checkStatus, 1000);
   };
 
+  // Load the first page of the feed, and the categories of the time period for the filter buttons
   const loadExistingArticles = async () => {
+    const { pageSize, timeFilter, activeFilter, searchTerm } = feedSettings.current;
+    if (!pageSize) return;
+    
+    const filters = { fields: ARTICLE_CARD_FIELDS, limit: pageSize };
+    const since = timeFilterSince(timeFilter);
+    if (since) filters.since = since;
+    if (activeFilter !== 'all') filters.ai_category = activeFilter;
+    if (searchTerm.trim()) filters.q = searchTerm.trim();
+    pageFilters.current = filters;
+    
     try {
-      const data = await fetchArticles();
+      const [data, facets] = await Promise.all([
+        fetchArticles(filters),
+        fetchFacets(since ? { since } : {})
+      ]);
+      // A newer load started meanwhile
+      if (pageFilters.current !== filters) return;
       
-      if (data.articles && data.articles.length > 0) {
-        const mappedArticles = data.articles.map(mapArticleToFrontend);
-        setArticles(mappedArticles);
-        setCategories(extractCategories(mappedArticles));
-      }
+      setArticles((data.articles || []).map(mapArticleToFrontend));
+      setTotal(data.total || 0);
+      setNextCursor(data.next_cursor || null);
+      const values = facets.facets.ai_category.map(({ value }) => value).filter(value => value !== 'Pending');
+      setCategories(['all', ...new Set([...values, activeFilter].filter(value => value !== 'all'))]);
     } catch (err) {
+      if (pageFilters.current !== filters) return;
       console.log('No existing articles found');
+      setArticles([]);
+      setTotal(0);
+      setNextCursor(null);
+    }
+  };
+
+  const loadMoreArticles = async () => {
+    const filters = pageFilters.current;
+    if (!filters || !nextCursor) return;
+    
+    try {
+      setLoadingMore(true);
+      const data = await fetchArticles({ ...filters, cursor: nextCursor });
+      if (pageFilters.current !== filters) return;
+      
+      setArticles(prev => [...prev, ...(data.articles || []).map(mapArticleToFrontend)]);
+      setNextCursor(data.next_cursor || null);
+    } catch (err) {
+      console.error('Failed to load more articles:', err);
+    } finally {
+      setLoadingMore(false);
     }
   };
 
@@ -156,7 +219,8 @@ const Dashboard = () => {
       const days = daysMap[period] || 1;
       
       console.log(`Triggering fetch for ${days} day(s)...`);
-      const fetchResult = await triggerFetch(110, days, abortController.signal);
+      // Asked for by the user, so every source is polled, due or not
+      const fetchResult = await triggerFetch(110, days, abortController.signal, true);
       console.log('Fetch result:', fetchResult);
       
       if (fetchResult.success) {
@@ -307,24 +371,6 @@ const Dashboard = () => {
     setSelectedArticle(article);
   };
 
-  const filteredNews = articles
-    .filter(news => {
-      // Search filter
-      if (searchTerm) {
-        const searchLower = searchTerm.toLowerCase();
-        return (
-          news.title.toLowerCase().includes(searchLower) ||
-          news.excerpt.toLowerCase().includes(searchLower) ||
-          news.source.toLowerCase().includes(searchLower) ||
-          (news.author && news.author.toLowerCase().includes(searchLower)) ||
-          (news.tags && news.tags.some(tag => tag.toLowerCase().includes(searchLower)))
-        );
-      }
-      return true;
-    })
-    .filter(news => filterByTime(news, timeFilter))
-    .filter(item => activeFilter === 'all' || item.category === activeFilter);
-
   return (
     <div className="flex h-screen bg-[#e8e4d9] overflow-hidden relative">
       <Sidebar 
@@ -360,7 +406,7 @@ const Dashboard = () => {
               <div className="mb-3 panel-inset p-3 border-classic">
                 <p className="text-sm text-[#4a4234]">
                   <span className="font-bold">Search results for:</span> "{searchTerm}" 
-                  <span className="ml-2 text-[#6b6558]">({filteredNews.length} articles found)</span>
+                  <span className="ml-2 text-[#6b6558]">({total} articles found)</span>
                   <button
                     onClick={() => setSearchTerm('')}
                     className="ml-3 text-xs btn-classic px-2 py-1"
@@ -372,7 +418,8 @@ const Dashboard = () => {
             )}
 
             <StatsBar 
-              filteredNews={filteredNews}
+              filteredNews={articles}
+              total={total}
               categories={categories}
               timeFilter={timeFilter}
             />
@@ -394,9 +441,12 @@ const Dashboard = () => {
             />
 
             <NewsFeed 
-              filteredNews={filteredNews}
+              filteredNews={articles}
               loading={loading}
               onArticleClick={handleArticleClick}
+              remaining={nextCursor ? total - articles.length : 0}
+              onLoadMore={loadMoreArticles}
+              loadingMore={loadingMore}
             />
           </div>
         </main>
@@ -1,10 +1,30 @@
 const API_BASE_URL = 'http://127.0.0.1:5001/api';
 
+// Facet filters: each may be a value or a list of values (any of them matches);
+// facets combine with AND, or OR when filters.match is 'any'
+const FACETS = ['ai_category', 'source', 'tag', 'day'];
+
+const appendFacetFilters = (params, filters) => {
+  FACETS.forEach((facet) => {
+    [].concat(filters[facet] || []).forEach((value) => params.append(facet, value));
+  });
+  if (filters.match) params.append('match', filters.match);
+};
+
 export const fetchArticles = async (filters = {}) => {
   try {
     const params = new URLSearchParams();
     if (filters.category) params.append('category', filters.category);
     if (filters.limit) params.append('limit', filters.limit);
+    if (filters.since) params.append('since', filters.since);
+    if (filters.until) params.append('until', filters.until);
+    // Full-text search; results come ranked by relevance instead of by date
+    if (filters.q) params.append('q', filters.q);
+    appendFacetFilters(params, filters);
+    // Pass the previous response's next_cursor to get the following page
+    if (filters.cursor) params.append('cursor', filters.cursor);
+    // Field names or named sets ('list', 'full'); without it the compact 'list' shape comes back
+    if (filters.fields) params.append('fields', [].concat(filters.fields).join(','));
     
     const url = `${API_BASE_URL}/articles${params.toString() ? '?' + params.toString() : ''}`;
     const response = await fetch(url);
@@ -21,7 +41,46 @@ export const fetchArticles = async (filters = {}) => {
   }
 };
 
-export const triggerFetch = async (maxSources = null, days = 1, signal = null) => {
+export const fetchArticle = async (articleId) => {
+  try {
+    // Article ids are URLs themselves
+    const response = await fetch(`${API_BASE_URL}/articles/${encodeURIComponent(articleId)}`);
+    
+    if (!response.ok) {
+      throw new Error('Failed to fetch article');
+    }
+    
+    const data = await response.json();
+    return data.article;
+  } catch (error) {
+    console.error('Error fetching article:', error);
+    throw error;
+  }
+};
+
+export const fetchFacets = async (filters = {}) => {
+  try {
+    const params = new URLSearchParams();
+    if (filters.category) params.append('category', filters.category);
+    if (filters.since) params.append('since', filters.since);
+    if (filters.until) params.append('until', filters.until);
+    appendFacetFilters(params, filters);
+    
+    const response = await fetch(`${API_BASE_URL}/facets${params.toString() ? '?' + params.toString() : ''}`);
+    
+    if (!response.ok) {
+      throw new Error('Failed to fetch facets');
+    }
+    
+    return await response.json();
+  } catch (error) {
+    console.error('Error fetching facets:', error);
+    throw error;
+  }
+};
+
+// With force, every source is polled; otherwise only those the adaptive schedule says are due
+export const triggerFetch = async (maxSources = null, days = 1, signal = null, force = false) => {
   try {
     const fetchOptions = {
       method: 'POST',
@@ -30,7 +89,8 @@ export const triggerFetch = async (maxSources = null, days = 1, signal = null) =
       },
       body: JSON.stringify({ 
         max_sources: maxSources,
-        days: days 
+        days: days,
+        force: force
       }),
     };
     
@@ -51,7 +51,7 @@ export class BackgroundFetcher {
         if (this.settings.enableNotifications) {
           // Get the latest article for notification
           try {
-            const articlesData = await import('../services/api').then(api => api.fetchArticles());
+            const articlesData = await import('../services/api').then(api => api.fetchArticles({ limit: 1 }));
             const latestArticle = articlesData.articles[0];
             notificationManager.showNewArticlesNotification(newArticlesCount, latestArticle);
           } catch (error) {
@@ -80,7 +80,7 @@ export class BackgroundFetcher {
   async checkAlertsForNewArticles(newArticlesCount) {
     try {
       const { fetchArticles } = await import('../services/api');
-      const data = await fetchArticles();
+      const data = await fetchArticles({ limit: newArticlesCount, fields: ['list', 'summary', 'content'] });
       const newArticles = data.articles.slice(0, newArticlesCount);
       
       this.checkAlerts(newArticles);
@@ -1,3 +1,7 @@
+// Fields the cards and the article modal read; request them with
+// fetchArticles({ fields: ARTICLE_CARD_FIELDS }), the rest comes from fetchArticle
+export const ARTICLE_CARD_FIELDS = ['list', 'link', 'published_iso', 'summary', 'author', 'tags'];
+
 export const mapArticleToFrontend = (article) => {
   // Fallback category extraction if ai_category is not available
   let category = 'General';
@@ -17,8 +21,8 @@ export const mapArticleToFrontend = (article) => {
     link: article.link,
     source: article.source,
     category: category,
-    date: article.published,
-    timeAgo: formatTimeAgo(article.published),
+    date: article.published_iso || article.published,
+    timeAgo: formatTimeAgo(article.published_iso || article.published),
     excerpt: article.summary || article.content || 'No description available',
     tags: article.tags || [],
     trending: false,
@@ -1,10 +1,7 @@
-export const filterByTime = (news, timeFilter) => {
-  const now = new Date();
-  const newsDate = new Date(news.date);
-  const diffDays = Math.floor((now - newsDate) / (1000 * 60 * 60 * 24));
-  
-  if (timeFilter === 'today') return diffDays === 0;
-  if (timeFilter === '7days') return diffDays <= 7;
-  if (timeFilter === '30days') return diffDays <= 30;
-  return true;
+const PERIOD_DAYS = { today: 1, '7days': 7, '30days': 30 };
+
+// Start of a time filter's period as an ISO date, for the since= parameter; null for no limit
+export const timeFilterSince = (timeFilter, now = new Date()) => {
+  const days = PERIOD_DAYS[timeFilter];
+  return days ? new Date(now.getTime() - days * 24 * 60 * 60 * 1000).toISOString() : null;
 };